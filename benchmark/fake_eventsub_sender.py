@@ -0,0 +1,163 @@
+"""
+Поддельный отправитель сообщений Twitch EventSub для проверки приёмника.
+
+Формирует сообщения так же, как Twitch: заголовки `Twitch-Eventsub-Message-*`,
+время в формате RFC3339 с наносекундами и подпись HMAC-SHA256 от id сообщения,
+времени и тела запроса. Поддерживаются сообщения webhook_callback_verification,
+notification (stream.online и stream.offline) и revocation.
+
+Запуск:
+    python benchmark/fake_eventsub_sender.py http://127.0.0.1:8080/ секрет notification \\
+        --subscription-type stream.online --login some_channel
+
+Краткое описание функций:
+    - format_timestamp: Возвращает время в формате заголовка EventSub.
+    - build_message: Формирует заголовки и тело подписанного сообщения.
+    - send_message: Отправляет сообщение приёмнику.
+"""
+import os
+import sys
+import json
+import uuid
+import argparse
+
+from datetime import datetime, timezone
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from eventsub import build_signature
+
+
+MESSAGE_TYPES = ("webhook_callback_verification", "notification", "revocation")
+
+
+def format_timestamp(moment=None):
+    """
+    Возвращает время в формате заголовка `Twitch-Eventsub-Message-Timestamp`.
+
+    Args:
+        moment (datetime, optional): Время в UTC. По умолчанию текущее.
+
+    Returns:
+        str: Время RFC3339 с девятью знаками долей секунды, как у Twitch.
+    """
+    moment = moment or datetime.now(timezone.utc)
+
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.%f") + "000Z"
+
+
+def build_message(secret, message_type, subscription_type="stream.online", user_id="1", login="channel",
+                  challenge=None, message_id=None, timestamp=None):
+    """
+    Формирует заголовки и тело подписанного сообщения EventSub.
+
+    Args:
+        secret (str): Секрет подписки.
+        message_type (str): Тип сообщения из `MESSAGE_TYPES`.
+        subscription_type (str): Тип подписки (stream.online или stream.offline).
+        user_id (str): ID канала.
+        login (str): Логин канала.
+        challenge (str, optional): Строка проверки адреса для webhook_callback_verification.
+        message_id (str, optional): ID сообщения. По умолчанию случайный.
+        timestamp (str, optional): Время отправки. По умолчанию текущее.
+
+    Returns:
+        tuple: Словарь заголовков и тело запроса (bytes).
+    """
+    message_id = message_id or str(uuid.uuid4())
+    timestamp = timestamp or format_timestamp()
+    subscription = {
+        "id": str(uuid.uuid5(uuid.NAMESPACE_URL, f"{user_id}/{subscription_type}")),
+        "type": subscription_type,
+        "version": "1",
+        "status": "enabled",
+        "condition": {"broadcaster_user_id": user_id},
+        "transport": {"method": "webhook", "callback": "https://example.com/eventsub"},
+        "created_at": timestamp
+    }
+
+    if message_type == "webhook_callback_verification":
+        subscription["status"] = "webhook_callback_verification_pending"
+        payload = {"challenge": challenge or str(uuid.uuid4()), "subscription": subscription}
+    elif message_type == "revocation":
+        subscription["status"] = "authorization_revoked"
+        payload = {"subscription": subscription}
+    else:
+        event = {
+            "broadcaster_user_id": user_id,
+            "broadcaster_user_login": login,
+            "broadcaster_user_name": login
+        }
+
+        if subscription_type == "stream.online":
+            event.update({"id": str(uuid.uuid4().int)[:11], "type": "live", "started_at": timestamp})
+
+        payload = {"subscription": subscription, "event": event}
+
+    body = json.dumps(payload).encode('utf-8')
+    headers = {
+        "Content-Type": "application/json",
+        "Twitch-Eventsub-Message-Id": message_id,
+        "Twitch-Eventsub-Message-Retry": "0",
+        "Twitch-Eventsub-Message-Type": message_type,
+        "Twitch-Eventsub-Message-Signature": build_signature(secret, message_id, timestamp, body),
+        "Twitch-Eventsub-Message-Timestamp": timestamp,
+        "Twitch-Eventsub-Subscription-Type": subscription_type,
+        "Twitch-Eventsub-Subscription-Version": "1"
+    }
+
+    return headers, body
+
+
+def send_message(url, headers, body, timeout=5):
+    """
+    Отправляет сообщение приёмнику EventSub.
+
+    Args:
+        url (str): Адрес приёмника.
+        headers (dict): Заголовки сообщения.
+        body (bytes): Тело сообщения.
+        timeout (float): Время ожидания ответа в секундах.
+
+    Returns:
+        tuple: Код ответа и тело ответа (bytes).
+    """
+    request = Request(url, data=body, headers=headers, method="POST")
+
+    try:
+        with urlopen(request, timeout=timeout) as response:
+            return response.status, response.read()
+    except HTTPError as err:
+        return err.code, err.read()
+
+
+def parse_args():
+    """Разбирает аргументы командной строки."""
+    parser = argparse.ArgumentParser(description="Отправка подписанного сообщения EventSub.")
+    parser.add_argument("url")
+    parser.add_argument("secret")
+    parser.add_argument("message_type", choices=MESSAGE_TYPES)
+    parser.add_argument("--subscription-type", default="stream.online")
+    parser.add_argument("--user-id", default="1")
+    parser.add_argument("--login", default="channel")
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    headers, body = build_message(
+        secret            = args.secret,
+        message_type      = args.message_type,
+        subscription_type = args.subscription_type,
+        user_id           = args.user_id,
+        login             = args.login
+    )
+    status, response_body = send_message(args.url, headers, body)
+    print(status, response_body.decode('utf-8', 'replace'))
+
+
+if __name__ == "__main__":
+    main()
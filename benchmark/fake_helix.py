@@ -0,0 +1,305 @@
+"""
+Локальная заглушка Twitch Helix API для нагрузочного тестирования.
+
+Заглушка моделирует тысячи каналов, которые случайно начинают и заканчивают
+трансляции (длительность трансляций и перерывов распределена экспоненциально),
+и отвечает на запросы, которые делает программа записи:
+    - POST /oauth2/token: токен доступа приложения;
+    - GET /helix/users: ID каналов по логинам;
+    - GET /helix/streams: активные трансляции с постраничной выдачей.
+
+Бюджет запросов ограничен как в Helix: ответы содержат заголовки `Ratelimit-Limit`,
+`Ratelimit-Remaining` и `Ratelimit-Reset`, а при исчерпании бюджета возвращается 429.
+
+Служебные адреса для драйвера и поддельного streamlink:
+    - GET /bench/live?login=...: 200, если канал в эфире, иначе 404;
+    - GET /bench/events: моменты начала трансляций и счётчики запросов.
+
+Запуск:
+    python benchmark/fake_helix.py --port 8787 --channels 5000
+
+Краткое описание классов:
+    - FakeHelix: Модель каналов и обработчик запросов заглушки.
+"""
+import os
+import sys
+import json
+import time
+import heapq
+import random
+import asyncio
+import argparse
+
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http_utils import read_request
+
+
+LOGIN_PREFIX = "bench_"
+FIRST_USER_ID = 100000
+
+# Ограничения Helix, которые соблюдает заглушка
+MAX_IDS_PER_REQUEST = 100
+MAX_ITEMS_PER_PAGE = 100
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 429: 'Too Many Requests'}
+
+
+class FakeHelix:
+    """
+    Модель каналов и обработчик запросов заглушки Helix.
+
+    Краткое описание функций:
+        - run_schedule: Переключает каналы между эфиром и перерывом по расписанию.
+        - handle: Обрабатывает соединение, поддерживает keep-alive.
+
+    Args:
+        channels (int): Количество каналов.
+        mean_live_seconds (float): Средняя длительность трансляции в секундах.
+        mean_offline_seconds (float): Средняя длительность перерыва между трансляциями в секундах.
+        rate_limit (int): Бюджет запросов в минуту.
+        response_delay (float): Искусственная задержка ответа в секундах.
+        seed (int): Начальное значение генератора случайных чисел.
+    """
+
+    def __init__(self, channels, mean_live_seconds, mean_offline_seconds, rate_limit, response_delay, seed):
+        self.random = random.Random(seed)
+        self.mean_live_seconds = mean_live_seconds
+        self.mean_offline_seconds = mean_offline_seconds
+        self.response_delay = response_delay
+
+        self.rate_limit = rate_limit
+        self.tokens = float(rate_limit)
+        self.tokens_updated_at = time.time()
+
+        self.logins = [f"{LOGIN_PREFIX}{index}" for index in range(channels)]
+        self.index_by_login = {login: index for index, login in enumerate(self.logins)}
+        # Индекс канала -> данные текущей трансляции
+        self.live = {}
+        self.schedule = []
+        self.stream_counter = 0
+        self.events = []
+        self.stats = {"requests": 0, "throttled": 0, "streams_requests": 0}
+
+        # Начальная доля каналов в эфире соответствует установившемуся режиму
+        live_share = mean_live_seconds / (mean_live_seconds + mean_offline_seconds)
+        now = time.time()
+
+        for index in range(channels):
+            if self.random.random() < live_share:
+                self._go_live(index, now - self.random.expovariate(1 / mean_live_seconds), record_event=False)
+                heapq.heappush(self.schedule, (now + self.random.expovariate(1 / mean_live_seconds), index))
+            else:
+                heapq.heappush(self.schedule, (now + self.random.expovariate(1 / mean_offline_seconds), index))
+
+    @staticmethod
+    def user_id(index):
+        """Возвращает ID канала по его индексу."""
+        return str(FIRST_USER_ID + index)
+
+    def _go_live(self, index, started_at, record_event=True):
+        """Начинает трансляцию канала."""
+        self.stream_counter += 1
+        stream_id = str(self.stream_counter)
+        login = self.logins[index]
+
+        self.live[index] = {
+            "id": stream_id,
+            "user_id": self.user_id(index),
+            "user_login": login,
+            "user_name": login,
+            "game_name": "Benchmark",
+            "type": "live",
+            "title": f"Benchmark stream {stream_id}",
+            "viewer_count": 0,
+            "started_at": datetime.fromtimestamp(started_at, timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z'),
+            "language": "en"
+        }
+
+        if record_event:
+            self.events.append({"user_login": login, "stream_id": stream_id, "live_at": started_at})
+
+    async def run_schedule(self):
+        """Переключает каналы между эфиром и перерывом по расписанию."""
+        while True:
+            now = time.time()
+
+            while self.schedule and self.schedule[0][0] <= now:
+                switch_at, index = heapq.heappop(self.schedule)
+
+                if self.live.pop(index, None):
+                    next_switch_at = switch_at + self.random.expovariate(1 / self.mean_offline_seconds)
+                else:
+                    self._go_live(index, switch_at)
+                    next_switch_at = switch_at + self.random.expovariate(1 / self.mean_live_seconds)
+
+                heapq.heappush(self.schedule, (next_switch_at, index))
+
+            await asyncio.sleep(0.05)
+
+    def _take_token(self):
+        """Забирает токен из бюджета запросов. Возвращает заголовки ограничения и признак успеха."""
+        now = time.time()
+        refill_rate = self.rate_limit / 60
+        self.tokens = min(self.rate_limit, self.tokens + (now - self.tokens_updated_at) * refill_rate)
+        self.tokens_updated_at = now
+
+        allowed = self.tokens >= 1
+
+        if allowed:
+            self.tokens -= 1
+
+        headers = {
+            "Ratelimit-Limit": str(self.rate_limit),
+            "Ratelimit-Remaining": str(int(self.tokens)),
+            "Ratelimit-Reset": str(int(now + (self.rate_limit - self.tokens) / refill_rate) + 1)
+        }
+
+        return headers, allowed
+
+    def _users(self, query):
+        """Ответ на запрос helix/users."""
+        indexes = [self.index_by_login.get(login.lower()) for login in query.get("login", [])]
+        indexes += [int(user_id) - FIRST_USER_ID for user_id in query.get("id", []) if user_id.isdigit()]
+
+        if len(indexes) > MAX_IDS_PER_REQUEST:
+            return 400, {"error": "Bad Request", "message": "too many parameters"}
+
+        data = [
+            {"id": self.user_id(index), "login": self.logins[index], "display_name": self.logins[index]}
+            for index in indexes
+            if index is not None and 0 <= index < len(self.logins)
+        ]
+
+        return 200, {"data": data}
+
+    def _streams(self, query):
+        """Ответ на запрос helix/streams с постраничной выдачей по `after`."""
+        self.stats["streams_requests"] += 1
+        user_ids = query.get("user_id", [])
+
+        if len(user_ids) > MAX_IDS_PER_REQUEST:
+            return 400, {"error": "Bad Request", "message": "too many user_id parameters"}
+
+        first = min(int(query.get("first", ["20"])[0]), MAX_ITEMS_PER_PAGE)
+        offset = int(query.get("after", ["0"])[0])
+
+        streams = [
+            self.live[int(user_id) - FIRST_USER_ID]
+            for user_id in user_ids
+            if user_id.isdigit() and int(user_id) - FIRST_USER_ID in self.live
+        ]
+        page = streams[offset:offset + first]
+        pagination = {"cursor": str(offset + first)} if offset + first < len(streams) else {}
+
+        return 200, {"data": page, "pagination": pagination}
+
+    def _route(self, method, path, query):
+        """Возвращает код ответа, тело и признак запроса к Helix, который расходует бюджет."""
+        if path == "/oauth2/token" and method == "POST":
+            return 200, {"access_token": "benchmark", "expires_in": 86400, "token_type": "bearer"}, False
+
+        if path == "/bench/live":
+            index = self.index_by_login.get(query.get("login", [""])[0].lower())
+
+            return (200 if index in self.live else 404), {}, False
+
+        if path == "/bench/events":
+            return 200, {"events": self.events, "stats": self.stats, "live_channels": len(self.live)}, False
+
+        if method != "GET":
+            return 405, {}, False
+
+        if path == "/helix/users":
+            return (*self._users(query), True)
+
+        if path == "/helix/streams":
+            return (*self._streams(query), True)
+
+        return 404, {}, False
+
+    async def handle(self, reader, writer):
+        """Обрабатывает соединение, поддерживает keep-alive."""
+        try:
+            while True:
+                method, target, headers, _ = await read_request(reader, 65536)
+
+                if not method:
+                    break
+
+                split = urlsplit(target)
+                status, payload, rate_limited = self._route(method, split.path, parse_qs(split.query))
+                extra_headers = {}
+
+                if rate_limited:
+                    self.stats["requests"] += 1
+                    extra_headers, allowed = self._take_token()
+
+                    if not allowed:
+                        self.stats["throttled"] += 1
+                        status, payload = 429, {"error": "Too Many Requests", "status": 429}
+
+                if self.response_delay:
+                    await asyncio.sleep(self.response_delay)
+
+                body = json.dumps(payload).encode('utf-8')
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                head = [
+                    f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+                    "Content-Type: application/json",
+                    f"Content-Length: {len(body)}",
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}",
+                    *(f"{name}: {value}" for name, value in extra_headers.items())
+                ]
+
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode('latin-1') + body)
+                await writer.drain()
+
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def parse_args():
+    """Разбирает аргументы командной строки."""
+    parser = argparse.ArgumentParser(description="Заглушка Twitch Helix API для нагрузочного тестирования.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--channels", type=int, default=5000, help="количество каналов")
+    parser.add_argument("--mean-live-seconds", type=float, default=600, help="средняя длительность трансляции")
+    parser.add_argument("--mean-offline-seconds", type=float, default=3000, help="средняя длительность перерыва")
+    parser.add_argument("--rate-limit", type=int, default=800, help="бюджет запросов в минуту")
+    parser.add_argument("--response-delay-ms", type=float, default=0, help="задержка ответа в миллисекундах")
+    parser.add_argument("--seed", type=int, default=1)
+
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    helix = FakeHelix(
+        channels             = args.channels,
+        mean_live_seconds    = args.mean_live_seconds,
+        mean_offline_seconds = args.mean_offline_seconds,
+        rate_limit           = args.rate_limit,
+        response_delay       = args.response_delay_ms / 1000,
+        seed                 = args.seed
+    )
+
+    server = await asyncio.start_server(helix.handle, args.host, args.port)
+    schedule_task = asyncio.create_task(helix.run_schedule())
+
+    print(f"Заглушка Helix: http://{args.host}:{args.port}, каналов: {args.channels}.", flush=True)
+
+    async with server:
+        await asyncio.gather(server.serve_forever(), schedule_task)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+"""
+Поддельный streamlink для нагрузочного тестирования.
+
+Принимает те же аргументы, что передаёт программа записи (`twitch.tv/<логин>` и
+`-o <файл>` или `--stdout`), и пишет в файл или в stdout данные с заданным битрейтом, пока заглушка Helix
+отвечает, что канал в эфире. После окончания трансляции завершается с кодом 0,
+как настоящий streamlink.
+
+Настройки задаются переменными окружения:
+    - FAKE_STREAMLINK_BITRATE_KBPS: битрейт записи в килобитах в секунду (по умолчанию 6000);
+    - FAKE_STREAMLINK_CHUNK_SECONDS: период записи порций данных (по умолчанию 0.5);
+    - FAKE_HELIX_URL: адрес заглушки Helix для проверки, идёт ли трансляция;
+    - FAKE_STREAMLINK_CHECK_SECONDS: период этой проверки (по умолчанию 5).
+"""
+import os
+import sys
+import time
+
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+
+def is_live(helix_url, login):
+    """Проверяет по заглушке Helix, идёт ли трансляция канала."""
+    try:
+        with urlopen(f"{helix_url}/bench/live?login={login}", timeout=5):
+            return True
+    except HTTPError:
+        return False
+    except OSError:
+        # Заглушка недоступна (например, уже остановлена): запись заканчивается
+        return False
+
+
+def main():
+    args = sys.argv[1:]
+    login = next(arg.rsplit("/", 1)[1] for arg in args if arg.startswith("twitch.tv/"))
+
+    bitrate = float(os.environ.get("FAKE_STREAMLINK_BITRATE_KBPS", "6000")) * 1000 / 8
+    chunk_seconds = float(os.environ.get("FAKE_STREAMLINK_CHUNK_SECONDS", "0.5"))
+    check_seconds = float(os.environ.get("FAKE_STREAMLINK_CHECK_SECONDS", "5"))
+    helix_url = os.environ.get("FAKE_HELIX_URL")
+
+    chunk = b"\0" * int(bitrate * chunk_seconds)
+    started_at = time.monotonic()
+    checked_at = started_at
+    written_chunks = 0
+
+    try:
+        if "--stdout" in args:
+            file = os.fdopen(sys.stdout.fileno(), "wb", closefd=False)
+        else:
+            file = open(args[args.index("-o") + 1], "ab")
+    except OSError:
+        # Как и настоящий streamlink, завершается с ошибкой, если файл нельзя создать
+        # (например, временная папка теста уже удалена)
+        sys.exit(1)
+
+    with file:
+        while True:
+            try:
+                file.write(chunk)
+                file.flush()
+            except BrokenPipeError:
+                # Процесс-писатель остановлен
+                sys.exit(1)
+
+            written_chunks += 1
+
+            now = time.monotonic()
+
+            if helix_url and now - checked_at >= check_seconds:
+                checked_at = now
+
+                if not is_live(helix_url, login):
+                    return
+
+            # Порции пишутся по расписанию от начала, чтобы битрейт не уплывал
+            time.sleep(max(0.0, started_at + written_chunks * chunk_seconds - time.monotonic()))
+
+
+if __name__ == "__main__":
+    main()
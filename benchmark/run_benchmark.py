@@ -0,0 +1,496 @@
+"""
+Нагрузочный тест программы записи трансляций.
+
+Драйвер запускает заглушку Helix (`fake_helix.py`) в отдельном процессе, подставляет
+вместо streamlink `fake_streamlink.py` через PATH и запускает в своём процессе
+настоящий цикл программы (`run_event_loop` с `loop_check_with_rate_limit` и записью
+трансляций) с временной базой данных и хранилищем. Во время теста раз в секунду
+снимаются загрузка CPU, RSS и число потоков процесса программы, а по окончании
+выводится отчёт:
+    - задержка от начала трансляции до начала записи (перцентили);
+    - CPU, RSS, число потоков, процессов streamlink и процессов-писателей;
+    - опрос: число циклов, ошибки, длительность `check_users`, ответы 429;
+    - база данных: задержка записи и длина очереди писателя;
+    - проверки: число потоков не растёт с числом записей, а опрос выполняет не
+      меньше `MIN_SWEEP_SHARE` от ожидаемого числа циклов. Если проверка не
+      пройдена, драйвер завершается с кодом 1.
+
+Результаты разных версий программы сравниваются при одинаковых аргументах
+(в том числе `--seed`). Работает в Linux и macOS.
+
+Запуск из корня репозитория:
+    python benchmark/run_benchmark.py --channels 5000 --duration 300
+
+Краткое описание функций:
+    - percentile: Возвращает перцентиль списка значений.
+    - histogram_quantile: Оценивает квантиль гистограммы метрик по её корзинам.
+    - match_detections: Сопоставляет начала трансляций с началами записей.
+    - run_benchmark: Проводит тест и возвращает отчёт.
+    - evaluate_checks: Проверяет отчёт на рост числа потоков и пропуски циклов опроса.
+"""
+import os
+import sys
+import json
+import math
+import time
+import bisect
+import shutil
+import socket
+import logging
+import tempfile
+import argparse
+import threading
+import subprocess
+
+from urllib.request import urlopen
+
+import psutil
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+import config
+
+
+# Потоки программы помимо пулов: главный, поток цикла, писатель базы данных,
+# обновление токена и служебные потоки интерпретатора и драйвера
+FIXED_THREADS = 8
+# Какую долю ожидаемых циклов опроса должна выполнить программа
+MIN_SWEEP_SHARE = 0.5
+
+
+def percentile(values, q):
+    """
+    Возвращает перцентиль списка значений методом ближайшего ранга.
+
+    Args:
+        values (list): Значения.
+        q (float): Перцентиль от 0 до 100.
+
+    Returns:
+        float or None: Значение перцентиля или None для пустого списка.
+    """
+    if not values:
+        return None
+
+    ordered = sorted(values)
+
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def histogram_quantile(histogram, q):
+    """
+    Оценивает квантиль гистограммы метрик без меток по её корзинам, как `histogram_quantile` в Prometheus.
+
+    Args:
+        histogram (metrics.Histogram): Гистограмма.
+        q (float): Квантиль от 0 до 1.
+
+    Returns:
+        float or None: Оценка квантиля или None, если значений нет.
+    """
+    with histogram.lock:
+        state = histogram.values.get(())
+
+        if not state or not state["count"]:
+            return None
+
+        counts = list(state["counts"])
+        total = state["count"]
+
+    rank = q * total
+    cumulative = 0
+    lower = 0.0
+
+    for bound, count in zip(histogram.buckets, counts):
+        if count and cumulative + count >= rank:
+            if bound == math.inf:
+                return lower
+
+            return lower + (bound - lower) * (rank - cumulative) / count
+
+        cumulative += count
+        lower = bound
+
+    return lower
+
+
+def match_detections(events, record_starts, not_before):
+    """
+    Сопоставляет начала трансляций в заглушке с началами записей в программе.
+
+    Запись относится к трансляции, если она началась после начала трансляции и
+    раньше следующей трансляции того же канала.
+
+    Args:
+        events (list): События заглушки с ключами `user_login` и `live_at` (время UNIX).
+        record_starts (dict): Логин -> список времён начала записей.
+        not_before (float): Трансляции, начавшиеся раньше (до первого опроса), не учитываются.
+
+    Returns:
+        tuple: Список задержек в секундах и число трансляций без записи.
+    """
+    events_by_login = {}
+
+    for event in events:
+        events_by_login.setdefault(event["user_login"], []).append(event["live_at"])
+
+    delays = []
+    missed = 0
+
+    for login, live_times in events_by_login.items():
+        starts = sorted(record_starts.get(login, []))
+        live_times.sort()
+
+        for position, live_at in enumerate(live_times):
+            if live_at < not_before:
+                continue
+
+            next_live_at = live_times[position + 1] if position + 1 < len(live_times) else math.inf
+            index = bisect.bisect_left(starts, live_at)
+
+            if index < len(starts) and starts[index] < next_live_at:
+                delays.append(starts[index] - live_at)
+            else:
+                missed += 1
+
+    return delays, missed
+
+
+class RecordStartCollector:
+    """Подписчик модели состояния, запоминающий время начала каждой записи."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.starts = {}
+
+    def add_record(self, user_name):
+        with self.lock:
+            self.starts.setdefault(user_name, []).append(time.time())
+
+    def remove_record(self, user_name):
+        pass
+
+
+def is_writer_process(process):
+    """Проверяет, что дочерний процесс — процесс-писатель `recording_writer.py`."""
+    try:
+        return any("recording_writer" in arg for arg in process.cmdline()[:2])
+    except psutil.Error:
+        return False
+
+
+def free_port():
+    """Возвращает свободный TCP-порт на localhost."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    """Ждёт, пока на localhost не начнут принимать соединения на указанном порту."""
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+
+            return
+        except OSError:
+            time.sleep(0.1)
+
+    raise TimeoutError(f"Заглушка Helix не запустилась на порту {port}.")
+
+
+def install_fake_streamlink(bin_dir):
+    """Создаёт в `bin_dir` исполняемый файл `streamlink`, запускающий поддельный streamlink."""
+    path = os.path.join(bin_dir, "streamlink")
+
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(f'#!/bin/sh\nexec "{sys.executable}" "{os.path.join(BENCHMARK_DIR, "fake_streamlink.py")}" "$@"\n')
+
+    os.chmod(path, 0o755)
+
+
+def start_fake_helix(args, port):
+    """Запускает заглушку Helix в отдельном процессе и ждёт, пока она начнёт принимать соединения."""
+    helix_process = subprocess.Popen([
+        sys.executable, os.path.join(BENCHMARK_DIR, "fake_helix.py"),
+        "--port", str(port),
+        "--channels", str(args.channels),
+        "--mean-live-seconds", str(args.mean_live_seconds),
+        "--mean-offline-seconds", str(args.mean_offline_seconds),
+        "--rate-limit", str(args.rate_limit),
+        "--response-delay-ms", str(args.response_delay_ms),
+        "--seed", str(args.seed)
+    ], stdout=subprocess.DEVNULL)
+
+    wait_for_port(port)
+
+    return helix_process
+
+
+def stop_children(helix_process):
+    """
+    Останавливает заглушку Helix, а затем процессы поддельного streamlink.
+
+    Заглушка останавливается первой, чтобы программа не начинала новые записи.
+    """
+    helix_process.terminate()
+    helix_process.wait()
+    time.sleep(1)
+
+    for child in psutil.Process().children(recursive=True):
+        try:
+            child.terminate()
+        except psutil.NoSuchProcess:
+            pass
+
+    time.sleep(1)
+
+
+def run_benchmark(args, workdir, helix_url, helix_pid):
+    """
+    Проводит нагрузочный тест.
+
+    Args:
+        args (argparse.Namespace): Аргументы командной строки.
+        workdir (str): Временная папка для базы данных, записей и журнала.
+        helix_url (str): Адрес запущенной заглушки Helix.
+        helix_pid (int): Идентификатор процесса заглушки Helix.
+
+    Returns:
+        dict: Отчёт с результатами теста.
+    """
+    storage_dir = os.path.join(workdir, "storage")
+    bin_dir = os.path.join(workdir, "bin")
+
+    os.makedirs(storage_dir, exist_ok=True)
+    os.makedirs(bin_dir, exist_ok=True)
+    install_fake_streamlink(bin_dir)
+
+    os.environ["PATH"] = bin_dir + os.pathsep + os.environ.get("PATH", "")
+    os.environ["FAKE_HELIX_URL"] = helix_url
+    os.environ["FAKE_STREAMLINK_BITRATE_KBPS"] = str(args.bitrate_kbps)
+
+    # Настройки меняются до импорта программы: адреса API читаются при импорте
+    config.helix_url = f"{helix_url}/helix"
+    config.oauth_token_url = f"{helix_url}/oauth2/token"
+    config.client_id = "benchmark"
+    config.client_secret = "benchmark"
+    config.token_path = os.path.join(workdir, "token.json")
+    config.database_path = os.path.join(workdir, "streams.db")
+    config.storages = [{"path": storage_dir, "required_free_space_gb": 0}]
+    config.failover_min_free_space_gb = 0
+    config.headless = True
+    config.status_enabled = False
+    config.eventsub_enabled = False
+    config.postprocess_enabled = False
+    config.catalog_scan_interval_minutes = 0
+    config.config_reload_interval_seconds = 0
+    config.hot_poll_interval_seconds = args.poll_interval
+    config.cold_poll_interval_seconds = args.poll_interval
+
+    import twitch_live_broadcasts_recorder as recorder
+
+    from database import Database
+    from rate_limiter import RateLimiter
+    from init_database import init_database
+    from choose_storage import StoragePlacement
+    from recorder_status import RecorderStatus
+    from metrics import ACTIVE_RECORDINGS, DB_QUEUE_SIZE, DB_WRITE_LATENCY, ADD_RECORD_DURATION, POLL_DURATION
+
+    logger = logging.getLogger("benchmark")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(logging.FileHandler(os.path.join(workdir, "recorder.log"), encoding="utf-8"))
+
+    recorder.logger = logger
+    recorder.limiter = RateLimiter()
+    recorder.database = Database(database_path=config.database_path, main_logger=logger)
+
+    init_database(database_path=config.database_path, main_logger=logger)
+    recorder.database.start()
+
+    placement = StoragePlacement(
+        storages           = config.storages,
+        logger             = logger,
+        refresh_seconds    = config.storage_usage_refresh_seconds,
+        default_bitrate    = args.bitrate_kbps * 1000 / 8,
+        # Прогноз заполнения не ограничивает число одновременных записей в тесте
+        projection_seconds = 0
+    )
+    status = RecorderStatus()
+    collector = RecordStartCollector()
+    status.subscribe(collector)
+
+    process = psutil.Process()
+    process.cpu_percent()
+    samples = []
+    ready_at = None
+
+    threading.Thread(
+        target=recorder.run_event_loop,
+        args=([f"bench_{index}" for index in range(args.channels)], placement, status),
+        name="recorder",
+        daemon=True
+    ).start()
+
+    started_at = time.time()
+
+    while time.time() - started_at < args.duration:
+        time.sleep(args.sample_interval)
+
+        if ready_at is None and status.poll["polls"]:
+            ready_at = time.time()
+
+        # Дочерние процессы программы, кроме заглушки Helix: streamlink и процессы-писатели
+        children = [child for child in process.children() if child.pid != helix_pid]
+        writer_processes = [child for child in children if is_writer_process(child)]
+        samples.append({
+            "cpu_percent": process.cpu_percent(),
+            "rss_bytes": process.memory_info().rss,
+            "threads": process.num_threads(),
+            "streamlink_processes": len(children) - len(writer_processes),
+            "writer_processes": len(writer_processes),
+            "active_recordings": ACTIVE_RECORDINGS.values.get((), 0),
+            "db_queue_size": DB_QUEUE_SIZE.values.get((), 0)
+        })
+
+    with urlopen(f"{helix_url}/bench/events", timeout=30) as response:
+        helix_report = json.load(response)
+
+    delays, missed = match_detections(helix_report["events"], collector.starts, ready_at or math.inf)
+
+    def summary(key):
+        values = [sample[key] for sample in samples]
+
+        return {"mean": sum(values) / len(values), "max": max(values)} if values else None
+
+    return {
+        "parameters": vars(args),
+        "ready_after_seconds": ready_at - started_at if ready_at else None,
+        "duration_seconds": time.time() - started_at,
+        "thread_limit": recorder.BLOCKING_MAX_WORKERS + recorder.POLL_MAX_WORKERS + FIXED_THREADS,
+        "detection": {
+            "streams_started": len(delays) + missed,
+            "recorded": len(delays),
+            "missed": missed,
+            **{f"p{q}_seconds": percentile(delays, q) for q in (50, 90, 95, 99)},
+            "max_seconds": max(delays) if delays else None
+        },
+        "process": {
+            "cpu_percent": summary("cpu_percent"),
+            "rss_mb": {key: value / 1024 ** 2 for key, value in summary("rss_bytes").items()},
+            "threads": summary("threads"),
+            "streamlink_processes": summary("streamlink_processes"),
+            "writer_processes": summary("writer_processes"),
+            "active_recordings": summary("active_recordings")
+        },
+        "poll": {
+            "polls": status.poll["polls"],
+            "poll_errors": status.poll["errors"],
+            "helix_requests": helix_report["stats"]["requests"],
+            "helix_throttled": helix_report["stats"]["throttled"],
+            **{f"check_users_p{int(q * 100)}_seconds": histogram_quantile(POLL_DURATION, q) for q in (0.5, 0.95)}
+        },
+        "database": {
+            "queue_size": summary("db_queue_size"),
+            **{f"write_latency_p{int(q * 100)}_seconds": histogram_quantile(DB_WRITE_LATENCY, q) for q in (0.5, 0.95, 0.99)},
+            "add_record_p95_seconds": histogram_quantile(ADD_RECORD_DURATION, 0.95)
+        }
+    }
+
+
+def evaluate_checks(report):
+    """
+    Проверяет отчёт на рост числа потоков и пропуски циклов опроса.
+
+    Число потоков не должно превышать размер пулов плюс постоянные потоки при
+    любом числе записей. Опрос должен выполнить не меньше `MIN_SWEEP_SHARE` от
+    числа циклов, которое помещается в тест при заданном интервале опроса.
+
+    Args:
+        report (dict): Отчёт `run_benchmark`.
+
+    Returns:
+        dict: Имя проверки -> True, если она пройдена.
+    """
+    args = report["parameters"]
+    threads = report["process"]["threads"]
+    poll_seconds = report["duration_seconds"] - (report["ready_after_seconds"] or report["duration_seconds"])
+    expected_sweeps = poll_seconds / max(args["poll_interval"], config.min_poll_interval_seconds)
+
+    return {
+        "threads_flat": bool(threads) and threads["max"] <= report["thread_limit"],
+        "poll_sweeps": report["poll"]["polls"] >= MIN_SWEEP_SHARE * expected_sweeps
+    }
+
+
+def format_report(report, indent=0):
+    """Форматирует отчёт для вывода в консоль."""
+    lines = []
+
+    for key, value in report.items():
+        if key == "parameters":
+            continue
+
+        if isinstance(value, dict):
+            lines.append(f"{' ' * indent}{key}:")
+            lines.append(format_report(value, indent + 2))
+        else:
+            lines.append(f"{' ' * indent}{key}: {round(value, 3) if isinstance(value, float) else value}")
+
+    return "\n".join(lines)
+
+
+def parse_args():
+    """Разбирает аргументы командной строки."""
+    parser = argparse.ArgumentParser(description="Нагрузочный тест программы записи трансляций.")
+    parser.add_argument("--channels", type=int, default=5000, help="количество каналов")
+    parser.add_argument("--duration", type=float, default=300, help="длительность теста в секундах")
+    parser.add_argument("--mean-live-seconds", type=float, default=600, help="средняя длительность трансляции")
+    parser.add_argument("--mean-offline-seconds", type=float, default=3000, help="средняя длительность перерыва")
+    parser.add_argument("--rate-limit", type=int, default=800, help="бюджет запросов заглушки в минуту")
+    parser.add_argument("--response-delay-ms", type=float, default=20, help="задержка ответов заглушки")
+    parser.add_argument("--bitrate-kbps", type=float, default=6000, help="битрейт поддельного streamlink")
+    parser.add_argument("--poll-interval", type=float, default=1, help="интервал опроса каналов в секундах")
+    parser.add_argument("--sample-interval", type=float, default=1, help="период замеров процесса в секундах")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--workdir", help="папка для базы и записей (по умолчанию временная, удаляется)")
+    parser.add_argument("--json", help="сохранить отчёт в JSON-файл")
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    workdir = args.workdir or tempfile.mkdtemp(prefix="recorder_benchmark_")
+
+    port = free_port()
+    helix_process = start_fake_helix(args, port)
+
+    try:
+        report = run_benchmark(args, workdir, f"http://127.0.0.1:{port}", helix_process.pid)
+    finally:
+        stop_children(helix_process)
+
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report["checks"] = evaluate_checks(report)
+    print(format_report(report))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+    # Цикл программы работает бесконечно в фоновых потоках, поэтому процесс завершается сразу
+    sys.stdout.flush()
+    os._exit(0 if all(report["checks"].values()) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+"""
+Модуль каталога записей трансляций.
+
+Каталог хранит в базе данных список файлов записей на всех хранилищах и связывает
+их с трансляциями из таблицы `live_broadcast` по `stream_id`, который
+`get_video_path` добавляет в имя файла. Поиск по названиям трансляций и именам
+стримеров идёт через полнотекстовый индекс FTS5, поэтому запрос по большому
+архиву не требует обхода папок и занимает миллисекунды.
+
+Сканирование инкрементальное: время изменения папки сохраняется, и файлы папки,
+время изменения которой не поменялось, повторно не читаются. Хранилища на разных
+томах сканируются параллельно, на одном томе — по очереди, чтобы не гонять головки диска.
+
+Использование из командной строки:
+    python catalog.py scan
+    python catalog.py search "название трансляции" --user user_name --limit 20
+
+Краткое описание функций:
+    - parse_recording_name: Разбирает имя файла записи на компоненты.
+    - scan_storage: Обходит папки хранилища и собирает изменившиеся папки.
+
+Краткое описание классов:
+    - RecordingsCatalog: Сканирование хранилищ и поиск по каталогу записей.
+"""
+import os
+import re
+import json
+import asyncio
+import argparse
+
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+
+from set_logger import set_logger
+from database import Database
+from init_database import init_database
+
+
+VIDEO_EXTENSIONS = ('.mp4', '.ts', '.mkv')
+
+# Имя файла из get_video_path: "<начало записи> - <stream_id> - broadcast - <стример>[ - part NNN].<расширение>"
+RECORDING_NAME_PATTERN = re.compile(
+    r'^(?P<recording_start>\d{4}-\d{2}-\d{2} \d{2}-\d{2}-\d{2}) - (?P<stream_id>\d+) - broadcast - '
+    r'(?P<user_name>.+?)(?: - part (?P<part_number>\d+))?\.\w+$'
+)
+
+
+def parse_recording_name(file_name):
+    """
+    Разбирает имя файла записи на компоненты.
+
+    Args:
+        file_name (str): Имя файла без пути.
+
+    Returns:
+        dict or None: Время начала записи, `stream_id`, имя стримера и номер части
+                      или None, если имя не соответствует формату записей.
+    """
+    match = RECORDING_NAME_PATTERN.match(file_name)
+
+    if not match:
+        return None
+
+    return {
+        "recording_start": match['recording_start'],
+        "stream_id": match['stream_id'],
+        "user_name": match['user_name'],
+        "part_number": int(match['part_number'] or 1)
+    }
+
+
+def scan_storage(storage_path, known_dirs):
+    """
+    Обходит папки хранилища и собирает файлы записей в изменившихся папках.
+
+    У неизменившейся папки (время изменения совпадает с `known_dirs`) файлы не
+    читаются, из неё берутся только вложенные папки. Время изменения папки не
+    меняется при дописывании файлов, поэтому размер идущей записи обновится, когда
+    в папке появится или исчезнет файл (например, после обработки записи).
+
+    Args:
+        storage_path (str): Корневая папка хранилища.
+        known_dirs (dict): Путь к папке -> время изменения в наносекундах при прошлом сканировании.
+
+    Returns:
+        tuple: Словарь изменившихся папок (путь -> (время изменения, список файлов))
+               и множество всех найденных папок.
+
+    Raises:
+        OSError: Если корневая папка хранилища недоступна.
+    """
+    changed = {}
+    seen = set()
+    stack = [storage_path]
+
+    while stack:
+        dir_path = stack.pop()
+
+        try:
+            mtime_ns = os.stat(dir_path).st_mtime_ns
+            entries = list(os.scandir(dir_path))
+        except OSError:
+            # Недоступна сама папка хранилища — сканирование хранилища не удалось
+            if dir_path == storage_path:
+                raise
+
+            continue
+
+        seen.add(dir_path)
+        unchanged = known_dirs.get(dir_path) == mtime_ns
+        files = []
+
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+            elif not unchanged and entry.name.lower().endswith(VIDEO_EXTENSIONS):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+
+                files.append((entry.path, entry.name, stat.st_size, stat.st_mtime))
+
+        if not unchanged:
+            changed[dir_path] = (mtime_ns, files)
+
+    return changed, seen
+
+
+class RecordingsCatalog:
+    """
+    Сканирование хранилищ и поиск по каталогу записей.
+
+    Краткое описание функций:
+        - scan: Инкрементально сканирует все хранилища и обновляет каталог.
+        - search: Ищет трансляции по названию и имени стримера с файлами записей.
+        - files: Возвращает файлы записей стримера из каталога.
+        - set_storage_paths: Заменяет список сканируемых хранилищ.
+        - run_scan_loop: Корутина регулярного обновления каталога.
+
+    Args:
+        database (Database): База данных.
+        storage_paths (list): Корневые папки хранилищ.
+        main_logger (logging.Logger): Логгер.
+    """
+
+    def __init__(self, database, storage_paths, main_logger):
+        self.database = database
+        self.logger = main_logger.getChild('catalog')
+        self.set_storage_paths(storage_paths)
+
+    def set_storage_paths(self, storage_paths):
+        """
+        Заменяет список сканируемых хранилищ. Файлы убранных хранилищ остаются в каталоге.
+
+        Args:
+            storage_paths (list): Корневые папки хранилищ.
+        """
+        self.storage_paths = [os.path.normpath(path) for path in storage_paths]
+
+    def _volumes(self):
+        """Группирует хранилища по томам, чтобы на одном томе сканирование шло последовательно."""
+        volumes = {}
+
+        for storage_path in self.storage_paths:
+            try:
+                device = os.stat(storage_path).st_dev
+            except OSError:
+                device = storage_path
+
+            volumes.setdefault(device, []).append(storage_path)
+
+        return list(volumes.values())
+
+    def _scan_volume(self, storage_paths):
+        """Сканирует хранилища одного тома и ставит изменения каталога в очередь записи."""
+        futures = []
+        stats = {"dirs": 0, "changed_dirs": 0, "files": 0}
+
+        for storage_path in storage_paths:
+            known_dirs = dict(self.database.read(
+                "SELECT path, mtime_ns FROM catalog_dirs WHERE storage_path = ?", (storage_path,)
+            ))
+
+            try:
+                changed, seen = scan_storage(storage_path, known_dirs)
+            except OSError as err:
+                # Каталог недоступного хранилища не очищается: диск может вернуться
+                self.logger.warning(f"Хранилище {storage_path} недоступно для сканирования: {err}")
+
+                continue
+
+            for dir_path, (mtime_ns, files) in changed.items():
+                rows = []
+
+                for path, name, size_bytes, mtime in files:
+                    parsed = parse_recording_name(name) or {}
+
+                    rows.append((
+                        path,
+                        dir_path,
+                        parsed.get('user_name', os.path.basename(dir_path)),
+                        parsed.get('stream_id'),
+                        parsed.get('recording_start'),
+                        parsed.get('part_number'),
+                        size_bytes,
+                        mtime
+                    ))
+
+                futures.append(self.database.write("DELETE FROM catalog_files WHERE dir_path = ?", (dir_path,)))
+                futures.append(self.database.write_many('''
+                    INSERT OR REPLACE INTO catalog_files (
+                        path, dir_path, user_name, stream_id, recording_start, part_number, size_bytes, mtime
+                    )
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', rows))
+                futures.append(self.database.write(
+                    "INSERT OR REPLACE INTO catalog_dirs (path, storage_path, mtime_ns) VALUES (?, ?, ?)",
+                    (dir_path, storage_path, mtime_ns)
+                ))
+                stats["files"] += len(rows)
+
+            removed_dirs = [(dir_path,) for dir_path in known_dirs if dir_path not in seen]
+
+            if removed_dirs:
+                futures.append(self.database.write_many("DELETE FROM catalog_files WHERE dir_path = ?", removed_dirs))
+                futures.append(self.database.write_many("DELETE FROM catalog_dirs WHERE path = ?", removed_dirs))
+
+            stats["dirs"] += len(seen)
+            stats["changed_dirs"] += len(changed)
+
+        for future in futures:
+            future.result()
+
+        return stats
+
+    def scan(self):
+        """
+        Инкрементально сканирует все хранилища и обновляет каталог.
+
+        Метод блокирующий и должен вызываться вне событийного цикла.
+
+        Returns:
+            dict: Количество просмотренных и изменившихся папок и прочитанных файлов.
+        """
+        volumes = self._volumes()
+        totals = {"dirs": 0, "changed_dirs": 0, "files": 0}
+
+        with ThreadPoolExecutor(max_workers=len(volumes) or 1, thread_name_prefix="catalog") as executor:
+            for stats in executor.map(self._scan_volume, volumes):
+                for key, value in stats.items():
+                    totals[key] += value
+
+        self.logger.info(
+            f"Каталог записей обновлён: папок {totals['dirs']}, изменилось {totals['changed_dirs']}, "
+            f"прочитано файлов {totals['files']}."
+        )
+
+        return totals
+
+    def search(self, text=None, user_name=None, limit=50):
+        """
+        Ищет трансляции по названию и имени стримера и возвращает их с файлами записей.
+
+        Слова запроса ищутся по началу слов в названии трансляции и имени стримера.
+
+        Args:
+            text (str, optional): Текст для полнотекстового поиска.
+            user_name (str, optional): Имя стримера для точного отбора.
+            limit (int): Максимальное количество трансляций.
+
+        Returns:
+            list: Трансляции (новые сначала) со списком файлов в ключе `files`.
+        """
+        conditions = []
+        params = []
+
+        if text:
+            terms = ['"{}"*'.format(term.replace('"', '""')) for term in text.split()]
+            conditions.append("live_broadcast.id IN (SELECT rowid FROM live_broadcast_fts WHERE live_broadcast_fts MATCH ?)")
+            params.append(" ".join(terms))
+
+        if user_name:
+            conditions.append("live_broadcast.user_name = ? COLLATE NOCASE")
+            params.append(user_name)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        rows = self.database.read(f'''
+            SELECT id, user_name, stream_id, recording_start, title
+            FROM live_broadcast
+            {where}
+            ORDER BY recording_start DESC
+            LIMIT ?
+        ''', (*params, limit))
+
+        broadcasts = [
+            dict(zip(("id", "user_name", "stream_id", "recording_start", "title"), row), files=[])
+            for row in rows
+        ]
+        by_stream_id = {broadcast['stream_id']: broadcast for broadcast in reversed(broadcasts)}
+
+        if by_stream_id:
+            files = self.database.read(f'''
+                SELECT stream_id, path, part_number, size_bytes
+                FROM catalog_files
+                WHERE stream_id IN ({", ".join("?" * len(by_stream_id))})
+                ORDER BY recording_start, part_number
+            ''', tuple(by_stream_id))
+
+            for stream_id, path, part_number, size_bytes in files:
+                by_stream_id[stream_id]['files'].append(
+                    {"path": path, "part_number": part_number, "size_bytes": size_bytes}
+                )
+
+        return broadcasts
+
+    def files(self, user_name, limit=100):
+        """
+        Возвращает файлы записей стримера из каталога, в том числе без трансляции в базе данных.
+
+        Args:
+            user_name (str): Имя стримера.
+            limit (int): Максимальное количество файлов.
+
+        Returns:
+            list: Файлы записей, новые сначала.
+        """
+        rows = self.database.read('''
+            SELECT path, stream_id, recording_start, part_number, size_bytes
+            FROM catalog_files
+            WHERE user_name = ? COLLATE NOCASE
+            ORDER BY recording_start DESC, part_number
+            LIMIT ?
+        ''', (user_name, limit))
+
+        return [dict(zip(("path", "stream_id", "recording_start", "part_number", "size_bytes"), row)) for row in rows]
+
+    async def run_scan_loop(self, interval_seconds):
+        """
+        Корутина регулярного обновления каталога.
+
+        Сканирование выполняется в пуле потоков, ошибки не останавливают цикл.
+
+        Args:
+            interval_seconds (float): Период сканирования.
+        """
+        while True:
+            try:
+                await asyncio.to_thread(self.scan)
+            except Exception as err:
+                self.logger.error(f"Ошибка при обновлении каталога записей: {err}")
+
+            await asyncio.sleep(interval_seconds)
+
+
+def parse_args():
+    """Разбирает аргументы командной строки."""
+    parser = argparse.ArgumentParser(description="Каталог записей трансляций.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("scan", help="обновить каталог по хранилищам")
+
+    search_parser = commands.add_parser("search", help="найти трансляции по названию и имени стримера")
+    search_parser.add_argument("text", nargs="?", help="слова для поиска")
+    search_parser.add_argument("--user", help="имя стримера")
+    search_parser.add_argument("--limit", type=int, default=20)
+    search_parser.add_argument("--json", action="store_true", help="вывести результат в формате JSON")
+
+    files_parser = commands.add_parser("files", help="файлы записей стримера")
+    files_parser.add_argument("user")
+    files_parser.add_argument("--limit", type=int, default=100)
+    files_parser.add_argument("--json", action="store_true", help="вывести результат в формате JSON")
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    # Журнал утилиты выводится только в консоль, чтобы не смешиваться с журналом программы записи
+    logger = set_logger()
+
+    init_database(database_path=config.database_path, main_logger=logger)
+
+    database = Database(database_path=config.database_path, main_logger=logger)
+    database.start()
+
+    catalog = RecordingsCatalog(
+        database      = database,
+        storage_paths = [storage['path'] for storage in config.storages],
+        main_logger   = logger
+    )
+
+    if args.command == "scan":
+        catalog.scan()
+    elif args.command == "search":
+        broadcasts = catalog.search(text=args.text, user_name=args.user, limit=args.limit)
+
+        if args.json:
+            print(json.dumps(broadcasts, ensure_ascii=False, indent=2))
+        else:
+            for broadcast in broadcasts:
+                print(f"{broadcast['recording_start']}  {broadcast['user_name']}  {broadcast['title']}")
+
+                for file in broadcast['files']:
+                    print(f"    {file['path']}  ({file['size_bytes'] / 1024 ** 3:.2f} ГБ)")
+    else:
+        files = catalog.files(user_name=args.user, limit=args.limit)
+
+        if args.json:
+            print(json.dumps(files, ensure_ascii=False, indent=2))
+        else:
+            for file in files:
+                print(f"{file['path']}  ({file['size_bytes'] / 1024 ** 3:.2f} ГБ)")
+
+    database.close()
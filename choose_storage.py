@@ -1,50 +1,269 @@
 """
 Модуль для выбора хранилища с достаточным количеством свободного места.
 
-Этот модуль содержит функцию `choose_storage`, которая проверяет доступные хранилища
-и возвращает путь к папке, если в ней достаточно свободного места.
+Этот модуль содержит класс `StoragePlacement`, который распределяет новые записи
+по хранилищам с учётом записей, которые уже идут на каждый диск.
+
+Для каждого хранилища определяется реальная точка монтирования, а занятость
+дисков кэшируется и обновляется не чаще раза в `refresh_seconds`. Каждая идущая
+запись резервирует на своём диске место под рост, ожидаемый до конца горизонта
+прогноза при её битрейте. Битрейт сначала берётся по умолчанию, а затем по фактическому
+размеру файла. Подходящим считается хранилище, на котором сейчас свободно не меньше
+`required_free_space_gb`. Прогноз только ранжирует подходящие хранилища: новая
+запись направляется в хранилище с наибольшим запасом места с учётом резервов, а
+если прогноз не выдерживает ни одно, то в хранилище с наибольшим свободным местом.
 
 Краткое описание функций:
-    - choose_storage: Выбирает хранилище с достаточным количеством свободного места.
+    - find_mount_point: Определяет точку монтирования, на которой находится путь.
+    - StoragePlacement.choose_storage: Выбирает хранилище и резервирует на нём место.
+    - StoragePlacement.set_channel_bitrates: Задаёт известный битрейт каналов.
+    - StoragePlacement.set_storages: Заменяет список хранилищ без остановки идущих записей.
+    - StoragePlacement.set_file_path: Привязывает файл записи к резерву.
+    - StoragePlacement.release: Освобождает резерв после окончания записи.
 """
 import os
+import time
+import threading
+
 import psutil
 
+from metrics import CHOOSE_STORAGE_DURATION
+
+
+GB = 1024 ** 3
 
-def choose_storage(storages, logger):
+
+def find_mount_point(path):
     """
-    Выбирает хранилище с достаточным количеством свободного места.
+    Определяет точку монтирования, на которой находится путь.
+
+    Если путь ещё не существует, используется ближайшая существующая родительская папка.
+
+    Args:
+        path (str): Путь к папке или файлу.
+
+    Returns:
+        str: Путь к точке монтирования.
+    """
+    path = os.path.realpath(os.path.abspath(path))
+
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+
+        if parent == path:
+            break
+
+        path = parent
+
+    while not os.path.ismount(path):
+        parent = os.path.dirname(path)
+
+        if parent == path:
+            break
+
+        path = parent
+
+    return path
+
+
+class StoragePlacement:
+    """
+    Распределяет новые записи по хранилищам с учётом прогноза заполнения дисков.
 
     Args:
         storages (list): Список словарей, каждый из которых представляет хранилище с
                          директорией и требуемым количеством свободного места.
         logger (logging.Logger): Логгер.
-
-    Returns:
-        str or None: Путь к выбранному хранилищу, или None, если не найдено подходящее хранилище.
+        refresh_seconds (float): Период обновления данных о занятости дисков.
+        default_bitrate (float): Битрейт записи в байтах в секунду, пока фактический неизвестен.
+        projection_seconds (float): Горизонт прогноза роста идущих записей в секундах.
     """
-    try:
-        for storage in storages:
+
+    def __init__(self, storages, logger, refresh_seconds, default_bitrate, projection_seconds):
+        self.storages = storages
+        self.logger = logger
+        self.refresh_seconds = refresh_seconds
+        self.default_bitrate = default_bitrate
+        self.projection_seconds = projection_seconds
+
+        self.lock = threading.Lock()
+        # Путь к хранилищу -> точка монтирования (словари из настроек не изменяются)
+        self.mount_points = {}
+        # Точка монтирования -> свободное место в байтах
+        self.disk_free = {}
+        self.refreshed_at = None
+        # Идущие записи: список резервов
+        self.reservations = []
+        # Последний измеренный битрейт по каналам
+        self.channel_bitrates = {}
+
+    def _refresh(self, now):
+        """Обновляет занятость дисков и битрейт идущих записей. Вызывается под блокировкой."""
+        disk_free = {}
+        mount_points = {}
+
+        for storage in self.storages:
             folder_path = storage['path']
-            required_free_space_gb = storage['required_free_space_gb']
+            mount_point = find_mount_point(folder_path)
+            mount_points[folder_path] = mount_point
 
-            root_path = os.path.splitdrive(folder_path)[0] + "/"
+            if mount_point in disk_free:
+                continue
+
+            try:
+                disk_free[mount_point] = psutil.disk_usage(mount_point).free
+            except OSError as err:
+                self.logger.error(f"Ошибка доступа к диску {mount_point}: {err}")
 
-            if not os.path.exists(root_path):
-                logger.error(f"Диск для {folder_path} не найден или недоступен.")
+        for reservation in self.reservations:
+            file_path = reservation['file_path']
+            elapsed = now - reservation['started_at']
 
+            if not file_path or elapsed < 60:
                 continue
 
             try:
-                disk_usage = psutil.disk_usage(root_path)
+                reservation['bitrate'] = os.path.getsize(file_path) / elapsed
+                self.channel_bitrates[reservation['user_name']] = reservation['bitrate']
+            except OSError:
+                pass
 
-                if disk_usage.free >= required_free_space_gb * (1024 ** 3):
-                    return folder_path
-            except OSError as err:
-                logger.error(f"Ошибка доступа к диску {root_path}: {err}")
+        self.mount_points = mount_points
+        self.disk_free = disk_free
+        self.refreshed_at = now
+
+    def _projected_free(self, mount_point, now):
+        """
+        Возвращает свободное место на диске за вычетом прогноза роста идущих на него записей.
+
+        Уже записанные данные учтены в свободном месте, поэтому резервируется только
+        оставшаяся до горизонта прогноза часть каждой записи.
+        """
+        reserved = sum(
+            reservation['bitrate'] * max(0, self.projection_seconds - (now - reservation['started_at']))
+            for reservation in self.reservations
+            if reservation['mount_point'] == mount_point
+        )
+
+        return self.disk_free[mount_point] - reserved
+
+    def choose_storage(self, user_name=None, exclude_mount_points=()):
+        """
+        Выбирает хранилище для новой записи и резервирует на нём место.
+
+        Выбираются только хранилища, на которых сейчас свободно не меньше
+        `required_free_space_gb`. Из них берётся хранилище с наибольшим запасом места
+        с учётом прогноза, а если прогноз не выдерживает ни одно — с наибольшим
+        свободным местом.
+
+        Args:
+            user_name (str, optional): Имя пользователя Twitch, чтобы учесть его прежний битрейт.
+            exclude_mount_points (Iterable, optional): Точки монтирования, которые нельзя выбирать.
+
+        Returns:
+            dict or None: Резерв с ключом `path` (путь к хранилищу) или None, если подходящее хранилище не найдено.
+        """
+        try:
+            with CHOOSE_STORAGE_DURATION.time(), self.lock:
+                now = time.monotonic()
+
+                if self.refreshed_at is None or now - self.refreshed_at >= self.refresh_seconds:
+                    self._refresh(now)
+
+                bitrate = self.channel_bitrates.get(user_name, self.default_bitrate)
+                # Хранилища, на которых сейчас достаточно места: (прогнозируемый запас, свободное место, хранилище)
+                candidates = []
+
+                for storage in self.storages:
+                    mount_point = self.mount_points.get(storage['path'])
+
+                    if mount_point in exclude_mount_points:
+                        continue
+
+                    if mount_point not in self.disk_free:
+                        self.logger.error(f"Диск для {storage['path']} не найден или недоступен.")
+
+                        continue
+
+                    required_bytes = storage['required_free_space_gb'] * GB
+                    free = self.disk_free[mount_point] - required_bytes
+
+                    if free < 0:
+                        continue
+
+                    headroom = self._projected_free(mount_point, now) - bitrate * self.projection_seconds - required_bytes
+                    candidates.append((headroom, free, storage))
+
+                if not candidates:
+                    self.logger.warning("Хранилища с необходимым объёмом свободного места не найдено.")
+
+                    return None
+
+                projected = [candidate for candidate in candidates if candidate[0] >= 0]
+
+                if projected:
+                    best_storage = max(projected, key=lambda candidate: candidate[0])[2]
+                else:
+                    best_storage = max(candidates, key=lambda candidate: candidate[1])[2]
+
+                reservation = {
+                    "path": best_storage['path'],
+                    "mount_point": self.mount_points[best_storage['path']],
+                    "user_name": user_name,
+                    "file_path": None,
+                    "started_at": now,
+                    "bitrate": bitrate
+                }
+                self.reservations.append(reservation)
+
+                return reservation
+        except Exception as err:
+            self.logger.error(f"Неизвестная ошибка при выборе хранилища: {err}")
+
+        return None
+
+    def set_channel_bitrates(self, bitrates):
+        """
+        Задаёт известный битрейт каналов, например по истории прошлых записей.
+
+        Args:
+            bitrates (dict): Имя стримера -> битрейт в байтах в секунду.
+        """
+        with self.lock:
+            self.channel_bitrates.update(bitrates)
+
+    def set_storages(self, storages):
+        """
+        Заменяет список хранилищ для новых записей.
+
+        Резервы идущих записей не меняются: запись на убранное хранилище продолжается,
+        пока не закончится или не перейдёт на другой диск. Данные о дисках обновятся
+        при следующем выборе хранилища.
+
+        Args:
+            storages (list): Новый список хранилищ в формате `config.storages`.
+        """
+        with self.lock:
+            self.storages = storages
+            self.refreshed_at = None
+
+    def set_file_path(self, reservation, file_path):
+        """
+        Привязывает файл записи к резерву, чтобы измерять фактический битрейт.
+
+        Args:
+            reservation (dict): Резерв, полученный от `choose_storage`.
+            file_path (str): Путь к файлу записи.
+        """
+        with self.lock:
+            reservation['file_path'] = file_path
 
-        logger.warning("Хранилища с необходимым объёмом свободного места не найдено.")
-    except Exception as err:
-        logger.error(f"Неизвестная ошибка при выборе хранилища: {err}")
+    def release(self, reservation):
+        """
+        Освобождает резерв после окончания записи.
 
-    return None
+        Args:
+            reservation (dict): Резерв, полученный от `choose_storage`.
+        """
+        with self.lock:
+            self.reservations = [item for item in self.reservations if item is not reservation]
@@ -0,0 +1,310 @@
+"""
+Модуль для распределения каналов между несколькими экземплярами программы записи.
+
+В режиме кластера каждый экземпляр (узел) регулярно отмечается в общем хранилище
+координации и видит список живых узлов. Каналы распределяются между живыми узлами
+по кольцу согласованного хеширования, поэтому при появлении или пропаже узла
+переезжает лишь небольшая доля каналов. Узел опрашивает только свои каналы.
+
+Кольцо лишь распределяет опрос. От повторной записи защищает аренда канала: перед
+началом записи узел захватывает аренду в хранилище и продлевает её при каждой
+отметке. Пока аренда действует, другой узел не начнёт запись канала, даже если по
+кольцу канал уже перешёл к нему. Аренды пропавшего узла истекают через
+`lease_seconds`, и его каналы подхватывают другие узлы. Узел, который не может
+продлить аренды дольше половины их срока, сам останавливает свои записи, причём
+и тогда, когда отметка не завершилась ошибкой, а просто задерживается. Отметки
+выполняются в отдельном потоке, чтобы их не задерживали другие блокирующие операции.
+Процессы streamlink, пережившие аварийную остановку узла, останавливаются при его
+перезапуске, если аренду их каналов уже захватил другой узел (см. `recover_recordings`).
+
+Хранилищем координации служит файл SQLite, доступный всем узлам (например, на
+общем диске). Сравнение сроков аренды предполагает синхронизированные часы узлов.
+
+Краткое описание классов:
+    - HashRing: Кольцо согласованного хеширования.
+    - ClusterCoordinator: Отметки узлов, распределение каналов и аренды записей.
+"""
+import time
+import bisect
+import asyncio
+import sqlite3
+import hashlib
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+BUSY_TIMEOUT_SECONDS = 5
+
+
+def _hash(value):
+    """Возвращает 64-битный хеш строки."""
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """
+    Кольцо согласованного хеширования.
+
+    Каждый узел занимает на кольце `virtual_nodes` точек, что выравнивает число
+    каналов на узлах. Канал принадлежит первому узлу по часовой стрелке от хеша канала.
+
+    Краткое описание функций:
+        - owner: Возвращает узел, которому принадлежит ключ.
+
+    Args:
+        nodes (Iterable): Идентификаторы узлов.
+        virtual_nodes (int): Количество точек каждого узла на кольце.
+    """
+
+    def __init__(self, nodes, virtual_nodes):
+        points = sorted(
+            (_hash(f"{node}#{index}"), node)
+            for node in nodes
+            for index in range(virtual_nodes)
+        )
+        self.nodes = frozenset(nodes)
+        self.hashes = [point for point, _ in points]
+        self.owners = [node for _, node in points]
+
+    def owner(self, key):
+        """
+        Возвращает узел, которому принадлежит ключ.
+
+        Args:
+            key (str): Ключ, например ID канала.
+
+        Returns:
+            str or None: Идентификатор узла или None, если узлов нет.
+        """
+        if not self.hashes:
+            return None
+
+        index = bisect.bisect(self.hashes, _hash(key)) % len(self.hashes)
+
+        return self.owners[index]
+
+
+class ClusterCoordinator:
+    """
+    Отметки узлов, распределение каналов и аренды записей в общем хранилище SQLite.
+
+    Краткое описание функций:
+        - heartbeat: Отмечает узел, продлевает его аренды и обновляет кольцо.
+        - owns: Проверяет, принадлежит ли канал этому узлу.
+        - acquire: Захватывает аренду канала перед началом записи.
+        - release: Освобождает аренду канала после окончания записи.
+        - run_heartbeat_loop: Корутина регулярных отметок узла.
+
+    Args:
+        store_path (str): Путь к файлу SQLite хранилища координации.
+        node_id (str): Идентификатор узла, одинаковый между перезапусками.
+        heartbeat_seconds (float): Период отметок узла.
+        lease_seconds (float): Срок аренды и время, после которого узел без отметок считается пропавшим.
+        virtual_nodes (int): Количество точек каждого узла на кольце.
+        main_logger (logging.Logger): Логгер.
+    """
+
+    def __init__(self, store_path, node_id, heartbeat_seconds, lease_seconds, virtual_nodes, main_logger):
+        self.node_id = node_id
+        self.heartbeat_seconds = heartbeat_seconds
+        self.lease_seconds = lease_seconds
+        self.virtual_nodes = virtual_nodes
+        self.logger = main_logger.getChild('cluster')
+
+        # Хранилище может лежать на общем диске, где режим WAL не работает
+        self.conn = sqlite3.connect(
+            store_path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None, check_same_thread=False
+        )
+        self.lock = threading.Lock()
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS nodes (
+                node_id TEXT PRIMARY KEY,
+                heartbeat_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS channel_leases (
+                user_id TEXT PRIMARY KEY,
+                node_id TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+        ''')
+
+        self.ring = HashRing((), virtual_nodes)
+        # Каналы, аренду которых держит этот узел
+        self.held = set()
+        # Время начала последней успешной отметки (time.monotonic): от него отсчитываются аренды
+        self.last_heartbeat_ok = None
+        # Отдельный поток для отметок, чтобы их не задерживал общий пул потоков
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cluster")
+
+    def heartbeat(self):
+        """
+        Отмечает узел, продлевает его аренды и обновляет кольцо по списку живых узлов.
+
+        Метод выполняет блокирующие запросы к SQLite и должен вызываться вне событийного цикла.
+
+        Returns:
+            set: Каналы, аренду которых узел потерял (её захватил другой узел).
+        """
+        started = time.monotonic()
+        now = time.time()
+
+        with self.lock:
+            held = list(self.held)
+
+            self.conn.execute("BEGIN IMMEDIATE")
+
+            try:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO nodes (node_id, heartbeat_at) VALUES (?, ?)",
+                    (self.node_id, now)
+                )
+                self.conn.executemany(
+                    "UPDATE channel_leases SET expires_at = ? WHERE user_id = ? AND node_id = ?",
+                    [(now + self.lease_seconds, user_id, self.node_id) for user_id in held]
+                )
+                renewed = {
+                    user_id for (user_id,) in self.conn.execute(
+                        "SELECT user_id FROM channel_leases WHERE node_id = ?", (self.node_id,)
+                    )
+                }
+                nodes = [
+                    node_id for (node_id,) in self.conn.execute(
+                        "SELECT node_id FROM nodes WHERE heartbeat_at >= ?", (now - self.lease_seconds,)
+                    )
+                ]
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+
+                raise
+
+            lost = set(held) - renewed
+            self.held -= lost
+
+        if set(nodes) != self.ring.nodes:
+            self.logger.info(f"Узлы кластера: {', '.join(sorted(nodes))}.")
+
+        self.ring = HashRing(nodes, self.virtual_nodes)
+        # Аренды продлены от момента начала отметки, а не её окончания
+        self.last_heartbeat_ok = started
+
+        return lost
+
+    def owns(self, user_id):
+        """
+        Проверяет, принадлежит ли канал этому узлу по кольцу.
+
+        Args:
+            user_id (str): ID канала.
+
+        Returns:
+            bool: True, если канал должен опрашивать этот узел.
+        """
+        return self.ring.owner(str(user_id)) == self.node_id
+
+    def acquire(self, user_id):
+        """
+        Захватывает аренду канала перед началом записи.
+
+        Аренда захватывается, если её нет, она истекла или уже принадлежит этому узлу.
+
+        Args:
+            user_id (str): ID канала.
+
+        Returns:
+            bool: True, если аренда захвачена и канал можно записывать.
+        """
+        user_id = str(user_id)
+        now = time.time()
+
+        with self.lock:
+            cursor = self.conn.execute('''
+                INSERT INTO channel_leases (user_id, node_id, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT (user_id) DO UPDATE SET node_id = excluded.node_id, expires_at = excluded.expires_at
+                WHERE channel_leases.node_id = excluded.node_id OR channel_leases.expires_at < ?
+            ''', (user_id, self.node_id, now + self.lease_seconds, now))
+
+            if cursor.rowcount:
+                self.held.add(user_id)
+
+                return True
+
+        return False
+
+    def release(self, user_id):
+        """
+        Освобождает аренду канала после окончания записи.
+
+        Args:
+            user_id (str): ID канала.
+        """
+        user_id = str(user_id)
+
+        with self.lock:
+            self.held.discard(user_id)
+            self.conn.execute(
+                "DELETE FROM channel_leases WHERE user_id = ? AND node_id = ?", (user_id, self.node_id)
+            )
+
+    def _stop_if_stale(self, on_leases_lost):
+        """
+        Останавливает записи узла, если последняя успешная отметка старше половины срока аренды.
+
+        Args:
+            on_leases_lost (Callable): Вызывается с множеством каналов, записи которых нужно остановить.
+        """
+        since_ok = time.monotonic() - (self.last_heartbeat_ok or 0)
+
+        if since_ok < self.lease_seconds / 2 or not (self.held or self.ring.nodes):
+            return
+
+        self.logger.error(
+            f"Узел не отмечался {since_ok:.1f} с, связь с хранилищем кластера потеряна, записи узла остановлены."
+        )
+
+        with self.lock:
+            lost, self.held = set(self.held), set()
+
+        self.ring = HashRing((), self.virtual_nodes)
+        on_leases_lost(lost)
+
+    async def run_heartbeat_loop(self, on_leases_lost):
+        """
+        Корутина регулярных отметок узла.
+
+        Отметка выполняется в отдельном потоке, а её возраст проверяется не реже
+        раза в `heartbeat_seconds`, даже пока отметка не завершилась. Если узел не
+        может отметиться дольше половины срока аренды (из-за ошибки или задержки),
+        он перестаёт опрашивать каналы и останавливает все свои записи, чтобы они
+        не повторились на узле, который подхватит его каналы.
+
+        Args:
+            on_leases_lost (Callable): Вызывается с множеством каналов, записи которых нужно остановить.
+        """
+        loop = asyncio.get_running_loop()
+
+        while True:
+            started = time.monotonic()
+            heartbeat = loop.run_in_executor(self.executor, self.heartbeat)
+
+            while True:
+                done, _ = await asyncio.wait({heartbeat}, timeout=self.heartbeat_seconds)
+
+                if done:
+                    break
+
+                self._stop_if_stale(on_leases_lost)
+
+            try:
+                lost = heartbeat.result()
+
+                if lost:
+                    self.logger.error(f"Аренда каналов перешла к другим узлам: {', '.join(sorted(lost))}.")
+                    on_leases_lost(lost)
+            except Exception as err:
+                self.logger.error(f"Ошибка при отметке узла кластера: {err}")
+
+            self._stop_if_stale(on_leases_lost)
+
+            await asyncio.sleep(max(0, self.heartbeat_seconds - (time.monotonic() - started)))
@@ -1,9 +1,75 @@
 log_folder = "logs/live_broadcasts"
 
+# Журнал пишется в файл recorder.log в папке log_folder. Файл ротируется
+# по размеру log_max_size_mb или, если задан log_rotate_when (например,
+# "midnight"), по времени; хранится log_backup_count старых файлов.
+# log_json = True включает вывод в формате JSON, по одной записи на строку.
+log_max_size_mb = 50
+log_backup_count = 10
+log_rotate_when = None
+log_json = False
+
+# Работа без окна (например, на сервере или в контейнере). Можно также
+# запустить программу с аргументом --headless.
+headless = False
+
+# HTTP-эндпоинт состояния: идущие записи, их длительность и размер, состояние
+# опроса каналов в формате JSON по адресу http://status_host:status_port/status
+# и метрики в формате Prometheus по адресу http://status_host:status_port/metrics.
+# Для нескольких экземпляров на одном сервере укажите разные порты
+# (или аргумент --status-port).
+status_enabled = False
+status_host = "127.0.0.1"
+status_port = 8090
+
 # API
 client_id = "your_client_id_here"
 client_secret = "your_client_secret_here"
 
+# Адреса Twitch API. Меняются только для нагрузочного тестирования
+# с локальной заглушкой Helix (см. benchmark/run_benchmark.py).
+helix_url = "https://api.twitch.tv/helix"
+oauth_token_url = "https://id.twitch.tv/oauth2/token"
+
+# Файл для сохранения токена доступа между перезапусками
+token_path = "token.json"
+
+# Минимальный интервал между проверками статуса каналов в секундах.
+# Фактический темп опроса ограничивается бюджетом запросов Twitch API.
+min_poll_interval_seconds = 1
+
+# Интервалы опроса каналов в секундах. Горячими считаются каналы, у которых
+# сейчас привычное (по истории записей) время начала трансляции,
+# остальные каналы опрашиваются реже.
+hot_poll_interval_seconds = 1
+cold_poll_interval_seconds = 30
+
+# Получение уведомлений о начале трансляций через Twitch EventSub.
+# Адрес eventsub_callback_url должен быть доступен из интернета по HTTPS
+# (например, через обратный прокси на eventsub_host:eventsub_port).
+# При включённом EventSub опрос каналов выполняется только для сверки,
+# раз в eventsub_reconcile_interval_seconds.
+eventsub_enabled = False
+eventsub_callback_url = "https://example.com/eventsub"
+eventsub_secret = "your_eventsub_secret_here"
+eventsub_host = "0.0.0.0"
+eventsub_port = 8080
+eventsub_reconcile_interval_seconds = 300
+
+# Режим кластера: несколько экземпляров программы делят список каналов.
+# Каждый узел отмечается в общем файле cluster_store_path (например, на общем
+# диске) раз в cluster_heartbeat_seconds и опрашивает только свои каналы.
+# Запись канала защищена арендой на cluster_lease_seconds, поэтому канал не
+# записывается дважды, а каналы пропавшего узла подхватываются остальными
+# после истечения его аренд. cluster_node_id должен быть уникальным и не
+# меняться между перезапусками (None — имя компьютера, аргумент --node-id).
+cluster_enabled = False
+cluster_node_id = None
+cluster_store_path = "cluster.db"
+cluster_heartbeat_seconds = 2
+cluster_lease_seconds = 10
+cluster_virtual_nodes = 64
+
 # Время смещения от UTC (можно использовать отрицательные числа)
 utc_offset_hours = 0
 
@@ -19,6 +85,16 @@ user_identifiers = [
     "987654321",    # ID пользователя (число в формате строки)
 ]
 
+# Список каналов (user_identifiers) и список хранилищ (storages) можно менять
+# без перезапуска: файл настроек проверяется раз в config_reload_interval_seconds
+# секунд, изменения применяются к опросу, а идущие записи продолжаются.
+# Остальные настройки вступают в силу после перезапуска. 0 — не проверять.
+config_reload_interval_seconds = 10
+
+# Срок хранения соответствия ника и ID пользователя в базе данных в часах.
+# При запуске через API запрашиваются только новые и устаревшие ники.
+user_id_cache_ttl_hours = 24
+
 # Список хранилищ для записи стримов. Каждый элемент представляет собой
 # словарь с информацией о пути к хранилищу и минимальном требуемом
 # свободном пространстве на диске в гигабайтах.
@@ -26,3 +102,74 @@ storages = [
     {"path": "/path/to/storage1", "required_free_space_gb": 200},
     {"path": "/path/to/storage2", "required_free_space_gb": 100}
 ]
+
+# Новая запись направляется в хранилище с наибольшим запасом места с учётом
+# ожидаемого роста уже идущих записей. Рост оценивается по битрейту записи
+# (до первых измерений используется default_recording_bitrate_mbps)
+# на storage_projection_hours вперёд. Данные о дисках обновляются
+# не чаще раза в storage_usage_refresh_seconds.
+default_recording_bitrate_mbps = 8
+storage_projection_hours = 6
+storage_usage_refresh_seconds = 30
+
+# Во время записи диск проверяется раз в storage_check_interval_seconds.
+# Если свободного места меньше failover_min_free_space_gb или диск недоступен,
+# запись продолжается в новую часть на другом хранилище. Старая и новая части
+# пишутся одновременно part_overlap_seconds, чтобы не потерять данные.
+storage_check_interval_seconds = 10
+failover_min_free_space_gb = 5
+part_overlap_seconds = 5
+
+# Сегментированная запись: трансляция записывается частями, новая часть
+# начинается каждые segment_duration_minutes минут или после segment_size_gb
+# гигабайт. Закрытые части сразу отмечаются в базе данных и доступны для
+# обработки. 0 — без ограничения (вся трансляция пишется в один файл).
+segment_duration_minutes = 0
+segment_size_gb = 0
+
+# Контроль скорости записи. Если файл записи не растёт stall_timeout_seconds
+# секунд, streamlink перезапускается и запись продолжается в новую часть
+# (не больше max_stall_restarts раз подряд, затем запись останавливается).
+# Падение битрейта ниже bitrate_drop_ratio от среднего по записи отмечается
+# в логе. Раз в bitrate_history_interval_seconds битрейт сохраняется в базу,
+# а история за bitrate_history_days дней используется при выборе хранилища.
+stall_timeout_seconds = 120
+max_stall_restarts = 3
+bitrate_drop_ratio = 0.25
+bitrate_history_interval_seconds = 60
+bitrate_history_days = 30
+
+# Запись через процесс-писатель (только Linux и другие POSIX-системы): streamlink
+# отдаёт поток в stdout, а recording_writer.py пишет его в файл блоками по
+# writer_block_size_mb, заранее выделяя место порциями по writer_preallocate_mb,
+# чтобы файлы параллельных записей не фрагментировались. Раз в writer_fsync_mb
+# данные сбрасываются на диск и, если включён writer_drop_cache, убираются из кэша
+# страниц. Неполный блок пишется не реже раза в writer_flush_seconds.
+# False — streamlink пишет в файл сам.
+recording_writer_enabled = True
+writer_block_size_mb = 4
+writer_preallocate_mb = 256
+writer_fsync_mb = 64
+writer_drop_cache = True
+writer_flush_seconds = 5
+
+# Быстрое переподключение. Когда streamlink завершается, канал сразу проверяется
+# повторно с паузами из reconnect_probe_delays_seconds (в секундах). Если та же
+# трансляция ещё в эфире, запись продолжается в следующую часть той же трансляции,
+# а пропуск между частями сохраняется в базе данных. Пустой список — не переподключаться.
+reconnect_probe_delays_seconds = [1, 2, 3, 5, 8]
+
+# Фоновая обработка закрытых частей записи: перепаковка в MP4 с faststart,
+# определение длительности и миниатюра. Одновременно выполняется не больше
+# postprocess_max_workers процессов ffmpeg с пониженным приоритетом.
+postprocess_enabled = True
+postprocess_max_workers = 2
+ffmpeg_path = "ffmpeg"
+ffprobe_path = "ffprobe"
+
+# Каталог записей: файлы на хранилищах связываются с трансляциями в базе данных,
+# а по названиям трансляций и именам стримеров работает полнотекстовый поиск
+# (python catalog.py search "текст"). Каталог обновляется раз в
+# catalog_scan_interval_minutes минут, читаются только изменившиеся папки.
+# 0 — только вручную (python catalog.py scan).
+catalog_scan_interval_minutes = 30
@@ -0,0 +1,134 @@
+"""
+Модуль для применения изменений настроек без перезапуска программы.
+
+Перезапуск программы останавливает все процессы streamlink и теряет минуты каждой
+идущей трансляции. Поэтому список каналов и список хранилищ можно менять в
+`config.py` на ходу: файл периодически проверяется, и если время его изменения
+поменялось, он выполняется в отдельном пространстве имён, не затрагивая
+загруженный модуль `config`. Из него берутся только настройки из `RELOADABLE_SETTINGS`,
+остальные изменения вступают в силу после перезапуска.
+
+Краткое описание функций:
+    - load_reloadable_settings: Читает перезагружаемые настройки из файла настроек.
+
+Краткое описание классов:
+    - ConfigReloader: Отслеживает изменения файла настроек.
+"""
+import os
+import runpy
+import asyncio
+
+
+RELOADABLE_SETTINGS = ("user_identifiers", "storages")
+
+
+def load_reloadable_settings(config_path):
+    """
+    Читает перезагружаемые настройки из файла настроек.
+
+    Args:
+        config_path (str): Путь к `config.py`.
+
+    Returns:
+        dict: Имя настройки -> значение.
+
+    Raises:
+        Exception: Если файл не выполняется (например, из-за синтаксической ошибки).
+        ValueError: Если настройки заданы неверно.
+    """
+    namespace = runpy.run_path(config_path)
+    settings = {name: namespace.get(name) for name in RELOADABLE_SETTINGS}
+
+    if not isinstance(settings['user_identifiers'], (list, tuple)):
+        raise ValueError("user_identifiers должен быть списком.")
+
+    if not isinstance(settings['storages'], (list, tuple)) or not all(
+        isinstance(storage, dict) and 'path' in storage and 'required_free_space_gb' in storage
+        for storage in settings['storages']
+    ):
+        raise ValueError("storages должен быть списком словарей с ключами path и required_free_space_gb.")
+
+    return settings
+
+
+class ConfigReloader:
+    """
+    Отслеживает изменения файла настроек.
+
+    Краткое описание функций:
+        - check: Возвращает изменившиеся перезагружаемые настройки.
+        - run_reload_loop: Корутина регулярной проверки файла настроек.
+
+    Args:
+        config_module (module): Загруженный модуль настроек, от значений которого считаются изменения.
+        interval_seconds (float): Период проверки файла.
+        main_logger (logging.Logger): Логгер.
+    """
+
+    def __init__(self, config_module, interval_seconds, main_logger):
+        self.config_path = config_module.__file__
+        self.interval_seconds = interval_seconds
+        self.logger = main_logger.getChild('config_reloader')
+
+        self.settings = {name: getattr(config_module, name) for name in RELOADABLE_SETTINGS}
+        self.mtime_ns = self._mtime_ns()
+
+    def _mtime_ns(self):
+        """Возвращает время изменения файла настроек или None, если файл недоступен."""
+        try:
+            return os.stat(self.config_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def check(self):
+        """
+        Перечитывает файл настроек, если он изменился, и возвращает изменившиеся настройки.
+
+        Если файл не выполняется или настройки заданы неверно, ошибка записывается
+        в лог, а прежние настройки остаются в силе до следующего сохранения файла.
+        Настройки считаются применёнными, только когда `run_reload_loop` успешно
+        передал их обработчику; если применить их не удалось, файл перечитывается снова.
+
+        Returns:
+            dict: Имя настройки -> новое значение. Пустой, если ничего не изменилось.
+        """
+        mtime_ns = self._mtime_ns()
+
+        if mtime_ns is None or mtime_ns == self.mtime_ns:
+            return {}
+
+        self.mtime_ns = mtime_ns
+
+        try:
+            settings = load_reloadable_settings(self.config_path)
+        except Exception as err:
+            self.logger.error(f"Ошибка в файле настроек, изменения не применены: {err}")
+
+            return {}
+
+        return {name: value for name, value in settings.items() if value != self.settings[name]}
+
+    async def run_reload_loop(self, apply_changes):
+        """
+        Корутина регулярной проверки файла настроек.
+
+        Args:
+            apply_changes (Callable): Корутина, которая получает словарь изменившихся настроек.
+        """
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+
+            try:
+                changes = await asyncio.to_thread(self.check)
+
+                if changes:
+                    self.logger.info(f"Файл настроек изменён: {', '.join(changes)}.")
+
+                # Настройки применяются по одной, чтобы ошибка в одной не откатывала другие
+                for name, value in changes.items():
+                    await apply_changes({name: value})
+                    self.settings[name] = value
+            except Exception as err:
+                # Файл будет перечитан при следующей проверке
+                self.mtime_ns = None
+                self.logger.error(f"Ошибка при применении изменений настроек: {err}")
@@ -0,0 +1,204 @@
+"""
+Модуль для работы с базой данных SQLite из нескольких потоков.
+
+Все изменения базы выполняются одним потоком-писателем через одно долгоживущее
+соединение в режиме WAL. Остальные потоки только ставят запросы в очередь и не
+ждут блокировки базы, а писатель выполняет накопившиеся запросы пачкой в одной
+транзакции. Для чтения каждый поток получает своё соединение, которое в режиме
+WAL не мешает писателю.
+
+Краткое описание классов:
+    - Database: Очередь записи с одним потоком-писателем и соединения для чтения.
+"""
+import time
+import queue
+import sqlite3
+import threading
+
+from concurrent.futures import Future
+
+from metrics import DB_QUEUE_SIZE, DB_WRITE_LATENCY
+
+
+# Сколько запросов писатель выполняет в одной транзакции и сколько ждёт их накопления
+MAX_BATCH_SIZE = 500
+BATCH_WINDOW_SECONDS = 0.05
+
+BUSY_TIMEOUT_MS = 5000
+
+_STOP = object()
+
+
+def connect(database_path):
+    """
+    Открывает соединение с базой в режиме WAL.
+
+    Args:
+        database_path (str): Путь к файлу базы данных.
+
+    Returns:
+        sqlite3.Connection: Соединение с базой данных.
+    """
+    conn = sqlite3.connect(database_path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+
+    return conn
+
+
+class Database:
+    """
+    Очередь записи в SQLite с одним потоком-писателем и соединения для чтения.
+
+    Краткое описание функций:
+        - start: Запускает поток-писатель.
+        - write: Ставит один запрос на изменение в очередь.
+        - write_many: Ставит запрос с набором параметров в очередь.
+        - read: Выполняет запрос на чтение в соединении текущего потока.
+        - close: Дожидается выполнения очереди и останавливает писатель.
+
+    Args:
+        database_path (str): Путь к файлу базы данных.
+        main_logger (logging.Logger): Логгер.
+    """
+
+    def __init__(self, database_path, main_logger):
+        self.database_path = database_path
+        self.logger = main_logger.getChild('database')
+        self.queue = queue.SimpleQueue()
+        self.readers = threading.local()
+        self.writer_thread = None
+
+    def start(self):
+        """Запускает поток-писатель. Вызывается после применения миграций схемы."""
+        self.writer_thread = threading.Thread(target=self._run_writer, name="database_writer", daemon=True)
+        self.writer_thread.start()
+
+    def write(self, sql, params=()):
+        """
+        Ставит запрос на изменение в очередь и сразу возвращает управление.
+
+        Args:
+            sql (str): SQL-запрос.
+            params (tuple): Параметры запроса.
+
+        Returns:
+            concurrent.futures.Future: Результат с `lastrowid` запроса после фиксации транзакции.
+        """
+        future = self._new_future()
+        self.queue.put((sql, params, False, future))
+
+        return future
+
+    def write_many(self, sql, seq_of_params):
+        """
+        Ставит запрос с набором параметров в очередь и сразу возвращает управление.
+
+        Args:
+            sql (str): SQL-запрос.
+            seq_of_params (Iterable): Наборы параметров запроса.
+
+        Returns:
+            concurrent.futures.Future: Результат с количеством изменённых строк после фиксации транзакции.
+        """
+        future = self._new_future()
+        self.queue.put((sql, list(seq_of_params), True, future))
+
+        return future
+
+    @staticmethod
+    def _new_future():
+        """Создаёт результат запроса, который учитывает время ожидания в очереди и выполнения."""
+        future = Future()
+        queued_at = time.perf_counter()
+        future.add_done_callback(lambda _: DB_WRITE_LATENCY.observe(time.perf_counter() - queued_at))
+
+        return future
+
+    def read(self, sql, params=()):
+        """
+        Выполняет запрос на чтение в соединении текущего потока.
+
+        Args:
+            sql (str): SQL-запрос.
+            params (tuple): Параметры запроса.
+
+        Returns:
+            list: Строки результата.
+        """
+        conn = getattr(self.readers, "conn", None)
+
+        if conn is None:
+            conn = connect(self.database_path)
+            conn.execute("PRAGMA query_only=ON")
+            self.readers.conn = conn
+
+        return conn.execute(sql, params).fetchall()
+
+    def close(self):
+        """Дожидается выполнения всех запросов из очереди и останавливает поток-писатель."""
+        if self.writer_thread and self.writer_thread.is_alive():
+            self.queue.put(_STOP)
+            self.writer_thread.join()
+
+    def _collect_batch(self):
+        """Ожидает первый запрос и добирает к нему те, что успели накопиться."""
+        batch = [self.queue.get()]
+        DB_QUEUE_SIZE.set(self.queue.qsize())
+        deadline = time.monotonic() + BATCH_WINDOW_SECONDS
+
+        while len(batch) < MAX_BATCH_SIZE and batch[-1] is not _STOP:
+            try:
+                batch.append(self.queue.get(timeout=max(0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+
+        return batch
+
+    @staticmethod
+    def _execute(conn, item):
+        """Выполняет один запрос из очереди и возвращает его результат."""
+        sql, params, many, _ = item
+
+        if many:
+            return conn.executemany(sql, params).rowcount
+
+        return conn.execute(sql, params).lastrowid
+
+    def _run_writer(self):
+        """Цикл потока-писателя: выполняет запросы пачками в одной транзакции."""
+        conn = connect(self.database_path)
+        conn.isolation_level = None
+
+        while True:
+            batch = self._collect_batch()
+            stop = batch[-1] is _STOP
+            items = [item for item in batch if item is not _STOP]
+
+            try:
+                conn.execute("BEGIN")
+                results = [self._execute(conn, item) for item in items]
+                conn.execute("COMMIT")
+
+                for item, result in zip(items, results):
+                    item[3].set_result(result)
+            except sqlite3.Error as err:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+
+                self.logger.warning(f"Ошибка в пачке из {len(items)} запросов, выполнение по одному: {err}")
+
+                # Ошибочный запрос не должен отменять остальные запросы пачки
+                for item in items:
+                    try:
+                        result = self._execute(conn, item)
+                        item[3].set_result(result)
+                    except sqlite3.Error as item_err:
+                        self.logger.error(f"Ошибка при записи в базу данных: {item_err}")
+                        item[3].set_exception(item_err)
+
+            if stop:
+                conn.close()
+
+                return
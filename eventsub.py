@@ -0,0 +1,289 @@
+"""
+Модуль для получения уведомлений Twitch EventSub о начале и окончании трансляций.
+
+EventSub присылает уведомления `stream.online` и `stream.offline` на HTTP-адрес
+приложения сразу после изменения статуса канала, поэтому запись начинается без
+ожидания очередного цикла опроса. Опрос `helix/streams` при этом остаётся
+редкой сверкой на случай пропущенных уведомлений.
+
+Приёмник работает в общем событийном цикле на `asyncio.start_server` и проверяет
+подпись каждого сообщения (HMAC-SHA256 от id сообщения, времени и тела запроса).
+
+Краткое описание функций:
+    - build_signature: Вычисляет подпись сообщения EventSub.
+    - verify_message: Проверяет подпись и свежесть сообщения EventSub.
+    - stream_data_from_event: Преобразует событие stream.online в формат данных helix/streams.
+    - start_eventsub_server: Запускает HTTP-приёмник уведомлений EventSub.
+    - sync_subscriptions: Приводит подписки EventSub в соответствие со списком каналов.
+"""
+import hmac
+import json
+import time
+import asyncio
+import hashlib
+
+from datetime import datetime, timezone
+
+from twitch_api import HELIX_URL, get_session
+from http_utils import read_request, write_response
+
+
+HELIX_SUBSCRIPTIONS_URL = f"{HELIX_URL}/eventsub/subscriptions"
+
+SUBSCRIPTION_TYPES = ("stream.online", "stream.offline")
+
+# Сообщения старше этого возраста отклоняются, чтобы исключить их повторную отправку
+MAX_MESSAGE_AGE_SECONDS = 600
+# Сколько последних id сообщений хранится для отсеивания повторов
+MAX_REMEMBERED_MESSAGE_IDS = 10000
+MAX_REQUEST_BODY_BYTES = 1024 * 1024
+
+
+def build_signature(secret, message_id, timestamp, body):
+    """
+    Вычисляет подпись сообщения EventSub.
+
+    Args:
+        secret (str): Секрет, указанный при создании подписки.
+        message_id (str): Значение заголовка `Twitch-Eventsub-Message-Id`.
+        timestamp (str): Значение заголовка `Twitch-Eventsub-Message-Timestamp`.
+        body (bytes): Тело запроса.
+
+    Returns:
+        str: Подпись в формате `sha256=<hex>`.
+    """
+    digest = hmac.new(
+        secret.encode('utf-8'),
+        message_id.encode('utf-8') + timestamp.encode('utf-8') + body,
+        hashlib.sha256
+    ).hexdigest()
+
+    return f"sha256={digest}"
+
+
+def _parse_timestamp(timestamp):
+    """Разбирает время RFC3339 из EventSub, где доли секунды могут быть с точностью до наносекунд."""
+    value = timestamp.rstrip('Z')
+    whole, _, fraction = value.partition('.')
+
+    return datetime.fromisoformat(f"{whole}.{fraction[:6].ljust(6, '0')}").replace(tzinfo=timezone.utc)
+
+
+def verify_message(secret, headers, body):
+    """
+    Проверяет подпись и свежесть сообщения EventSub.
+
+    Args:
+        secret (str): Секрет, указанный при создании подписки.
+        headers (dict): Заголовки запроса с именами в нижнем регистре.
+        body (bytes): Тело запроса.
+
+    Returns:
+        bool: True, если подпись верна и сообщение не устарело.
+    """
+    message_id = headers.get('twitch-eventsub-message-id')
+    timestamp = headers.get('twitch-eventsub-message-timestamp')
+    signature = headers.get('twitch-eventsub-message-signature')
+
+    if not message_id or not timestamp or not signature:
+        return False
+
+    try:
+        sent_at = _parse_timestamp(timestamp)
+    except ValueError:
+        return False
+
+    if abs((datetime.now(timezone.utc) - sent_at).total_seconds()) > MAX_MESSAGE_AGE_SECONDS:
+        return False
+
+    return hmac.compare_digest(build_signature(secret, message_id, timestamp, body), signature)
+
+
+def stream_data_from_event(event):
+    """
+    Преобразует событие stream.online в формат данных трансляции из helix/streams.
+
+    В событии нет названия трансляции, поэтому поле `title` остаётся пустым:
+    его дописывает `fill_broadcast_title` после начала записи.
+
+    Args:
+        event (dict): Поле `event` уведомления stream.online.
+
+    Returns:
+        dict: Данные трансляции в формате helix/streams.
+    """
+    return {
+        "id": event['id'],
+        "user_id": event['broadcaster_user_id'],
+        "user_login": event['broadcaster_user_login'],
+        "user_name": event['broadcaster_user_name'],
+        "type": event.get('type', 'live'),
+        "title": "",
+        "started_at": event.get('started_at')
+    }
+
+
+async def start_eventsub_server(host, port, secret, on_stream_online, on_stream_offline, main_logger):
+    """
+    Запускает HTTP-приёмник уведомлений EventSub в текущем событийном цикле.
+
+    Args:
+        host (str): Адрес для прослушивания.
+        port (int): Порт для прослушивания.
+        secret (str): Секрет, указанный при создании подписок.
+        on_stream_online (Callable): Вызывается с данными трансляции при событии stream.online.
+        on_stream_offline (Callable): Вызывается с полем `event` при событии stream.offline.
+        main_logger (logging.Logger): Логгер.
+
+    Returns:
+        asyncio.Server: Запущенный сервер.
+    """
+    logger = main_logger.getChild('eventsub')
+    seen_message_ids = {}
+
+    async def handle(reader, writer):
+        try:
+            method, _, headers, body = await read_request(reader, MAX_REQUEST_BODY_BYTES)
+
+            if method != 'POST':
+                await write_response(writer, 405)
+
+                return
+
+            if not verify_message(secret, headers, body):
+                logger.warning("Отклонено сообщение EventSub с неверной подписью.")
+                await write_response(writer, 403)
+
+                return
+
+            message_id = headers['twitch-eventsub-message-id']
+
+            if message_id in seen_message_ids:
+                await write_response(writer, 204)
+
+                return
+
+            seen_message_ids[message_id] = time.monotonic()
+
+            if len(seen_message_ids) > MAX_REMEMBERED_MESSAGE_IDS:
+                # Словарь сохраняет порядок вставки, удаляем самые старые id
+                for old_message_id in list(seen_message_ids)[:MAX_REMEMBERED_MESSAGE_IDS // 2]:
+                    del seen_message_ids[old_message_id]
+
+            payload = json.loads(body)
+            message_type = headers.get('twitch-eventsub-message-type')
+
+            if message_type == 'webhook_callback_verification':
+                await write_response(writer, 200, payload['challenge'].encode('utf-8'))
+
+                return
+
+            # Twitch ждёт ответ в течение нескольких секунд, поэтому отвечаем до обработки события
+            await write_response(writer, 204)
+
+            subscription_type = payload.get('subscription', {}).get('type')
+
+            if message_type == 'revocation':
+                logger.warning(f"Подписка EventSub {subscription_type} отозвана: "
+                               f"{payload.get('subscription', {}).get('status')}")
+            elif message_type == 'notification' and subscription_type == 'stream.online':
+                on_stream_online(stream_data_from_event(payload['event']))
+            elif message_type == 'notification' and subscription_type == 'stream.offline':
+                on_stream_offline(payload['event'])
+        except (ValueError, KeyError, asyncio.IncompleteReadError) as err:
+            logger.error(f"Некорректный запрос EventSub: {err}")
+
+            if not writer.is_closing():
+                await write_response(writer, 400)
+        except Exception as err:
+            logger.error(f"Ошибка при обработке сообщения EventSub: {err}")
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    logger.info(f"Приёмник EventSub запущен на {host}:{port}.")
+
+    return server
+
+
+def sync_subscriptions(user_ids, callback_url, secret, headers, limiter, main_logger):
+    """
+    Приводит подписки EventSub в соответствие со списком каналов.
+
+    Создаёт недостающие подписки stream.online и stream.offline и удаляет подписки
+    на каналы, которых больше нет в списке. Подписки в состоянии `*_pending`
+    (например, ещё ждущие подтверждения адреса) считаются созданными. Удаление
+    выполняется после просмотра всех страниц, чтобы не сдвигать постраничную выдачу.
+    Подписки требуют токен приложения.
+
+    Args:
+        user_ids (Iterable): Идентификаторы пользователей, за которыми нужно следить.
+        callback_url (str): Публичный HTTPS-адрес приёмника EventSub.
+        secret (str): Секрет для подписи сообщений.
+        headers (dict): Заголовки для запроса, включая Client-ID и Authorization.
+        limiter (RateLimiter): Ограничитель частоты запросов к API.
+        main_logger (logging.Logger): Логгер.
+
+    Raises:
+        requests.exceptions.RequestException: Если запрос к API завершился ошибкой.
+    """
+    logger = main_logger.getChild('eventsub')
+    session = get_session()
+    wanted = {(str(user_id), subscription_type) for user_id in user_ids for subscription_type in SUBSCRIPTION_TYPES}
+    existing = {}
+    # Повторные и нерабочие подписки удаляются и при необходимости создаются заново
+    broken_ids = []
+    cursor = None
+
+    while True:
+        params = {"after": cursor} if cursor else {}
+
+        limiter.wait()
+        response = session.get(HELIX_SUBSCRIPTIONS_URL, params=params, headers=headers, timeout=15)
+        limiter.update_from_headers(response.headers)
+        response.raise_for_status()
+        info = response.json()
+
+        for subscription in info.get("data", []):
+            if subscription.get("transport", {}).get("callback") != callback_url:
+                continue
+
+            key = (subscription["condition"].get("broadcaster_user_id"), subscription["type"])
+            status = subscription["status"]
+
+            if (status == "enabled" or status.endswith("_pending")) and key not in existing:
+                existing[key] = subscription["id"]
+            else:
+                broken_ids.append(subscription["id"])
+
+        cursor = info.get("pagination", {}).get("cursor")
+
+        if not cursor:
+            break
+
+    unwanted_ids = [existing[key] for key in existing.keys() - wanted]
+
+    for subscription_id in broken_ids + unwanted_ids:
+        limiter.wait()
+        response = session.delete(HELIX_SUBSCRIPTIONS_URL, params={"id": subscription_id}, headers=headers, timeout=15)
+        limiter.update_from_headers(response.headers)
+
+    created = 0
+
+    for user_id, subscription_type in wanted - existing.keys():
+        limiter.wait()
+        response = session.post(HELIX_SUBSCRIPTIONS_URL, headers=headers, timeout=15, json={
+            "type": subscription_type,
+            "version": "1",
+            "condition": {"broadcaster_user_id": user_id},
+            "transport": {"method": "webhook", "callback": callback_url, "secret": secret}
+        })
+        limiter.update_from_headers(response.headers)
+
+        if response.status_code == 409:
+            continue
+
+        response.raise_for_status()
+        created += 1
+
+    logger.info(f"Подписки EventSub синхронизированы: создано {created}, "
+                f"удалено {len(broken_ids) + len(unwanted_ids)}, всего {len(wanted)}.")
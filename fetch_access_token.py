@@ -2,13 +2,48 @@
 Модуль для получения учётных данных от Twitch.
 
 Краткое описание функций:
-- fetch_access_token: Получает учётные данные для Twitch.
+- request_access_token: Выполняет один запрос учётных данных для Twitch.
+- fetch_access_token: Получает учётные данные для Twitch, повторяя попытки до успеха.
 """
 import time
 import requests
 
+from twitch_api import OAUTH_TOKEN_URL, get_session
+from metrics import ACCESS_TOKEN_DURATION
 
-def fetch_access_token(client_id, client_secret, logger):
+
+def request_access_token(client_id, client_secret, limiter=None):
+    """
+    Выполняет один запрос учётных данных для Twitch.
+
+    Args:
+        client_id (str): Идентификатор клиента Twitch.
+        client_secret (str): Секрет клиента Twitch.
+        limiter (RateLimiter, optional): Общий ограничитель частоты запросов к API.
+
+    Returns:
+        dict: Ответ Twitch с полями `access_token`, `expires_in` и `token_type`.
+
+    Raises:
+        requests.exceptions.RequestException: Если запрос завершился ошибкой.
+    """
+    token_params = {
+        "client_id": client_id,
+        "client_secret": client_secret,
+        "grant_type": "client_credentials"
+    }
+
+    if limiter:
+        limiter.wait()
+
+    with ACCESS_TOKEN_DURATION.time():
+        token_response = get_session().post(OAUTH_TOKEN_URL, params=token_params, timeout=30)
+        token_response.raise_for_status()
+
+    return token_response.json()
+
+
+def fetch_access_token(client_id, client_secret, logger, limiter=None):
     """
     Получает учётные данные для Twitch.
 
@@ -19,6 +54,7 @@ def fetch_access_token(client_id, client_secret, logger):
         client_id (str): Идентификатор клиента Twitch.
         client_secret (str): Секрет клиента Twitch.
         logger (logging.Logger): Логгер.
+        limiter (RateLimiter, optional): Общий ограничитель частоты запросов к API.
 
     Returns:
         str: Access token для использования в API запросах.
@@ -28,12 +64,7 @@ def fetch_access_token(client_id, client_secret, logger):
     """
     while True:
         try:
-            token_url = "https://id.twitch.tv/oauth2/token?client_id=" + \
-                        client_id + "&client_secret=" + client_secret + \
-                        "&grant_type=client_credentials"
-            token_response = requests.post(token_url, timeout=30)
-            token_response.raise_for_status()
-            token = token_response.json()
+            token = request_access_token(client_id=client_id, client_secret=client_secret, limiter=limiter)
 
             return token["access_token"]
         except requests.exceptions.RequestException as err:
@@ -1,15 +1,26 @@
 """
 Модуль для получения Twitch user_id по имени пользователя через API.
+
+Краткое описание функций:
+    - get_twitch_user_id: Получает user_id одного пользователя по его имени.
+    - fetch_twitch_user_ids: Получает user_id для списка имён пачками по 100 имён за запрос.
 """
 import requests
 
 import config
 
+from twitch_api import HELIX_URL, get_session
 from set_logger import set_logger
+from rate_limiter import RateLimiter
 from fetch_access_token import fetch_access_token
+from poll_engine import split_into_chunks
+
 
+# Максимальное количество параметров login в одном запросе helix/users
+MAX_LOGINS_PER_REQUEST = 100
 
-def get_twitch_user_id(user_name: str, headers: dict, main_logger) -> str:
+
+def get_twitch_user_id(user_name: str, headers: dict, main_logger, limiter=None) -> str:
     """
     Получает user_id пользователя Twitch по его имени через API.
 
@@ -17,6 +28,7 @@ def get_twitch_user_id(user_name: str, headers: dict, main_logger) -> str:
         user_name (str): Имя пользователя Twitch для поиска.
         headers (dict): Заголовки для запроса, включая Client-ID и Authorization.
         main_logger (logging.Logger): Логгер.
+        limiter (RateLimiter, optional): Общий ограничитель частоты запросов к API.
 
     Returns:
         str or None: Возвращает user_id пользователя, если найден, или None в случае ошибки.
@@ -28,8 +40,21 @@ def get_twitch_user_id(user_name: str, headers: dict, main_logger) -> str:
         logger = main_logger.getChild('get_twitch_user_id')
         correct_user_name = user_name.lower()
 
-        url_user_id = f"https://api.twitch.tv/helix/users?login={correct_user_name}"
-        response = requests.get(url_user_id, headers=headers, timeout=15)
+        url_user_id = f"{HELIX_URL}/users"
+
+        if limiter:
+            limiter.wait()
+
+        response = get_session().get(
+            url_user_id,
+            params={"login": correct_user_name},
+            headers=headers,
+            timeout=15
+        )
+
+        if limiter:
+            limiter.update_from_headers(response.headers)
+
         response.raise_for_status()
         user_data = response.json().get("data", [])
 
@@ -49,15 +74,67 @@ def get_twitch_user_id(user_name: str, headers: dict, main_logger) -> str:
         raise
 
 
+def fetch_twitch_user_ids(user_names, headers, main_logger, limiter=None):
+    """
+    Получает user_id для списка имён пользователей Twitch.
+
+    Имена запрашиваются пачками по 100 штук, поэтому для тысячи каналов нужно
+    около десяти запросов вместо тысячи.
+
+    Args:
+        user_names (Iterable): Имена пользователей Twitch.
+        headers (dict): Заголовки для запроса, включая Client-ID и Authorization.
+        main_logger (logging.Logger): Логгер.
+        limiter (RateLimiter, optional): Общий ограничитель частоты запросов к API.
+
+    Returns:
+        dict: Словарь {имя пользователя в нижнем регистре: user_id}. Ненайденных имён в словаре нет.
+
+    Raises:
+        requests.exceptions.RequestException: Если запрос к API завершился ошибкой.
+    """
+    logger = main_logger.getChild('get_twitch_user_id')
+    user_names = sorted({str(user_name).lower() for user_name in user_names})
+    user_ids = {}
+
+    for chunk in split_into_chunks(user_names, MAX_LOGINS_PER_REQUEST):
+        if limiter:
+            limiter.wait()
+
+        response = get_session().get(
+            f"{HELIX_URL}/users",
+            params=[("login", user_name) for user_name in chunk],
+            headers=headers,
+            timeout=15
+        )
+
+        if limiter:
+            limiter.update_from_headers(response.headers)
+
+        try:
+            response.raise_for_status()
+        except requests.exceptions.RequestException as err:
+            logger.error("Ошибка при получении ID для пользователей %s: %s", chunk, err)
+
+            raise
+
+        for user_data in response.json().get("data", []):
+            user_ids[user_data["login"].lower()] = user_data["id"]
+
+    return user_ids
+
+
 if __name__ == "__main__":
     user_input = input("Введите ник пользователя Twitch, чтобы получить его user_id: ")
 
     logger = set_logger(config.log_folder)
+    limiter = RateLimiter()
 
     access_token = fetch_access_token(
         client_id     = config.client_id,
         client_secret = config.client_secret,
-        logger        = logger
+        logger        = logger,
+        limiter       = limiter
     )
 
     headers = {"Client-ID": config.client_id, "Authorization": f"Bearer {access_token}"}
@@ -65,7 +142,8 @@ if __name__ == "__main__":
     user_id = get_twitch_user_id(
         user_name   = user_input,
         headers     = headers,
-        main_logger = logger
+        main_logger = logger,
+        limiter     = limiter
     )
 
     logger.info("User ID: %s", user_id)
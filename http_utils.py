@@ -0,0 +1,69 @@
+"""
+Модуль с простейшими функциями HTTP/1.1 для серверов на `asyncio.start_server`.
+
+Краткое описание функций:
+    - read_request: Читает HTTP-запрос и возвращает метод, путь, заголовки и тело.
+    - write_response: Записывает HTTP-ответ и закрывает соединение.
+"""
+
+
+REASONS = {
+    200: 'OK',
+    204: 'No Content',
+    400: 'Bad Request',
+    403: 'Forbidden',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    500: 'Internal Server Error'
+}
+
+
+async def read_request(reader, max_body_bytes):
+    """
+    Читает HTTP-запрос и возвращает метод, путь, заголовки и тело.
+
+    Args:
+        reader (asyncio.StreamReader): Поток чтения соединения.
+        max_body_bytes (int): Максимальный размер тела запроса.
+
+    Returns:
+        tuple: Метод, путь, словарь заголовков (имена в нижнем регистре) и тело запроса.
+    """
+    request_line = await reader.readline()
+    method, _, rest = request_line.decode('latin-1').partition(' ')
+    path = rest.split(' ', 1)[0]
+    headers = {}
+
+    while True:
+        line = await reader.readline()
+
+        if line in (b'\r\n', b'\n', b''):
+            break
+
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    content_length = min(int(headers.get('content-length', 0) or 0), max_body_bytes)
+    body = await reader.readexactly(content_length) if content_length else b''
+
+    return method, path, headers, body
+
+
+async def write_response(writer, status, body=b'', content_type='text/plain'):
+    """
+    Записывает HTTP-ответ и закрывает соединение.
+
+    Args:
+        writer (asyncio.StreamWriter): Поток записи соединения.
+        status (int): Код ответа.
+        body (bytes): Тело ответа.
+        content_type (str): Тип содержимого ответа.
+    """
+    writer.write(
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n\r\n".encode('latin-1') + body
+    )
+    await writer.drain()
+    writer.close()
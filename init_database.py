@@ -4,7 +4,12 @@
 Этот модуль содержит функцию `init_database`, которая создает таблицы в базе данных для
 хранения данных о трансляциях и маппинга имен пользователей Twitch на их идентификаторы.
 
+Схема базы данных описывается списком миграций `MIGRATIONS`. Номер последней применённой
+миграции хранится в `PRAGMA user_version`, поэтому при запуске применяются только новые
+миграции, каждая в отдельной транзакции.
+
 Краткое описание функций:
+- apply_migrations: Применяет к базе данных миграции, которые ещё не были применены.
 - init_database: Инициализирует базу данных, создавая необходимые таблицы, если они не существуют.
 """
 import sqlite3
@@ -12,6 +17,181 @@ import sqlite3
 import config
 
 from set_logger import set_logger
+from database import connect
+
+
+MIGRATIONS = [
+    # 1. Исходная схема
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS live_broadcast (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT,
+            user_name TEXT,
+            stream_id TEXT,
+            recording_start TEXT,
+            title TEXT
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS user_ids (
+            user_name TEXT PRIMARY KEY,
+            user_id TEXT,
+            resolved_at TEXT
+        )
+        '''
+    ],
+    # 2. Индексы для поиска по истории трансляций
+    [
+        "CREATE INDEX IF NOT EXISTS idx_live_broadcast_user_id ON live_broadcast (user_id, recording_start)",
+        "CREATE INDEX IF NOT EXISTS idx_live_broadcast_stream_id ON live_broadcast (stream_id)",
+        "CREATE INDEX IF NOT EXISTS idx_live_broadcast_recording_start ON live_broadcast (recording_start)"
+    ],
+    # 3. Части записи трансляции (при переносе записи на другое хранилище и т.п.)
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS recording_parts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            broadcast_id INTEGER REFERENCES live_broadcast (id),
+            part_number INTEGER,
+            file_path TEXT,
+            started_at TEXT,
+            ended_at TEXT,
+            end_reason TEXT
+        )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_recording_parts_broadcast_id ON recording_parts (broadcast_id, part_number)"
+    ],
+    # 4. Размер закрытой части записи
+    [
+        "ALTER TABLE recording_parts ADD COLUMN size_bytes INTEGER"
+    ],
+    # 5. Очередь фоновой обработки записей и её результаты
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS postprocess_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT,
+            file_path TEXT,
+            status TEXT,
+            attempts INTEGER,
+            next_attempt_at REAL,
+            error TEXT,
+            created_at REAL,
+            finished_at REAL
+        )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_postprocess_jobs_status ON postprocess_jobs (status, next_attempt_at)",
+        "ALTER TABLE recording_parts ADD COLUMN duration_seconds REAL",
+        "ALTER TABLE recording_parts ADD COLUMN thumbnail_path TEXT",
+        "CREATE INDEX IF NOT EXISTS idx_recording_parts_file_path ON recording_parts (file_path)"
+    ],
+    # 6. История битрейта записей
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS bitrate_samples (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            broadcast_id INTEGER REFERENCES live_broadcast (id),
+            part_number INTEGER,
+            sampled_at TEXT,
+            bytes_per_second REAL,
+            size_bytes INTEGER
+        )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_bitrate_samples_broadcast_id ON bitrate_samples (broadcast_id, sampled_at)",
+        "CREATE INDEX IF NOT EXISTS idx_bitrate_samples_sampled_at ON bitrate_samples (sampled_at)"
+    ],
+    # 7. Состояние записи для восстановления после аварийной остановки
+    [
+        "ALTER TABLE live_broadcast ADD COLUMN state TEXT",
+        "ALTER TABLE live_broadcast ADD COLUMN recording_end TEXT",
+        "ALTER TABLE recording_parts ADD COLUMN pid INTEGER",
+        "ALTER TABLE recording_parts ADD COLUMN exit_code INTEGER",
+        "CREATE INDEX IF NOT EXISTS idx_recording_parts_ended_at ON recording_parts (ended_at)"
+    ],
+    # 8. Каталог файлов записей на хранилищах и полнотекстовый поиск по трансляциям
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS catalog_dirs (
+            path TEXT PRIMARY KEY,
+            storage_path TEXT,
+            mtime_ns INTEGER
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS catalog_files (
+            path TEXT PRIMARY KEY,
+            dir_path TEXT,
+            user_name TEXT,
+            stream_id TEXT,
+            recording_start TEXT,
+            part_number INTEGER,
+            size_bytes INTEGER,
+            mtime REAL
+        )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_catalog_dirs_storage_path ON catalog_dirs (storage_path)",
+        "CREATE INDEX IF NOT EXISTS idx_catalog_files_dir_path ON catalog_files (dir_path)",
+        "CREATE INDEX IF NOT EXISTS idx_catalog_files_stream_id ON catalog_files (stream_id)",
+        "CREATE INDEX IF NOT EXISTS idx_catalog_files_user_name ON catalog_files (user_name COLLATE NOCASE, recording_start)",
+        "CREATE INDEX IF NOT EXISTS idx_live_broadcast_user_name ON live_broadcast (user_name COLLATE NOCASE, recording_start)",
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS live_broadcast_fts USING fts5 (
+            title, user_name, content='live_broadcast', content_rowid='id'
+        )
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS live_broadcast_fts_insert AFTER INSERT ON live_broadcast BEGIN
+            INSERT INTO live_broadcast_fts (rowid, title, user_name) VALUES (new.id, new.title, new.user_name);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS live_broadcast_fts_delete AFTER DELETE ON live_broadcast BEGIN
+            INSERT INTO live_broadcast_fts (live_broadcast_fts, rowid, title, user_name)
+            VALUES ('delete', old.id, old.title, old.user_name);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS live_broadcast_fts_update AFTER UPDATE OF title, user_name ON live_broadcast BEGIN
+            INSERT INTO live_broadcast_fts (live_broadcast_fts, rowid, title, user_name)
+            VALUES ('delete', old.id, old.title, old.user_name);
+            INSERT INTO live_broadcast_fts (rowid, title, user_name) VALUES (new.id, new.title, new.user_name);
+        END
+        ''',
+        "INSERT INTO live_broadcast_fts (live_broadcast_fts) VALUES ('rebuild')"
+    ],
+    # 9. Причина начала части записи и пропуск перед частью после переподключения
+    [
+        "ALTER TABLE recording_parts ADD COLUMN start_reason TEXT",
+        "ALTER TABLE recording_parts ADD COLUMN gap_seconds REAL"
+    ],
+]
+
+
+def apply_migrations(conn, logger):
+    """Применяет к базе данных миграции, которые ещё не были применены.
+
+    Args:
+        conn (sqlite3.Connection): Соединение с базой данных.
+        logger (logging.Logger): Логгер.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+
+    for number, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+        logger.info("Применение миграции базы данных №%s.", number)
+
+        conn.execute("BEGIN")
+
+        try:
+            for statement in statements:
+                conn.execute(statement)
+
+            conn.execute(f"PRAGMA user_version = {number}")
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+
+            raise
 
 
 def init_database(database_path: str, main_logger):
@@ -28,21 +208,13 @@ def init_database(database_path: str, main_logger):
     logger.info("Инициализация базы данных.")
 
     try:
-        with sqlite3.connect(database_path) as conn:
-            cursor = conn.cursor()
-
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS live_broadcast (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id TEXT,
-                    user_name TEXT,
-                    stream_id TEXT,
-                    recording_start TEXT,
-                    title TEXT
-                )
-            ''')
-
-            conn.commit()
+        conn = connect(database_path)
+        conn.isolation_level = None
+
+        try:
+            apply_migrations(conn, logger)
+        finally:
+            conn.close()
 
         logger.info("Инициализация базы данных завершена.")
     except Exception as err:
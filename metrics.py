@@ -0,0 +1,263 @@
+"""
+Модуль метрик программы записи трансляций.
+
+Содержит потокобезопасные счётчики, измерители и гистограммы с метками и общий
+реестр `REGISTRY`, который выводит все метрики в текстовом формате Prometheus.
+Метрики, которые снимаются в разных модулях программы, объявлены здесь же,
+чтобы их список и описание были в одном месте.
+
+Краткое описание классов:
+    - Counter: Счётчик, который только растёт.
+    - Gauge: Измеритель текущего значения.
+    - Histogram: Гистограмма распределения значений, например длительностей.
+    - MetricsRegistry: Реестр метрик с выводом в формате Prometheus.
+"""
+import math
+import time
+import threading
+
+from contextlib import contextmanager
+
+
+# Границы корзин гистограмм по умолчанию в секундах
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Границы корзин для длительности процессов записи в секундах
+LIFETIME_BUCKETS = (60, 300, 900, 1800, 3600, 7200, 14400, 28800, 86400)
+
+
+def _format_value(value):
+    """Форматирует число для вывода в формате Prometheus."""
+    if value == math.inf:
+        return "+Inf"
+
+    if float(value).is_integer():
+        return str(int(value))
+
+    return repr(float(value))
+
+
+def _format_labels(labelnames, labelvalues, extra=()):
+    """Форматирует метки для вывода в формате Prometheus."""
+    pairs = list(zip(labelnames, labelvalues)) + list(extra)
+
+    if not pairs:
+        return ""
+
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + "}"
+
+
+def _escape_label_value(value):
+    """Экранирует значение метки для вывода в формате Prometheus."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Metric:
+    """Общая часть метрик: имя, описание, метки и блокировка."""
+
+    metric_type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        # Значения меток -> значение метрики
+        self.values = {}
+
+    def _key(self, labels):
+        """Возвращает кортеж значений меток в порядке `labelnames`."""
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def remove(self, **labels):
+        """Удаляет значение метрики с указанными метками, например после окончания записи."""
+        with self.lock:
+            self.values.pop(self._key(labels), None)
+
+    def _samples(self):
+        """Возвращает строки значений метрики. Вызывается под блокировкой."""
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in self.values.items()]
+
+    def render(self):
+        """Возвращает метрику в текстовом формате Prometheus."""
+        with self.lock:
+            samples = self._samples()
+
+        return "\n".join([f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}", *samples])
+
+
+class Counter(_Metric):
+    """Счётчик, который только растёт."""
+
+    metric_type = "counter"
+
+    def inc(self, amount=1, **labels):
+        """Увеличивает счётчик."""
+        key = self._key(labels)
+
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Измеритель текущего значения."""
+
+    metric_type = "gauge"
+
+    def set(self, value, **labels):
+        """Устанавливает значение."""
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        """Увеличивает значение."""
+        key = self._key(labels)
+
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        """Уменьшает значение."""
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Гистограмма распределения значений с накопительными корзинами."""
+
+    metric_type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        """Учитывает одно значение."""
+        key = self._key(labels)
+
+        with self.lock:
+            state = self.values.get(key)
+
+            if state is None:
+                state = self.values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][index] += 1
+
+                    break
+
+            state["sum"] += value
+            state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Контекстный менеджер, учитывающий длительность выполнения блока в секундах."""
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self):
+        samples = []
+
+        for key, state in self.values.items():
+            cumulative = 0
+
+            for bound, count in zip(self.buckets, state["counts"]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                samples.append(f"{self.name}_bucket{labels} {cumulative}")
+
+            labels = _format_labels(self.labelnames, key)
+            samples.append(f"{self.name}_sum{labels} {_format_value(state['sum'])}")
+            samples.append(f"{self.name}_count{labels} {state['count']}")
+
+        return samples
+
+
+class MetricsRegistry:
+    """
+    Реестр метрик с выводом в текстовом формате Prometheus.
+
+    Краткое описание функций:
+        - counter: Создаёт и регистрирует счётчик.
+        - gauge: Создаёт и регистрирует измеритель.
+        - histogram: Создаёт и регистрирует гистограмму.
+        - render: Возвращает все метрики в текстовом формате Prometheus.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+
+    def _register(self, metric):
+        with self.lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+
+            self.metrics[metric.name] = metric
+
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        """Создаёт и регистрирует счётчик."""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        """Создаёт и регистрирует измеритель."""
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """Создаёт и регистрирует гистограмму."""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """Возвращает все метрики в текстовом формате Prometheus."""
+        with self.lock:
+            metrics = list(self.metrics.values())
+
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# Опрос каналов и Twitch API
+POLL_DURATION = REGISTRY.histogram(
+    "recorder_check_users_duration_seconds", "Длительность проверки статуса каналов (check_users)."
+)
+POLL_CHANNELS = REGISTRY.counter("recorder_polled_channels_total", "Сколько раз были опрошены каналы.")
+POLL_ERRORS = REGISTRY.counter("recorder_poll_errors_total", "Ошибки запросов при опросе каналов.")
+RATELIMIT_REMAINING = REGISTRY.gauge(
+    "recorder_ratelimit_remaining", "Остаток бюджета запросов Twitch API по заголовку Ratelimit-Remaining."
+)
+ACCESS_TOKEN_DURATION = REGISTRY.histogram(
+    "recorder_fetch_access_token_duration_seconds", "Длительность запроса токена доступа."
+)
+DETECTION_DELAY = REGISTRY.histogram(
+    "recorder_detection_delay_seconds",
+    "Задержка начала записи относительно started_at трансляции.",
+    buckets=(1, 2, 5, 10, 15, 30, 60, 120, 300, 600)
+)
+
+# Запись трансляций
+ACTIVE_RECORDINGS = REGISTRY.gauge("recorder_active_recordings", "Число идущих записей.")
+RECORDING_BYTES_PER_SECOND = REGISTRY.gauge(
+    "recorder_recording_bytes_per_second", "Скорость записи файла текущей части.", ("user_name",)
+)
+STREAMLINK_LIFETIME = REGISTRY.histogram(
+    "recorder_streamlink_lifetime_seconds", "Время работы процесса streamlink.", buckets=LIFETIME_BUCKETS
+)
+CHOOSE_STORAGE_DURATION = REGISTRY.histogram(
+    "recorder_choose_storage_duration_seconds", "Длительность выбора хранилища."
+)
+
+# База данных
+ADD_RECORD_DURATION = REGISTRY.histogram(
+    "recorder_add_record_to_db_duration_seconds", "Время от постановки записи о трансляции в очередь до фиксации."
+)
+DB_WRITE_LATENCY = REGISTRY.histogram(
+    "recorder_db_write_latency_seconds", "Время от постановки запроса в очередь записи до фиксации транзакции."
+)
+DB_QUEUE_SIZE = REGISTRY.gauge("recorder_db_write_queue_size", "Длина очереди записи в базу данных.")
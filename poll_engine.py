@@ -0,0 +1,115 @@
+"""
+Модуль для опроса статуса трансляций через Helix API.
+
+Запрос `helix/streams` принимает не более 100 параметров `user_id` и отдаёт
+результат постранично, поэтому список каналов делится на части по 100
+идентификаторов, части опрашиваются параллельно, а по каждой части
+выполняется проход по всем страницам через `pagination.cursor`.
+
+Краткое описание функций:
+    - split_into_chunks: Делит список идентификаторов на части фиксированного размера.
+    - fetch_streams_chunk: Получает активные трансляции для одной части списка.
+    - fetch_live_streams: Параллельно опрашивает все части списка.
+"""
+import requests
+
+from twitch_api import HELIX_URL, get_session
+
+
+HELIX_STREAMS_URL = f"{HELIX_URL}/streams"
+
+# Ограничения Helix для запроса helix/streams
+MAX_IDS_PER_REQUEST = 100
+MAX_STREAMS_PER_PAGE = 100
+
+# Количество потоков опроса: в одном выполняется цикл опроса, в остальных — запросы
+POLL_MAX_WORKERS = 16
+
+
+def split_into_chunks(items, chunk_size):
+    """
+    Делит список на части фиксированного размера.
+
+    Args:
+        items (list): Исходный список.
+        chunk_size (int): Максимальный размер одной части.
+
+    Returns:
+        list: Список частей исходного списка.
+    """
+    return [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+
+def fetch_streams_chunk(user_ids, headers, limiter):
+    """
+    Получает активные трансляции для одной части списка пользователей.
+
+    Функция проходит по всем страницам ответа, пока Helix возвращает `pagination.cursor`.
+
+    Args:
+        user_ids (list): Не более 100 идентификаторов пользователей.
+        headers (dict): Заголовки для запроса, включая Client-ID и Authorization.
+        limiter (RateLimiter): Ограничитель частоты запросов к API.
+
+    Returns:
+        list: Список словарей с данными активных трансляций.
+
+    Raises:
+        requests.exceptions.RequestException: Если запрос к API завершился ошибкой.
+    """
+    streams = []
+    cursor = None
+
+    while True:
+        params = [('user_id', user_id) for user_id in user_ids]
+        params.append(('first', MAX_STREAMS_PER_PAGE))
+
+        if cursor:
+            params.append(('after', cursor))
+
+        limiter.wait()
+
+        response = get_session().get(HELIX_STREAMS_URL, params=params, headers=headers, timeout=15)
+        limiter.update_from_headers(response.headers)
+        response.raise_for_status()
+        info = response.json() or {}
+
+        streams.extend(stream for stream in info.get("data", []) if stream)
+
+        cursor = info.get("pagination", {}).get("cursor")
+
+        if not cursor:
+            return streams
+
+
+def fetch_live_streams(user_ids, headers, limiter, executor):
+    """
+    Параллельно опрашивает статус трансляций для всего списка пользователей.
+
+    Ошибка в одной части списка не отменяет результаты остальных частей:
+    такие ошибки возвращаются вызывающему коду отдельным списком.
+
+    Args:
+        user_ids (list): Идентификаторы пользователей для проверки.
+        headers (dict): Заголовки для запроса, включая Client-ID и Authorization.
+        limiter (RateLimiter): Ограничитель частоты запросов к API.
+        executor (concurrent.futures.Executor): Пул потоков для выполнения запросов.
+
+    Returns:
+        tuple: Список активных трансляций и список возникших ошибок запросов.
+    """
+    futures = [
+        executor.submit(fetch_streams_chunk, chunk, headers, limiter)
+        for chunk in split_into_chunks(list(user_ids), MAX_IDS_PER_REQUEST)
+    ]
+
+    streams = []
+    errors = []
+
+    for future in futures:
+        try:
+            streams.extend(future.result())
+        except requests.exceptions.RequestException as err:
+            errors.append(err)
+
+    return streams, errors
@@ -0,0 +1,307 @@
+"""
+Модуль адаптивного планировщика опроса каналов.
+
+Планировщик изучает по таблице `live_broadcast`, в какое время суток обычно
+начинаются трансляции каждого канала, и делит каналы на два уровня:
+    - горячие: сейчас близко к привычному времени начала трансляции, такие каналы
+      опрашиваются так часто, как позволяет бюджет API;
+    - холодные: все остальные, они опрашиваются реже и равномерно распределяются
+      по времени, чтобы не расходовать бюджет API пачками.
+
+Настроенный интервал горячих каналов — нижняя граница. Если задан ограничитель
+запросов, в каждом цикле интервал пересчитывается по оставшемуся бюджету API и
+числу горячих каналов: сначала из бюджета вычитается доля холодных каналов, а
+остаток делится между горячими. Когда горячих каналов много или бюджет почти
+исчерпан, они опрашиваются реже, но не реже холодных.
+
+Для каждого канала планировщик считает ожидаемую задержку обнаружения (половина
+действующего интервала опроса его уровня) и фактическую задержку (время обнаружения
+минус `started_at` из Helix).
+
+Краткое описание классов:
+    - PollScheduler: Планировщик опроса каналов по уровням.
+"""
+import math
+import random
+
+from datetime import datetime, timedelta, timezone
+
+from poll_engine import MAX_IDS_PER_REQUEST
+
+
+RECORDING_START_FORMAT = '%Y-%m-%d %H-%M-%S'
+MINUTES_PER_DAY = 24 * 60
+
+# Доля бюджета API, которую может тратить опрос; остальное остаётся другим запросам
+POLL_BUDGET_SHARE = 0.8
+
+
+class PollScheduler:
+    """
+    Планировщик опроса каналов по горячему и холодному уровням.
+
+    Краткое описание функций:
+        - refresh_history: Перечитывает историю трансляций из базы данных.
+        - get_tier: Возвращает уровень канала в указанный момент.
+        - get_interval: Возвращает действующий интервал опроса канала.
+        - due_user_ids: Возвращает каналы, которые пора опросить.
+        - poll_now: Ставит каналы в начало очереди опроса.
+        - forget: Удаляет расписание опроса убранных каналов.
+        - mark_polled: Отмечает время опроса каналов.
+        - record_detection: Фиксирует задержку обнаружения трансляции.
+        - detection_report: Возвращает ожидаемую и фактическую задержку по каналам.
+
+    Args:
+        database (Database): База данных с историей трансляций.
+        hot_interval (float): Минимальный интервал опроса горячих каналов в секундах.
+        cold_interval (float): Интервал опроса холодных каналов в секундах.
+        window_before_minutes (int): За сколько минут до привычного начала канал становится горячим.
+        window_after_minutes (int): Сколько минут после привычного начала канал остаётся горячим.
+        history_days (int): Глубина истории трансляций в днях.
+        min_occurrences (int): Сколько раз трансляция должна начаться в одно время, чтобы время считалось привычным.
+        limiter (RateLimiter, optional): Ограничитель запросов, по бюджету которого подбирается интервал
+                                         горячих каналов. Без него интервал постоянный.
+    """
+
+    def __init__(
+        self,
+        database,
+        hot_interval,
+        cold_interval,
+        window_before_minutes=30,
+        window_after_minutes=90,
+        history_days=60,
+        min_occurrences=2,
+        limiter=None
+    ):
+        self.database = database
+        self.hot_interval = hot_interval
+        self.cold_interval = cold_interval
+        self.window_before_minutes = window_before_minutes
+        self.window_after_minutes = window_after_minutes
+        self.history_days = history_days
+        self.min_occurrences = min_occurrences
+        self.limiter = limiter
+
+        # Интервал горячих каналов с учётом бюджета API, пересчитывается в due_user_ids
+        self.effective_hot_interval = hot_interval
+
+        # user_id -> список привычных минут начала трансляции от начала суток (UTC)
+        self.start_minutes = {}
+        # user_id -> время следующего опроса (time.monotonic)
+        self.next_poll_at = {}
+        # user_id -> статистика задержек обнаружения
+        self.detections = {}
+
+    def refresh_history(self):
+        """
+        Перечитывает историю трансляций из базы данных и обновляет привычное время начала.
+
+        Метод выполняет блокирующий запрос к SQLite и должен вызываться вне событийного цикла.
+        """
+        since = datetime.now(timezone.utc) - timedelta(days=self.history_days)
+
+        rows = self.database.read(
+            "SELECT user_id, recording_start FROM live_broadcast WHERE recording_start >= ?",
+            (since.strftime(RECORDING_START_FORMAT),)
+        )
+
+        # Начала трансляций группируются по 15-минутным интервалам суток
+        counts = {}
+
+        for user_id, recording_start in rows:
+            try:
+                started = datetime.strptime(recording_start, RECORDING_START_FORMAT)
+            except (TypeError, ValueError):
+                continue
+
+            slot = (started.hour * 60 + started.minute) // 15 * 15
+            user_counts = counts.setdefault(str(user_id), {})
+            user_counts[slot] = user_counts.get(slot, 0) + 1
+
+        self.start_minutes = {
+            user_id: [slot for slot, count in user_counts.items() if count >= self.min_occurrences]
+            for user_id, user_counts in counts.items()
+        }
+
+    def get_tier(self, user_id, now_utc=None):
+        """
+        Возвращает уровень канала в указанный момент.
+
+        Args:
+            user_id (str): Идентификатор пользователя.
+            now_utc (datetime, optional): Момент времени в UTC. По умолчанию текущее время.
+
+        Returns:
+            str: "hot" или "cold".
+        """
+        now_utc = now_utc or datetime.now(timezone.utc)
+        now_minute = now_utc.hour * 60 + now_utc.minute
+
+        for start_minute in self.start_minutes.get(str(user_id), []):
+            # Расстояние по кругу суток: положительное, если привычное начало уже прошло
+            offset = (now_minute - start_minute + MINUTES_PER_DAY // 2) % MINUTES_PER_DAY - MINUTES_PER_DAY // 2
+
+            if -self.window_before_minutes <= offset <= self.window_after_minutes:
+                return "hot"
+
+        return "cold"
+
+    def get_interval(self, user_id, now_utc=None):
+        """Возвращает действующий интервал опроса канала в секундах в зависимости от его уровня."""
+        if self.get_tier(user_id, now_utc) == "hot":
+            return self.effective_hot_interval
+
+        return self.cold_interval
+
+    def _update_hot_interval(self, hot_count, cold_count):
+        """
+        Пересчитывает интервал горячих каналов по оставшемуся бюджету API.
+
+        Args:
+            hot_count (int): Количество горячих каналов.
+            cold_count (int): Количество холодных каналов.
+        """
+        hot_requests = math.ceil(hot_count / MAX_IDS_PER_REQUEST)
+
+        if not self.limiter or not hot_requests:
+            self.effective_hot_interval = self.hot_interval
+
+            return
+
+        # Холодные каналы опрашиваются вразброс, поэтому их доля считается в среднем
+        cold_rate = cold_count / MAX_IDS_PER_REQUEST / self.cold_interval
+        spare_rate = self.limiter.available_rate(self.cold_interval) * POLL_BUDGET_SHARE - cold_rate
+
+        if spare_rate <= 0:
+            self.effective_hot_interval = max(self.hot_interval, self.cold_interval)
+        else:
+            self.effective_hot_interval = min(
+                max(self.hot_interval, hot_requests / spare_rate),
+                max(self.hot_interval, self.cold_interval)
+            )
+
+    def due_user_ids(self, user_ids, now):
+        """
+        Возвращает каналы, которые пора опросить.
+
+        Каналы, которые ещё ни разу не опрашивались, получают случайную фазу внутри
+        своего интервала, чтобы холодные каналы не опрашивались одной пачкой. Перед
+        выбором пересчитывается интервал горячих каналов (см. `_update_hot_interval`).
+
+        Args:
+            user_ids (Iterable): Идентификаторы пользователей-кандидатов.
+            now (float): Текущее время по `time.monotonic`.
+
+        Returns:
+            list: Идентификаторы пользователей для опроса.
+        """
+        now_utc = datetime.now(timezone.utc)
+        tiers = {user_id: self.get_tier(user_id, now_utc) for user_id in user_ids}
+        hot_count = sum(1 for tier in tiers.values() if tier == "hot")
+        self._update_hot_interval(hot_count, len(tiers) - hot_count)
+        due = []
+
+        for user_id, tier in tiers.items():
+            next_poll_at = self.next_poll_at.get(user_id)
+
+            if next_poll_at is None:
+                if tier == "hot":
+                    next_poll_at = now
+                else:
+                    next_poll_at = now + random.uniform(0, self.cold_interval)
+
+                self.next_poll_at[user_id] = next_poll_at
+
+            # Канал мог стать горячим раньше запланированного холодного опроса
+            if next_poll_at - now > self.effective_hot_interval and tier == "hot":
+                next_poll_at = now
+
+            if next_poll_at <= now:
+                due.append(user_id)
+
+        return due
+
+    def poll_now(self, user_ids):
+        """
+        Ставит каналы в начало очереди опроса независимо от их уровня.
+
+        Args:
+            user_ids (Iterable): Идентификаторы пользователей, которые нужно опросить в ближайшем цикле.
+        """
+        for user_id in user_ids:
+            self.next_poll_at[user_id] = float('-inf')
+
+    def forget(self, user_ids):
+        """
+        Удаляет расписание опроса каналов, убранных из списка отслеживаемых.
+
+        Args:
+            user_ids (Iterable): Идентификаторы пользователей.
+        """
+        for user_id in user_ids:
+            self.next_poll_at.pop(user_id, None)
+            self.detections.pop(user_id, None)
+
+    def mark_polled(self, user_ids, now):
+        """
+        Отмечает время опроса каналов и планирует их следующий опрос.
+
+        Args:
+            user_ids (Iterable): Опрошенные идентификаторы пользователей.
+            now (float): Время опроса по `time.monotonic`.
+        """
+        now_utc = datetime.now(timezone.utc)
+
+        for user_id in user_ids:
+            self.next_poll_at[user_id] = now + self.get_interval(user_id, now_utc)
+
+    def record_detection(self, stream_data, detected_at=None):
+        """
+        Фиксирует задержку обнаружения трансляции относительно `started_at` из Helix.
+
+        Args:
+            stream_data (dict): Данные трансляции из Helix.
+            detected_at (datetime, optional): Момент обнаружения в UTC. По умолчанию текущее время.
+
+        Returns:
+            dict or None: Статистика обнаружения канала или None, если в данных нет `started_at`.
+        """
+        detected_at = detected_at or datetime.now(timezone.utc)
+        user_id = stream_data['user_id']
+
+        try:
+            started_at = datetime.fromisoformat(stream_data['started_at'].replace('Z', '+00:00'))
+        except (KeyError, AttributeError, ValueError):
+            return None
+
+        tier = self.get_tier(user_id, started_at)
+        interval = self.effective_hot_interval if tier == "hot" else self.cold_interval
+        actual_delay = max(0.0, (detected_at - started_at).total_seconds())
+
+        stats = self.detections.setdefault(user_id, {"count": 0, "total_delay": 0.0})
+        stats["count"] += 1
+        stats["total_delay"] += actual_delay
+        stats["tier"] = tier
+        stats["expected_delay"] = interval / 2
+        stats["last_delay"] = actual_delay
+
+        return stats
+
+    def detection_report(self):
+        """
+        Возвращает ожидаемую и фактическую задержку обнаружения по каналам.
+
+        Returns:
+            dict: Словарь вида {user_id: {"tier", "expected_delay", "last_delay", "mean_delay", "count"}}.
+        """
+        return {
+            user_id: {
+                "tier": stats["tier"],
+                "expected_delay": stats["expected_delay"],
+                "last_delay": stats["last_delay"],
+                "mean_delay": stats["total_delay"] / stats["count"],
+                "count": stats["count"]
+            }
+            for user_id, stats in self.detections.items()
+        }
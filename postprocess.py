@@ -0,0 +1,320 @@
+"""
+Модуль для фоновой обработки записанных файлов.
+
+Streamlink пишет поток MPEG-TS как есть, поэтому после закрытия части записи
+её файл перепаковывается ffmpeg в настоящий MP4 с `faststart`, затем определяется
+длительность и сохраняется миниатюра. Задачи хранятся в таблице `postprocess_jobs`
+и переживают перезапуск программы, а выполняются не более чем `max_workers`
+процессами одновременно с пониженным приоритетом процессора и диска, чтобы
+обработка не мешала идущим записям, даже если одновременно закончилось много трансляций.
+
+Краткое описание функций:
+    - lower_process_priority: Понижает приоритет процессора и ввода-вывода процесса.
+    - run_tool: Запускает ffmpeg или ffprobe с пониженным приоритетом и возвращает его вывод.
+    - PostProcessor.enqueue_part: Ставит в очередь обработку закрытой части записи.
+    - PostProcessor.run: Корутина, выполняющая задачи из очереди.
+"""
+import os
+import time
+import asyncio
+import subprocess
+
+import psutil
+
+
+# Сколько раз повторять задачу при ошибке и базовая задержка перед повтором в секундах
+MAX_ATTEMPTS = 3
+RETRY_BASE_DELAY = 60
+
+# Как часто проверять очередь, если новых задач не поступало
+IDLE_CHECK_SECONDS = 60
+
+# Задачи, которые ставятся в очередь после успешной перепаковки файла
+FOLLOW_UP_KINDS = ("probe", "thumbnail")
+
+# Смещения от начала записи в секундах, с которых берётся кадр для миниатюры
+THUMBNAIL_OFFSETS = (60, 0)
+
+
+def lower_process_priority(pid):
+    """
+    Понижает приоритет процессора и ввода-вывода процесса.
+
+    Args:
+        pid (int): Идентификатор процесса.
+    """
+    try:
+        process = psutil.Process(pid)
+
+        if hasattr(psutil, "IDLE_PRIORITY_CLASS"):
+            process.nice(psutil.IDLE_PRIORITY_CLASS)
+            process.ionice(psutil.IOPRIO_VERYLOW)
+        else:
+            process.nice(19)
+            process.ionice(psutil.IOPRIO_CLASS_IDLE)
+    except (psutil.Error, AttributeError, OSError):
+        # ionice есть не на всех системах, а процесс мог уже завершиться
+        pass
+
+
+async def run_tool(*args):
+    """
+    Запускает ffmpeg или ffprobe с пониженным приоритетом.
+
+    Args:
+        *args (str): Команда и её аргументы.
+
+    Returns:
+        str: Стандартный вывод процесса.
+
+    Raises:
+        RuntimeError: Если процесс завершился с ошибкой.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0)
+    )
+    lower_process_priority(process.pid)
+
+    stdout, stderr = await process.communicate()
+
+    if process.returncode != 0:
+        message = stderr.decode(errors="replace").strip().splitlines()
+        raise RuntimeError(f"{args[0]} завершился с кодом {process.returncode}: {message[-1] if message else ''}")
+
+    return stdout.decode(errors="replace")
+
+
+class PostProcessor:
+    """
+    Очередь фоновой обработки записанных файлов с ограниченным числом процессов.
+
+    Краткое описание функций:
+        - enqueue_part: Ставит в очередь обработку закрытой части записи.
+        - run: Корутина, выполняющая задачи из очереди.
+
+    Args:
+        database (Database): База данных с таблицей `postprocess_jobs`.
+        main_logger (logging.Logger): Логгер.
+        max_workers (int): Сколько задач может выполняться одновременно.
+        ffmpeg_path (str): Путь к ffmpeg.
+        ffprobe_path (str): Путь к ffprobe.
+    """
+
+    def __init__(self, database, main_logger, max_workers, ffmpeg_path, ffprobe_path):
+        self.database = database
+        self.logger = main_logger.getChild('postprocess')
+        self.max_workers = max_workers
+        self.ffmpeg_path = ffmpeg_path
+        self.ffprobe_path = ffprobe_path
+
+        self.loop = None
+        self.wakeup = None
+        # Идентификаторы выполняемых задач -> задачи asyncio
+        self.running = {}
+
+    def _notify(self, _future=None):
+        """Будит цикл обработки после записи новой задачи в базу. Можно вызывать из любого потока."""
+        if self.loop and self.wakeup:
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+
+    def _enqueue(self, kind, file_path):
+        """Ставит в очередь одну задачу и возвращает результат записи в базу."""
+        future = self.database.write('''
+            INSERT INTO postprocess_jobs (kind, file_path, status, attempts, next_attempt_at, created_at)
+            VALUES (?, ?, 'pending', 0, 0, ?)
+        ''', (kind, file_path, time.time()))
+        future.add_done_callback(self._notify)
+
+        return future
+
+    def enqueue_part(self, file_path):
+        """
+        Ставит в очередь обработку закрытой части записи.
+
+        Пустые и несуществующие файлы (например, если streamlink не успел начать запись) пропускаются.
+
+        Args:
+            file_path (str): Путь к файлу части записи.
+        """
+        try:
+            if os.path.getsize(file_path) == 0:
+                return
+        except OSError:
+            return
+
+        self._enqueue("remux", file_path)
+
+    def _pending_jobs(self, limit):
+        """Возвращает задачи, готовые к выполнению, в порядке постановки в очередь."""
+        rows = self.database.read('''
+            SELECT id, kind, file_path, attempts
+            FROM postprocess_jobs
+            WHERE status = 'pending' AND next_attempt_at <= ?
+            ORDER BY id
+            LIMIT ?
+        ''', (time.time(), limit + len(self.running)))
+
+        return [
+            {"id": row[0], "kind": row[1], "file_path": row[2], "attempts": row[3]}
+            for row in rows
+            if row[0] not in self.running
+        ][:limit]
+
+    async def _remux(self, file_path):
+        """
+        Перепаковывает MPEG-TS в MP4 с индексом в начале файла и заменяет им исходный файл.
+
+        Переносятся только видео и звук: поток данных timed_id3 из HLS Twitch
+        контейнер MP4 не поддерживает, и с ним перепаковка завершалась бы ошибкой.
+        """
+        root, ext = os.path.splitext(file_path)
+        temp_path = f"{root}.remux{ext or '.mp4'}"
+
+        try:
+            await run_tool(
+                self.ffmpeg_path, "-hide_banner", "-loglevel", "error", "-nostdin", "-y",
+                "-i", file_path,
+                "-map", "0:v?", "-map", "0:a?", "-c", "copy", "-movflags", "+faststart",
+                temp_path
+            )
+            os.replace(temp_path, file_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        for kind in FOLLOW_UP_KINDS:
+            self._enqueue(kind, file_path)
+
+    async def _probe(self, file_path):
+        """Определяет длительность записи и сохраняет её в `recording_parts`."""
+        output = await run_tool(
+            self.ffprobe_path, "-v", "error",
+            "-show_entries", "format=duration",
+            "-of", "default=noprint_wrappers=1:nokey=1",
+            file_path
+        )
+        duration = float(output.strip())
+
+        self.database.write(
+            "UPDATE recording_parts SET duration_seconds = ? WHERE file_path = ?",
+            (duration, file_path)
+        )
+
+    async def _thumbnail(self, file_path):
+        """Сохраняет кадр из начала записи рядом с файлом записи."""
+        thumbnail_path = f"{os.path.splitext(file_path)[0]}.jpg"
+
+        for offset in THUMBNAIL_OFFSETS:
+            try:
+                await run_tool(
+                    self.ffmpeg_path, "-hide_banner", "-loglevel", "error", "-nostdin", "-y",
+                    "-ss", str(offset), "-i", file_path,
+                    "-frames:v", "1", "-vf", "scale=320:-2", "-threads", "1",
+                    thumbnail_path
+                )
+            except RuntimeError:
+                # Запись короче смещения: пробуем кадр ближе к началу
+                if offset == THUMBNAIL_OFFSETS[-1]:
+                    raise
+
+            if os.path.exists(thumbnail_path):
+                break
+        else:
+            raise RuntimeError("не удалось получить кадр для миниатюры")
+
+        self.database.write(
+            "UPDATE recording_parts SET thumbnail_path = ? WHERE file_path = ?",
+            (thumbnail_path, file_path)
+        )
+
+    async def _run_job(self, job):
+        """
+        Выполняет одну задачу и записывает её результат в базу.
+
+        Задача убирается из `running` только после фиксации результата, иначе
+        `_pending_jobs` может успеть прочитать её ещё в старом состоянии и запустить повторно.
+        """
+        handlers = {"remux": self._remux, "probe": self._probe, "thumbnail": self._thumbnail}
+        result = None
+
+        try:
+            await handlers[job['kind']](job['file_path'])
+
+            result = self.database.write(
+                "UPDATE postprocess_jobs SET status = 'done', error = NULL, finished_at = ? WHERE id = ?",
+                (time.time(), job['id'])
+            )
+            self.logger.info(f"Обработка {job['kind']} завершена: {job['file_path']}")
+        except Exception as err:
+            attempts = job['attempts'] + 1
+
+            if attempts < MAX_ATTEMPTS:
+                status = 'pending'
+                self.logger.warning(f"Ошибка обработки {job['kind']} {job['file_path']}, будет повтор: {err}")
+            else:
+                status = 'failed'
+                self.logger.error(f"Ошибка обработки {job['kind']} {job['file_path']}: {err}")
+
+            result = self.database.write('''
+                UPDATE postprocess_jobs
+                SET status = ?, attempts = ?, next_attempt_at = ?, error = ?, finished_at = ?
+                WHERE id = ?
+            ''', (
+                status,
+                attempts,
+                time.time() + RETRY_BASE_DELAY * 2 ** attempts,
+                str(err),
+                time.time(),
+                job['id']
+            ))
+        finally:
+            try:
+                if result:
+                    await asyncio.wrap_future(result)
+            except Exception as err:
+                self.logger.error(f"Ошибка при сохранении результата обработки {job['kind']} {job['file_path']}: {err}")
+            finally:
+                del self.running[job['id']]
+                self.wakeup.set()
+
+    async def run(self):
+        """
+        Корутина, выполняющая задачи из очереди.
+
+        Задачи, которые выполнялись при прошлой остановке программы, возвращаются в очередь.
+        """
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+
+        await asyncio.wrap_future(
+            self.database.write("UPDATE postprocess_jobs SET status = 'pending' WHERE status = 'running'")
+        )
+
+        while True:
+            self.wakeup.clear()
+
+            try:
+                free_slots = self.max_workers - len(self.running)
+
+                if free_slots > 0:
+                    jobs = await asyncio.to_thread(self._pending_jobs, free_slots)
+
+                    if jobs:
+                        # Статус фиксируется до запуска, чтобы он не перезаписал результат задачи
+                        await asyncio.wrap_future(self.database.write_many(
+                            "UPDATE postprocess_jobs SET status = 'running' WHERE id = ?",
+                            [(job['id'],) for job in jobs]
+                        ))
+
+                    for job in jobs:
+                        self.running[job['id']] = asyncio.create_task(self._run_job(job))
+            except Exception as err:
+                self.logger.error(f"Ошибка при выборе задач обработки: {err}")
+
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=IDLE_CHECK_SECONDS)
+            except asyncio.TimeoutError:
+                pass
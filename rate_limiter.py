@@ -0,0 +1,120 @@
+"""
+Модуль ограничителя частоты запросов к Twitch API.
+
+Ограничитель работает по принципу "ведра с токенами": каждый запрос забирает
+из ведра один токен, а ведро равномерно пополняется до своей ёмкости.
+Ёмкость, остаток и скорость пополнения уточняются по заголовкам
+`Ratelimit-Limit`, `Ratelimit-Remaining` и `Ratelimit-Reset` из ответов Helix,
+поэтому запросы идут без задержек, пока бюджет не исчерпан, и притормаживаются
+только по мере опустошения ведра.
+
+Краткое описание классов:
+    - RateLimiter: Потокобезопасный ограничитель частоты запросов.
+"""
+import time
+import threading
+
+from metrics import RATELIMIT_REMAINING
+
+
+# Бюджет токена приложения в Helix по умолчанию: 800 запросов в минуту
+DEFAULT_CAPACITY = 800
+DEFAULT_REFILL_PERIOD = 60
+
+
+class RateLimiter:
+    """
+    Потокобезопасный ограничитель частоты запросов на основе ведра с токенами.
+
+    Краткое описание функций:
+        - wait: Ожидает свободный токен и забирает его.
+        - update_from_headers: Синхронизирует состояние ведра с заголовками ответа Helix.
+        - available_rate: Возвращает доступную частоту запросов на ближайший период.
+
+    Args:
+        capacity (int): Начальная ёмкость ведра (максимальный размер пачки запросов).
+        refill_period (float): Время в секундах, за которое пустое ведро наполняется полностью.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, refill_period=DEFAULT_REFILL_PERIOD):
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.refill_rate = capacity / refill_period
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        """Пополняет ведро на количество токенов, накопившихся с момента последнего обновления."""
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+        self.updated_at = now
+
+    def wait(self):
+        """
+        Ожидает свободный токен и забирает его.
+
+        Блокировка удерживается только на время расчёта, поэтому ожидающие потоки
+        не мешают друг другу и не задерживают обновление состояния из заголовков.
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+
+                    return
+
+                sleep_time = (1 - self.tokens) / self.refill_rate
+
+            time.sleep(sleep_time)
+
+    def available_rate(self, horizon):
+        """
+        Возвращает частоту запросов, которую бюджет выдержит в течение `horizon` секунд.
+
+        Учитываются и накопленные в ведре токены, и скорость его пополнения.
+
+        Args:
+            horizon (float): Период планирования в секундах.
+
+        Returns:
+            float: Запросов в секунду.
+        """
+        with self.lock:
+            self._refill(time.monotonic())
+
+            return (self.tokens + self.refill_rate * horizon) / horizon
+
+    def update_from_headers(self, headers):
+        """
+        Синхронизирует состояние ведра с заголовками ответа Helix.
+
+        Ответы без заголовков ограничения (например, от id.twitch.tv) игнорируются.
+
+        Args:
+            headers (Mapping): Заголовки ответа.
+        """
+        try:
+            limit = int(headers['Ratelimit-Limit'])
+            remaining = int(headers['Ratelimit-Remaining'])
+            reset_at = float(headers['Ratelimit-Reset'])
+        except (KeyError, TypeError, ValueError):
+            return
+
+        RATELIMIT_REMAINING.set(remaining)
+
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            self.capacity = limit
+            # Остаток на сервере не учитывает запросы, которые ещё в пути,
+            # поэтому берём меньшее из локального и серверного значений.
+            self.tokens = min(self.tokens, float(remaining))
+
+            seconds_to_reset = reset_at - time.time()
+
+            if seconds_to_reset > 0 and limit > remaining:
+                self.refill_rate = (limit - remaining) / seconds_to_reset
@@ -1,47 +1,351 @@
 """
 Модуль для записи трансляции с Twitch с использованием streamlink.
 
+Запись может состоять из нескольких частей. Пока идёт запись, корутина
+периодически вызывает `check_rollover`, и если та возвращает причину (например,
+на диске заканчивается место), запускается новый процесс streamlink в следующую
+часть. Старый процесс останавливается только после небольшого перекрытия,
+поэтому при переходе между частями данные не теряются.
+
+Если заданы параметры писателя, streamlink отдаёт поток в stdout, а в файл его
+пишет отдельный процесс `recording_writer.py` крупными блоками с предвыделением
+места. Пара процессов управляется как один процесс (см. `WriterPipeline`).
+
+Завершение дочерних процессов отслеживается через pidfd (см. `install_child_watcher`),
+а не отдельным потоком на каждый процесс, поэтому число потоков программы не
+растёт с числом идущих записей.
+
 Краткое описание функций:
-    - record_broadcast: Записывает трансляцию с Twitch в указанный файл.
+    - install_child_watcher: Включает отслеживание дочерних процессов через pidfd.
+    - start_streamlink: Запускает процесс streamlink для записи в файл.
+    - stop_process: Останавливает процесс, при необходимости принудительно.
+    - check_segment_limits: Проверяет, не пора ли закрыть сегмент записи по времени или размеру.
+    - record_broadcast: Записывает трансляцию с Twitch, переключаясь между частями при необходимости.
+
+Краткое описание классов:
+    - WriterPipeline: Процесс streamlink, передающий поток процессу-писателю.
 """
+import os
+import sys
 import time
+import asyncio
 import subprocess
 
+from metrics import ACTIVE_RECORDINGS, STREAMLINK_LIFETIME
+from recording_writer import build_writer_command
 
-def record_broadcast(recorded_file_path, user_name, app, logger):
-    """Записывает трансляцию с Twitch в файл.
 
-    Функция запускает процесс для записи потока с Twitch с использованием `streamlink`.
-    Она отслеживает процесс записи и завершает его, когда запись заканчивается или возникает ошибка.
+# Сколько секунд ждать завершения процесса после terminate перед kill
+STOP_TIMEOUT_SECONDS = 10
+
+
+def install_child_watcher(loop):
+    """
+    Включает отслеживание дочерних процессов событийного цикла через pidfd.
+
+    В Python 3.11 по умолчанию используется `ThreadedChildWatcher`, который
+    запускает отдельный поток ожидания на каждый дочерний процесс, а при записи
+    через процесс-писатель их два на каждую запись. `PidfdChildWatcher` ждёт
+    все процессы в самом событийном цикле. В Python 3.12 и новее он выбирается
+    по умолчанию, если система поддерживает pidfd, поэтому там ничего не меняется.
+
+    Args:
+        loop (asyncio.AbstractEventLoop): Событийный цикл, который запускает процессы.
+
+    Returns:
+        bool: True, если дочерние процессы отслеживаются через pidfd.
+    """
+    try:
+        # Ядра старше Linux 5.3 и другие системы не поддерживают pidfd
+        os.close(os.pidfd_open(os.getpid()))
+    except (AttributeError, OSError):
+        return False
+
+    if sys.version_info >= (3, 12):
+        return True
+
+    watcher = asyncio.PidfdChildWatcher()
+    asyncio.set_child_watcher(watcher)
+    watcher.attach_loop(loop)
+
+    return True
+
+
+class WriterPipeline:
+    """
+    Процесс streamlink, передающий поток через stdout процессу-писателю.
+
+    Объект ведёт себя как `asyncio.subprocess.Process`, поэтому запись, переход
+    между частями и остановка работают с ним так же, как с одним процессом streamlink.
+    Идентификатор процесса — идентификатор писателя: в его командной строке указан
+    путь к файлу, по которому процесс находится при восстановлении после сбоя.
+    Остановка завершает streamlink, а писатель дописывает буфер и закрывает файл,
+    получив конец потока.
+
+    Args:
+        streamlink (asyncio.subprocess.Process): Процесс streamlink.
+        writer (asyncio.subprocess.Process): Процесс-писатель.
+    """
+
+    def __init__(self, streamlink, writer):
+        self.streamlink = streamlink
+        self.writer = writer
+        self.pid = writer.pid
+
+    @property
+    def returncode(self):
+        """Код завершения: None, пока работает хотя бы один процесс, иначе первый ненулевой код."""
+        if self.streamlink.returncode is None or self.writer.returncode is None:
+            return None
+
+        return self.streamlink.returncode or self.writer.returncode
+
+    async def wait(self):
+        """Дожидается завершения обоих процессов и возвращает код завершения."""
+        await self.streamlink.wait()
+        await self.writer.wait()
+
+        return self.returncode
+
+    def terminate(self):
+        """Останавливает streamlink, писатель завершится сам после конца потока."""
+        if self.streamlink.returncode is None:
+            self.streamlink.terminate()
+        elif self.writer.returncode is None:
+            self.writer.terminate()
+
+    def kill(self):
+        """Принудительно завершает оба процесса."""
+        for process in (self.streamlink, self.writer):
+            if process.returncode is None:
+                process.kill()
+
+
+async def start_streamlink(recorded_file_path, user_name, writer_options=None):
+    """
+    Запускает процесс streamlink для записи трансляции в файл.
 
     Args:
         recorded_file_path (str): Путь к файлу, в который будет записан поток.
         user_name (str): Имя пользователя Twitch для записи потока.
-        app (object): Объект приложения, использующий методы `add_record` и `remove_record` для управления записями.
+        writer_options (dict, optional): Параметры `build_writer_command`. Если заданы,
+            поток пишет в файл процесс-писатель, иначе сам streamlink.
+
+    Returns:
+        asyncio.subprocess.Process or WriterPipeline: Запущенный процесс.
+    """
+    command = [
+        "streamlink",
+        "--twitch-disable-ads",
+        f"twitch.tv/{user_name}",
+        "best",
+        "--ringbuffer-size",
+        "128M"
+    ]
+    creationflags = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+
+    if not writer_options:
+        process = await asyncio.create_subprocess_exec(
+            *command, "-o", recorded_file_path, creationflags=creationflags
+        )
+        process.started_at = time.monotonic()
+
+        return process
+
+    read_fd, write_fd = os.pipe()
+
+    try:
+        writer = await asyncio.create_subprocess_exec(
+            *build_writer_command(recorded_file_path, **writer_options), stdin=read_fd
+        )
+
+        try:
+            streamlink = await asyncio.create_subprocess_exec(*command, "--stdout", stdout=write_fd)
+        except Exception:
+            writer.kill()
+            await writer.wait()
+
+            raise
+    finally:
+        # Концы канала остаются только у дочерних процессов, иначе писатель не получит конец потока
+        os.close(read_fd)
+        os.close(write_fd)
+
+    process = WriterPipeline(streamlink, writer)
+    process.started_at = time.monotonic()
+
+    return process
+
+
+async def stop_process(process):
+    """
+    Останавливает процесс, а если он не завершился за отведённое время, завершает его принудительно.
+
+    Время работы процесса учитывается в метриках, поэтому функция вызывается
+    для каждого запущенного процесса, даже если он уже завершился.
+
+    Args:
+        process (asyncio.subprocess.Process): Процесс для остановки.
+    """
+    try:
+        if process.returncode is None:
+            process.terminate()
+            await asyncio.wait_for(process.wait(), timeout=STOP_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+    except ProcessLookupError:
+        pass
+
+    STREAMLINK_LIFETIME.observe(time.monotonic() - process.started_at)
+
+
+def check_segment_limits(part, max_seconds, max_bytes):
+    """
+    Проверяет, не пора ли закрыть текущий сегмент записи по времени или размеру.
+
+    Args:
+        part (dict): Часть записи с ключами `file_path` и `opened_at` (время по `time.monotonic`).
+        max_seconds (float): Максимальная длительность сегмента в секундах, 0 — без ограничения.
+        max_bytes (int): Максимальный размер сегмента в байтах, 0 — без ограничения.
+
+    Returns:
+        str or None: Причина перехода к следующему сегменту или None.
+    """
+    if max_seconds and time.monotonic() - part['opened_at'] >= max_seconds:
+        return "segment_time"
+
+    if max_bytes:
+        try:
+            if os.path.getsize(part['file_path']) >= max_bytes:
+                return "segment_size"
+        except OSError:
+            pass
+
+    return None
+
+
+async def record_broadcast(
+    first_part,
+    user_name,
+    status,
+    logger,
+    check_rollover,
+    open_next_part,
+    close_part,
+    on_part_started,
+    check_interval,
+    overlap_seconds,
+    writer_options=None
+):
+    """Записывает трансляцию с Twitch в файл.
+
+    Корутина запускает процесс `streamlink` для записи потока с Twitch и ожидает его
+    завершения в событийном цикле, не занимая отдельный поток на каждую запись.
+    Модель состояния обновляется без обращения к интерфейсу и не блокирует цикл.
+
+    Каждые `check_interval` секунд, а также при завершении процесса с ошибкой,
+    вызывается `check_rollover`. Если она возвращает причину, открывается следующая
+    часть записи и запись продолжается в неё.
+
+    Args:
+        first_part (dict): Первая часть записи, содержит путь к файлу в ключе `file_path`.
+        user_name (str): Имя пользователя Twitch для записи потока.
+        status (RecorderStatus): Модель состояния, в которой отмечаются начало, части и окончание записи.
         logger (logging.Logger): Логгер.
+        check_rollover (Callable): Блокирующая функция, принимает часть и возвращает причину перехода
+                                   к следующей части или None.
+        open_next_part (Callable): Корутина, принимает текущую часть и причину, возвращает следующую часть или None.
+        close_part (Callable): Вызывается с частью и причиной её закрытия. Процесс части
+                               к этому моменту завершён и доступен в ключе `process`.
+        on_part_started (Callable): Вызывается с частью после запуска её процесса streamlink.
+        check_interval (float): Период проверки необходимости перехода к следующей части в секундах.
+        overlap_seconds (float): Сколько секунд старая и новая части пишутся одновременно.
+        writer_options (dict, optional): Параметры процесса-писателя для `start_streamlink`.
 
     Raises:
         Exception: Если возникает ошибка во время записи потока.
     """
+    part = first_part
+    process = None
+    end_reason = None
+    ACTIVE_RECORDINGS.inc()
+
     try:
-        # Добавляем запись в приложение
-        app.add_record(user_name)
-
-        process = subprocess.Popen([
-            "streamlink",
-            "--twitch-disable-ads",
-            f"twitch.tv/{user_name}",
-            "best",
-            "--ringbuffer-size",
-            "128M",
-            "-o",
-            recorded_file_path
-        ], creationflags=subprocess.CREATE_NO_WINDOW)
-
-        while process.poll() is None:
-            time.sleep(1)
+        # Добавляем запись в модель состояния
+        status.add_record(user_name, part['file_path'])
+
+        process = await start_streamlink(part['file_path'], user_name, writer_options)
+        part['process'] = process
+        on_part_started(part)
+
+        while True:
+            try:
+                return_code = await asyncio.wait_for(process.wait(), timeout=check_interval)
+            except asyncio.TimeoutError:
+                return_code = None
+
+            if return_code == 0:
+                break
+
+            reason = await asyncio.to_thread(check_rollover, part)
+
+            if not reason:
+                if return_code is None:
+                    continue
+
+                break
+
+            next_part = await open_next_part(part, reason)
+
+            if next_part:
+                logger.info(f"Запись {user_name} продолжается в новую часть ({reason}): {next_part['file_path']}")
+
+                next_process = await start_streamlink(next_part['file_path'], user_name, writer_options)
+                next_part['process'] = next_process
+                on_part_started(next_part)
+
+                if return_code is None:
+                    await asyncio.sleep(overlap_seconds)
+
+                if next_process.returncode is not None:
+                    logger.error(f"Не удалось начать новую часть записи {user_name}.")
+                    await stop_process(next_process)
+                    close_part(next_part, "failed")
+
+                    next_part = None
+
+            if not next_part:
+                if return_code is None and reason == "stall":
+                    # Зависший процесс нечем заменить: скорее всего, трансляция закончилась
+                    logger.warning(f"Запись {user_name} остановлена: процесс streamlink завис.")
+                    await stop_process(process)
+                    end_reason = reason
+
+                    break
+
+                if return_code is None:
+                    continue
+
+                break
+
+            await stop_process(process)
+            close_part(part, reason)
+            status.update_record(user_name, next_part['file_path'])
+
+            part, process = next_part, next_process
+
+        close_part(part, end_reason or ("finished" if process.returncode == 0 else f"exit_{process.returncode}"))
+        part = None
     except Exception as err:
         logger.error(f"Ошибка во время записи для {user_name}: {err}")
     finally:
-        # Убираем запись из приложения, когда процесс завершен или произошла ошибка
-        app.remove_record(user_name)
+        if process:
+            await stop_process(process)
+
+        if part:
+            close_part(part, "error")
+
+        # Убираем запись из модели состояния, когда процесс завершен или произошла ошибка
+        status.remove_record(user_name)
+        ACTIVE_RECORDINGS.dec()
@@ -0,0 +1,231 @@
+"""
+Модуль окна программы записи трансляций на tkinter.
+
+Окно подписывается на модель состояния `RecorderStatus` и показывает идущие
+записи. Модуль импортируется только при запуске с интерфейсом, поэтому
+в режиме без интерфейса tkinter не загружается.
+
+Краткое описание классов:
+    - StreamRecorderApp: Окно со списком идущих записей.
+"""
+import queue
+import tkinter as tk
+
+from tkinter import ttk
+from datetime import datetime
+from collections import Counter
+
+
+# Период применения накопившихся изменений к таблице интерфейса в миллисекундах
+UI_UPDATE_INTERVAL_MS = 200
+
+
+class StreamRecorderApp:
+    """
+    Приложение для отображения информации о текущих стримах.
+
+    Этот класс предоставляет функциональность отображения информации
+    о пользователях, времени начала и продолжительности стрима.
+
+    Методы `add_record` и `remove_record` можно вызывать из любого потока: они только
+    ставят изменение в очередь, а поток Tk забирает накопившиеся изменения по таймеру,
+    схлопывает их и применяет к таблице одной пачкой. Продолжительность обновляется
+    только в изменившихся ячейках, а ширина столбцов пересчитывается по счётчикам
+    длин значений без обхода всех строк таблицы.
+
+    Краткое описание функций:
+        - add_record: Ставит в очередь добавление стрима в список активных записей.
+        - remove_record: Ставит в очередь удаление стрима из списка активных.
+        - process_updates: Применяет накопившиеся изменения в потоке Tk.
+        - update_duration: Обновляет продолжительность активных стримов.
+        - resize_columns: Регулирует ширину столбцов в таблице для отображения данных.
+
+    Args:
+        root (tk.Tk): Основное окно приложения.
+        tree (ttk.Treeview): Виджет для отображения информации о стримах.
+        active_records (dict): Словарь с активными записями, где ключ — имя стримера, а значение — информация о записи.
+    """
+
+    def __init__(self, root):
+        """
+        Инициализирует приложение StreamRecorderApp.
+
+        Настроены основные элементы UI, включая таблицу для отображения данных о стримах,
+        а также настройка стилей и начальных значений.
+
+        Args:
+            root (tk.Tk): Основное окно приложения.
+        """
+        self.root = root
+        self.root.title("Stream Recorder")
+        self.root.geometry("600x300")
+        self.root.configure(bg="black")
+
+        style = ttk.Style()
+        style.theme_use("default")
+        style.configure(
+            "Treeview",
+            background="black",
+            foreground="white",
+            fieldbackground="black",
+            font=("Arial", 12),
+            rowheight=25
+        )
+        style.configure(
+            "Treeview.Heading",
+            background="gray",
+            foreground="white",
+            font=("Arial", 12, "bold")
+        )
+        style.map("Treeview", background=[("selected", "gray")])
+
+        self.tree = ttk.Treeview(
+            root,
+            columns=("Streamer", "Start Time", "Duration"),
+            show="headings",
+            style="Treeview"
+        )
+
+        self.tree.heading("Streamer", text="Streamer")
+        self.tree.heading("Start Time", text="Start Time")
+        self.tree.heading("Duration", text="Duration")
+        self.tree.pack(fill=tk.BOTH, expand=True)
+
+        self.min_column_widths = {
+            "Streamer": 100,
+            "Start Time": 150,
+            "Duration": 75
+        }
+
+        self.tree.column("Streamer", width=self.min_column_widths["Streamer"], anchor="center")
+        self.tree.column("Start Time", width=self.min_column_widths["Start Time"], anchor="center")
+        self.tree.column("Duration", width=self.min_column_widths["Duration"], anchor="center")
+
+        self.active_records = {}
+
+        # Изменения из других потоков: (user_name, start_time или None для удаления)
+        self.pending_updates = queue.SimpleQueue()
+        # Для каждого столбца: длина значения -> число строк с такой длиной
+        self.column_lengths = {col: Counter() for col in self.tree["columns"]}
+        self.column_widths = dict(self.min_column_widths)
+
+        self.process_updates()
+        self.update_duration()
+
+    def add_record(self, user_name):
+        """
+        Ставит в очередь добавление нового стрима в список активных стримов.
+
+        В таблице появится строка с именем стримера, временем начала стрима
+        и продолжительностью (начальная продолжительность — 0).
+
+        Args:
+            user_name (str): user_name стримера, трансляция которого была обнаружена.
+        """
+        self.pending_updates.put((user_name, datetime.now()))
+
+    def remove_record(self, user_name):
+        """
+        Ставит в очередь удаление стрима из списка активных.
+
+        Args:
+            user_name (str): Имя стримера, чью запись необходимо удалить.
+        """
+        self.pending_updates.put((user_name, None))
+
+    def process_updates(self):
+        """
+        Применяет накопившиеся изменения в потоке Tk.
+
+        Для каждого стримера учитывается только последнее изменение, поэтому запись,
+        которая успела начаться и закончиться между вызовами, не попадает в таблицу.
+        """
+        updates = {}
+
+        while True:
+            try:
+                user_name, start_time = self.pending_updates.get_nowait()
+            except queue.Empty:
+                break
+
+            updates[user_name] = start_time
+
+        for user_name, start_time in updates.items():
+            if user_name in self.active_records:
+                self._delete_row(user_name)
+
+            if start_time is not None:
+                self._insert_row(user_name, start_time)
+
+        if updates:
+            self.resize_columns()
+
+        self.root.after(UI_UPDATE_INTERVAL_MS, self.process_updates)
+
+    def _insert_row(self, user_name, start_time):
+        """Добавляет строку в таблицу и учитывает длины её значений."""
+        values = (user_name, start_time.strftime("%Y-%m-%d %H:%M:%S"), "0:00:00")
+
+        self.active_records[user_name] = {
+            "start_time": start_time,
+            "values": values,
+            "item_id": self.tree.insert("", "end", values=values)
+        }
+
+        for col, value in zip(self.tree["columns"], values):
+            self.column_lengths[col][len(value)] += 1
+
+    def _delete_row(self, user_name):
+        """Удаляет строку из таблицы и её значения из счётчиков длин."""
+        record = self.active_records.pop(user_name)
+        self.tree.delete(record["item_id"])
+
+        for col, value in zip(self.tree["columns"], record["values"]):
+            self._discard_length(col, len(value))
+
+    def _discard_length(self, col, length):
+        """Уменьшает счётчик длины значения в столбце."""
+        lengths = self.column_lengths[col]
+        lengths[length] -= 1
+
+        if lengths[length] <= 0:
+            del lengths[length]
+
+    def update_duration(self):
+        """
+        Обновляет продолжительность активных стримов.
+
+        Эта функция рассчитывает прошедшее время с момента начала каждого стрима
+        и обновляет только ячейки, значение которых изменилось.
+        """
+        now = datetime.now()
+        lengths_changed = False
+
+        for record in self.active_records.values():
+            duration = str(now - record["start_time"]).split(".", maxsplit=1)[0]
+            old_duration = record["values"][2]
+
+            if duration == old_duration:
+                continue
+
+            self.tree.set(record["item_id"], "Duration", duration)
+            record["values"] = (*record["values"][:2], duration)
+
+            if len(duration) != len(old_duration):
+                self._discard_length("Duration", len(old_duration))
+                self.column_lengths["Duration"][len(duration)] += 1
+                lengths_changed = True
+
+        if lengths_changed:
+            self.resize_columns()
+
+        self.root.after(1000, self.update_duration)
+
+    def resize_columns(self):
+        """Изменяет ширину столбцов по самому длинному значению, если она изменилась."""
+        for col, lengths in self.column_lengths.items():
+            width = max(max(lengths, default=0) * 10, self.min_column_widths.get(col, 100))
+
+            if width != self.column_widths.get(col):
+                self.column_widths[col] = width
+                self.tree.column(col, width=width)
@@ -0,0 +1,190 @@
+"""
+Модуль с общей моделью состояния программы записи трансляций.
+
+Модель хранит идущие записи и сведения об опросе каналов. Её используют запись
+трансляций и цикл опроса, а отображают HTTP-эндпоинт состояния и, если программа
+запущена с интерфейсом, окно `StreamRecorderApp`, подписанное на изменения модели.
+Модуль не зависит от tkinter, поэтому работает и в режиме без интерфейса.
+
+Краткое описание классов:
+    - RecorderStatus: Потокобезопасная модель состояния записей и опроса каналов.
+"""
+import os
+import time
+import threading
+
+from datetime import datetime, timezone
+
+
+class RecorderStatus:
+    """
+    Потокобезопасная модель состояния записей и опроса каналов.
+
+    Краткое описание функций:
+        - subscribe: Подписывает объект на добавление и удаление записей.
+        - add_record: Добавляет идущую запись.
+        - update_record: Добавляет к записи файл новой части.
+        - remove_record: Удаляет запись после её окончания.
+        - record_poll: Сохраняет результат очередного цикла опроса каналов.
+        - record_detections: Сохраняет задержки обнаружения трансляций по каналам.
+        - snapshot: Возвращает текущее состояние в виде словаря для JSON.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        # Имя стримера -> сведения о записи
+        self.records = {}
+        self.subscribers = []
+        self.poll = {
+            "polls": 0,
+            "errors": 0,
+            "last_poll_at": None,
+            "last_poll_duration_seconds": None,
+            "last_polled_channels": 0,
+            "last_live_channels": 0,
+            "last_error_count": 0
+        }
+        # ID канала -> ожидаемая и фактическая задержка обнаружения трансляций
+        self.detections = {}
+
+    def subscribe(self, subscriber):
+        """
+        Подписывает объект на добавление и удаление записей.
+
+        Args:
+            subscriber (object): Объект с методами `add_record(user_name)` и `remove_record(user_name)`,
+                                 которые можно вызывать из любого потока.
+        """
+        with self.lock:
+            self.subscribers.append(subscriber)
+
+    def add_record(self, user_name, file_path=None):
+        """
+        Добавляет идущую запись.
+
+        Args:
+            user_name (str): Имя стримера.
+            file_path (str, optional): Путь к файлу первой части записи.
+        """
+        with self.lock:
+            self.records[user_name] = {
+                "start_time": time.time(),
+                "file_paths": [file_path] if file_path else []
+            }
+            subscribers = list(self.subscribers)
+
+        for subscriber in subscribers:
+            subscriber.add_record(user_name)
+
+    def update_record(self, user_name, file_path):
+        """
+        Добавляет к записи файл новой части.
+
+        Args:
+            user_name (str): Имя стримера.
+            file_path (str): Путь к файлу новой части записи.
+        """
+        with self.lock:
+            if user_name in self.records:
+                self.records[user_name]["file_paths"].append(file_path)
+
+    def remove_record(self, user_name):
+        """
+        Удаляет запись после её окончания.
+
+        Args:
+            user_name (str): Имя стримера.
+        """
+        with self.lock:
+            self.records.pop(user_name, None)
+            subscribers = list(self.subscribers)
+
+        for subscriber in subscribers:
+            subscriber.remove_record(user_name)
+
+    def record_poll(self, channels, live_channels, error_count, duration):
+        """
+        Сохраняет результат очередного цикла опроса каналов.
+
+        Args:
+            channels (int): Сколько каналов было опрошено.
+            live_channels (int): Сколько из них в эфире.
+            error_count (int): Сколько запросов завершилось ошибкой.
+            duration (float): Длительность цикла в секундах.
+        """
+        with self.lock:
+            self.poll["polls"] += 1
+            self.poll["errors"] += error_count
+            self.poll["last_poll_at"] = time.time()
+            self.poll["last_poll_duration_seconds"] = round(duration, 3)
+            self.poll["last_polled_channels"] = channels
+            self.poll["last_live_channels"] = live_channels
+            self.poll["last_error_count"] = error_count
+
+    def record_detections(self, report):
+        """
+        Сохраняет задержки обнаружения трансляций по каналам.
+
+        Args:
+            report (dict): Отчёт `PollScheduler.detection_report()`.
+        """
+        with self.lock:
+            self.detections = report
+
+    def snapshot(self):
+        """
+        Возвращает текущее состояние в виде словаря для JSON.
+
+        Размер записанных файлов определяется при вызове, поэтому метод лучше вызывать
+        вне событийного цикла.
+
+        Returns:
+            dict: Идущие записи, сведения об опросе каналов и задержки обнаружения трансляций.
+        """
+        now = time.time()
+
+        with self.lock:
+            records = {user_name: dict(record, file_paths=list(record["file_paths"]))
+                       for user_name, record in self.records.items()}
+            poll = dict(self.poll)
+            detections = self.detections
+
+        recordings = []
+
+        for user_name, record in sorted(records.items()):
+            output_bytes = 0
+
+            for file_path in record["file_paths"]:
+                try:
+                    output_bytes += os.path.getsize(file_path)
+                except OSError:
+                    pass
+
+            recordings.append({
+                "user_name": user_name,
+                "start_time": datetime.fromtimestamp(record["start_time"], timezone.utc).isoformat(),
+                "duration_seconds": round(now - record["start_time"]),
+                "output_bytes": output_bytes,
+                "parts": len(record["file_paths"]),
+                "file_path": record["file_paths"][-1] if record["file_paths"] else None
+            })
+
+        poll["last_poll_age_seconds"] = round(now - poll["last_poll_at"], 3) if poll["last_poll_at"] else None
+
+        return {
+            "uptime_seconds": round(now - self.started_at),
+            "active_recordings": len(recordings),
+            "recordings": recordings,
+            "poll": poll,
+            "detection": {
+                user_id: {
+                    "tier": stats["tier"],
+                    "expected_delay_seconds": round(stats["expected_delay"], 1),
+                    "last_delay_seconds": round(stats["last_delay"], 1),
+                    "mean_delay_seconds": round(stats["mean_delay"], 1),
+                    "count": stats["count"]
+                }
+                for user_id, stats in sorted(detections.items())
+            }
+        }
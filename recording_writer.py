@@ -0,0 +1,269 @@
+"""
+Модуль записи потока streamlink в файл крупными блоками с предвыделением места.
+
+Запускается отдельным процессом, которому streamlink передаёт поток через
+`--stdout`:
+
+    streamlink ... --stdout | python recording_writer.py <файл> [параметры]
+
+Когда на один массив пишется много трансляций одновременно, запись маленькими
+порциями из разных файлов фрагментирует их и превращается в случайные записи.
+Писатель накапливает поток в буфере и пишет его блоками, кратными размеру
+страницы, заранее выделяет место под файл порциями через `fallocate`, с заданной
+периодичностью сбрасывает данные на диск и убирает уже записанное из кэша
+страниц через `posix_fadvise`, чтобы записи не вытесняли из памяти полезные данные.
+
+Место выделяется с флагом FALLOC_FL_KEEP_SIZE: размер файла растёт только вместе
+с данными, поэтому контроль скорости записи и размеров частей работает как раньше,
+а после сбоя в файле не остаётся нулевого хвоста. При закрытии неиспользованный
+запас освобождается.
+
+Писатель работает отдельным процессом, а не в программе записи: как и streamlink,
+он переживает перезапуск программы и находится при восстановлении записей по пути
+к файлу в командной строке (см. `recovery.find_recording_process`).
+
+Краткое описание функций:
+    - build_writer_command: Возвращает командную строку процесса-писателя.
+    - fallocate: Выделяет место под файл, не меняя его размер.
+    - write_stream: Переписывает поток из дескриптора в файл.
+
+Краткое описание классов:
+    - BlockWriter: Запись в файл блоками с предвыделением, fsync и сбросом кэша.
+"""
+import os
+import sys
+import ctypes
+import select
+import signal
+import argparse
+
+
+PAGE_SIZE = 4096
+MB = 1024 ** 2
+
+FALLOC_FL_KEEP_SIZE = 0x01
+
+
+def _load_fallocate():
+    """Возвращает функцию fallocate из libc или None, если она недоступна (не Linux)."""
+    try:
+        function = ctypes.CDLL(None, use_errno=True).fallocate
+    except (OSError, AttributeError):
+        return None
+
+    function.argtypes = (ctypes.c_int, ctypes.c_int, ctypes.c_int64, ctypes.c_int64)
+    function.restype = ctypes.c_int
+
+    return function
+
+
+_fallocate = _load_fallocate()
+
+
+def build_writer_command(file_path, block_size_mb, preallocate_mb, fsync_mb, drop_cache, flush_seconds):
+    """
+    Возвращает командную строку процесса-писателя.
+
+    Args:
+        file_path (str): Путь к файлу записи.
+        block_size_mb (float): Размер блока записи в мегабайтах.
+        preallocate_mb (float): Размер порции предвыделения в мегабайтах, 0 — без предвыделения.
+        fsync_mb (float): Через сколько мегабайт сбрасывать данные на диск, 0 — только при закрытии.
+        drop_cache (bool): Убирать записанные и сброшенные на диск данные из кэша страниц.
+        flush_seconds (float): Как часто писать неполный блок, если поток идёт медленно.
+
+    Returns:
+        list: Аргументы для запуска процесса.
+    """
+    command = [
+        sys.executable,
+        os.path.abspath(__file__),
+        file_path,
+        "--block-size-mb", str(block_size_mb),
+        "--preallocate-mb", str(preallocate_mb),
+        "--fsync-mb", str(fsync_mb),
+        "--flush-seconds", str(flush_seconds)
+    ]
+
+    if drop_cache:
+        command.append("--drop-cache")
+
+    return command
+
+
+def fallocate(fd, offset, length, mode=FALLOC_FL_KEEP_SIZE):
+    """
+    Выделяет место под файл, не меняя его размер.
+
+    Args:
+        fd (int): Дескриптор файла.
+        offset (int): Начало диапазона в байтах.
+        length (int): Длина диапазона в байтах.
+        mode (int): Флаги fallocate.
+
+    Returns:
+        bool: True, если место выделено. False, если файловая система или система этого не поддерживает.
+    """
+    if not _fallocate or length <= 0:
+        return False
+
+    return _fallocate(fd, mode, offset, length) == 0
+
+
+class BlockWriter:
+    """
+    Запись в файл блоками с предвыделением места, периодическим fsync и сбросом кэша страниц.
+
+    Краткое описание функций:
+        - write: Пишет данные в конец файла.
+        - close: Сбрасывает данные на диск, освобождает неиспользованный запас и закрывает файл.
+
+    Args:
+        file_path (str): Путь к файлу записи. Если файл уже есть, запись продолжается в его конец.
+        preallocate_bytes (int): Размер порции предвыделения, 0 — без предвыделения.
+        fsync_bytes (int): Через сколько байт сбрасывать данные на диск, 0 — только при закрытии.
+        drop_cache (bool): Убирать сброшенные на диск данные из кэша страниц.
+    """
+
+    def __init__(self, file_path, preallocate_bytes, fsync_bytes, drop_cache):
+        self.fd = os.open(file_path, os.O_WRONLY | os.O_CREAT, 0o644)
+        self.preallocate_bytes = preallocate_bytes
+        self.fsync_bytes = fsync_bytes
+        self.drop_cache = drop_cache and hasattr(os, "posix_fadvise")
+
+        self.written = os.lseek(self.fd, 0, os.SEEK_END)
+        self.allocated = self.written
+        self.synced = self.written
+
+    def _sync(self):
+        """Сбрасывает записанные данные на диск и убирает их из кэша страниц."""
+        getattr(os, "fdatasync", os.fsync)(self.fd)
+
+        if self.drop_cache:
+            # Кэш чистых страниц освобождается сразу, поэтому сначала нужен fdatasync
+            start = self.synced - self.synced % PAGE_SIZE
+            os.posix_fadvise(self.fd, start, self.written - start, os.POSIX_FADV_DONTNEED)
+
+        self.synced = self.written
+
+    def write(self, data):
+        """
+        Пишет данные в конец файла, при необходимости выделяя место и сбрасывая данные на диск.
+
+        Args:
+            data (bytes-like): Данные для записи.
+        """
+        if self.preallocate_bytes and self.written + len(data) > self.allocated:
+            # Если файловая система не поддерживает fallocate, запись продолжается без предвыделения
+            if fallocate(self.fd, self.allocated, self.preallocate_bytes):
+                self.allocated += self.preallocate_bytes
+            else:
+                self.preallocate_bytes = 0
+
+        view = memoryview(data)
+
+        while view:
+            count = os.write(self.fd, view)
+            view = view[count:]
+            self.written += count
+
+        self.allocated = max(self.allocated, self.written)
+
+        if self.fsync_bytes and self.written - self.synced >= self.fsync_bytes:
+            self._sync()
+
+    def close(self):
+        """Сбрасывает данные на диск, освобождает неиспользованный запас места и закрывает файл."""
+        try:
+            self._sync()
+
+            # Усечение до текущего размера освобождает выделенные за концом файла блоки
+            if self.allocated > self.written:
+                os.ftruncate(self.fd, self.written)
+        finally:
+            os.close(self.fd)
+
+
+def write_stream(input_fd, writer, block_size, flush_seconds):
+    """
+    Переписывает поток из дескриптора в файл до конца потока.
+
+    Данные пишутся полными блоками `block_size`. Если блок не набрался за
+    `flush_seconds`, пишется накопленная часть, кратная размеру страницы, чтобы
+    медленный поток не задерживался в памяти и смещения записей оставались выровненными.
+
+    Args:
+        input_fd (int): Дескриптор входного потока.
+        writer (BlockWriter): Файл для записи.
+        block_size (int): Размер блока в байтах, кратный размеру страницы.
+        flush_seconds (float): Максимальное время хранения данных в буфере.
+    """
+    buffer = bytearray(block_size)
+    view = memoryview(buffer)
+    filled = 0
+
+    try:
+        while True:
+            ready, _, _ = select.select([input_fd], [], [], flush_seconds)
+
+            if not ready:
+                aligned = filled - filled % PAGE_SIZE
+
+                if aligned:
+                    writer.write(view[:aligned])
+                    view[:filled - aligned] = view[aligned:filled]
+                    filled -= aligned
+
+                continue
+
+            count = os.readv(input_fd, [view[filled:]])
+
+            if not count:
+                break
+
+            filled += count
+
+            if filled == block_size:
+                writer.write(view)
+                filled = 0
+    finally:
+        # Остаток буфера дописывается и при остановке писателя сигналом
+        if filled:
+            writer.write(view[:filled])
+
+
+def parse_args():
+    """Разбирает аргументы командной строки."""
+    parser = argparse.ArgumentParser(description="Запись потока из stdin в файл крупными блоками.")
+    parser.add_argument("file_path")
+    parser.add_argument("--block-size-mb", type=float, default=4)
+    parser.add_argument("--preallocate-mb", type=float, default=256)
+    parser.add_argument("--fsync-mb", type=float, default=64)
+    parser.add_argument("--flush-seconds", type=float, default=5)
+    parser.add_argument("--drop-cache", action="store_true")
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    block_size = max(PAGE_SIZE, int(args.block_size_mb * MB) // PAGE_SIZE * PAGE_SIZE)
+
+    # Остановка писателя завершает чтение, а накопленные данные дописываются в файл
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    writer = BlockWriter(
+        file_path         = args.file_path,
+        preallocate_bytes = int(args.preallocate_mb * MB),
+        fsync_bytes       = int(args.fsync_mb * MB),
+        drop_cache        = args.drop_cache
+    )
+
+    try:
+        write_stream(sys.stdin.fileno(), writer, block_size, args.flush_seconds)
+    finally:
+        writer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Модуль для восстановления состояния записей после аварийной остановки программы.
+
+Части записи, у которых в таблице `recording_parts` нет времени окончания, остались
+от прошлого запуска. Если процесс streamlink такой части ещё работает (процессы
+записи не завершаются вместе с программой), к нему можно подключиться и дождаться
+его окончания. Иначе файл части считается оборванным.
+
+Краткое описание функций:
+    - load_unfinished_parts: Возвращает незакрытые части записей из базы данных.
+    - find_recording_process: Находит процесс streamlink или писателя, который пишет указанный файл.
+    - is_process_alive: Проверяет, что процесс работает и не завершился.
+    - stop_detached_process: Останавливает процесс, запущенный прошлым экземпляром программы.
+"""
+import os
+
+import psutil
+
+
+# Процессы, которые пишут файл записи: сам streamlink или процесс-писатель, получающий поток от него
+RECORDING_PROCESS_NAMES = ("streamlink", "recording_writer")
+
+def load_unfinished_parts(database):
+    """
+    Возвращает незакрытые части записей из базы данных.
+
+    Args:
+        database (Database): База данных.
+
+    Returns:
+        list: Словари с данными части записи и её трансляции.
+    """
+    rows = database.read('''
+        SELECT
+            recording_parts.broadcast_id,
+            recording_parts.part_number,
+            recording_parts.file_path,
+            recording_parts.pid,
+            live_broadcast.user_id,
+            live_broadcast.user_name,
+            live_broadcast.stream_id
+        FROM recording_parts
+        JOIN live_broadcast ON live_broadcast.id = recording_parts.broadcast_id
+        WHERE recording_parts.ended_at IS NULL
+        ORDER BY recording_parts.broadcast_id, recording_parts.part_number
+    ''')
+    keys = ("broadcast_id", "number", "file_path", "pid", "user_id", "user_name", "stream_id")
+
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def find_recording_process(pid, file_path):
+    """
+    Находит процесс streamlink или процесс-писатель (`recording_writer.py`), который пишет указанный файл.
+
+    Идентификатор процесса мог достаться другому процессу, поэтому дополнительно
+    проверяется, что в командной строке процесса указан путь к файлу записи.
+
+    Args:
+        pid (int): Идентификатор процесса из базы данных.
+        file_path (str): Путь к файлу части записи.
+
+    Returns:
+        psutil.Process or None: Процесс записи или None, если он уже не работает.
+    """
+    if not pid:
+        return None
+
+    try:
+        process = psutil.Process(pid)
+
+        if process.status() == psutil.STATUS_ZOMBIE:
+            return None
+
+        cmdline = process.cmdline()
+    except psutil.Error:
+        return None
+
+    is_recording_process = any(
+        name in os.path.basename(arg) for arg in cmdline[:2] for name in RECORDING_PROCESS_NAMES
+    )
+
+    if is_recording_process and file_path in cmdline:
+        return process
+
+    return None
+
+
+def is_process_alive(process):
+    """
+    Проверяет, что процесс работает и не завершился.
+
+    Args:
+        process (psutil.Process): Процесс для проверки.
+
+    Returns:
+        bool: True, если процесс работает.
+    """
+    try:
+        return process.is_running() and process.status() != psutil.STATUS_ZOMBIE
+    except psutil.Error:
+        return False
+
+
+def stop_detached_process(process, timeout=10):
+    """
+    Останавливает процесс, запущенный прошлым экземпляром программы.
+
+    Args:
+        process (psutil.Process): Процесс для остановки.
+        timeout (float): Сколько секунд ждать завершения процесса перед kill.
+    """
+    try:
+        process.terminate()
+        process.wait(timeout=timeout)
+    except psutil.TimeoutExpired:
+        process.kill()
+    except psutil.Error:
+        pass
@@ -1,45 +1,204 @@
 """
 Модуль для создания логгера.
+
+Записи журнала не пишутся в файл и консоль в том потоке, который их создал:
+обработчик `QueueHandler` только кладёт запись в очередь, а вывод выполняет
+фоновый поток `QueueListener`. Поэтому медленный диск или консоль не задерживают
+цикл опроса и записи трансляций. Файл журнала ротируется по размеру или по времени.
+
+Краткое описание функций:
+    - set_logger: Настраивает корневой логгер с выводом через очередь.
+    - get_channel_logger: Возвращает дочерний логгер для записей одного канала.
+    - stop_logger: Дожидается вывода накопившихся записей и останавливает фоновый поток.
+
+Краткое описание классов:
+    - JsonFormatter: Форматирует записи журнала в JSON, по одному объекту на строку.
+    - RecordQueueHandler: Кладёт записи в очередь, не смешивая текст исключения с сообщением.
 """
 import os
+import copy
+import json
+import queue
+import atexit
 import logging
+import logging.handlers
 
 from datetime import datetime
 
 
-def set_logger(log_folder: str = None) -> logging.Logger:
+LOG_FILENAME = "recorder.log"
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+CHANNEL_LOGGER_PREFIX = "channel"
+
+# Обработчик очереди и фоновый поток вывода, созданные последним вызовом set_logger
+_queue_handler = None
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Форматирует записи журнала в JSON, по одному объекту на строку.
+
+    Помимо времени, уровня и сообщения в запись попадает имя логгера, а для
+    логгеров каналов (см. `get_channel_logger`) — имя канала в поле `channel`.
+    """
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).astimezone().isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+
+        name_parts = record.name.split(".")
+
+        if CHANNEL_LOGGER_PREFIX in name_parts[:-1]:
+            entry["channel"] = name_parts[-1]
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RecordQueueHandler(logging.handlers.QueueHandler):
+    """
+    Кладёт записи журнала в очередь, не смешивая текст исключения с сообщением.
+
+    Стандартный `QueueHandler.prepare` дописывает трассировку к сообщению и
+    очищает `exc_info`, поэтому форматировщик в фоновом потоке уже не видит
+    исключения. Здесь трассировка сохраняется отдельно в `exc_text`: текстовый
+    формат выводит её после сообщения, а JSON — в поле `exception`.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+
+        # Трассировка уже в тексте: ссылки на кадры стека не держатся в очереди
+        record.exc_info = None
+
+        return record
+
+
+def stop_logger():
+    """Дожидается вывода накопившихся записей и останавливает фоновый поток вывода."""
+    global _listener
+
+    if _listener:
+        _listener.stop()
+
+        for handler in _listener.handlers:
+            handler.close()
+
+        _listener = None
+
+
+def set_logger(
+    log_folder: str = None,
+    json_format: bool = False,
+    max_bytes: int = 50 * 1024 ** 2,
+    backup_count: int = 10,
+    rotate_when: str = None
+) -> logging.Logger:
     """
     Создает и настраивает логгер для записи логов в файл и вывод в консоль.
 
     Логгер использует формат:
     `YYYY-MM-DD HH:MM:SS - LEVELNAME - Сообщение`
+    или, если `json_format` включён, одну JSON-строку на запись.
+
+    Если указана папка `log_folder`, логи также сохраняются в файл `recorder.log`,
+    который ротируется по размеру `max_bytes` или, если указан `rotate_when`, по времени.
+    Хранится не больше `backup_count` старых файлов.
 
-    Если указана папка `log_folder`, логи также сохраняются в файле
-    с именем в формате `YYYY-MM-DD HH-MM-SS.log`.
+    Повторный вызов заменяет прежние обработчики, а не добавляет новые.
 
     Args:
         log_folder (str, optional): Путь к папке для сохранения логов.
             Если `None`, логи пишутся только в консоль.
+        json_format (bool): Писать записи в формате JSON.
+        max_bytes (int): Размер файла журнала, после которого он ротируется.
+        backup_count (int): Сколько старых файлов журнала хранить.
+        rotate_when (str, optional): Ротация по времени, как `when` в `TimedRotatingFileHandler`
+            (например, "midnight"). Если `None`, файл ротируется по размеру.
 
     Returns:
         logging.Logger: Настроенный объект логгера.
     """
+    global _queue_handler, _listener
+
     logger = logging.getLogger()
     logger.setLevel(logging.INFO)
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+
+    if json_format:
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT)
+
+    handlers = []
 
     if log_folder:
-        log_filename = datetime.now().strftime('%Y-%m-%d %H-%M-%S.log')
-        log_file_path = os.path.join(log_folder, log_filename)
+        log_file_path = os.path.join(log_folder, LOG_FILENAME)
 
         os.makedirs(log_folder, exist_ok=True)
 
-        file_handler = logging.FileHandler(log_file_path, encoding='utf-8')
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        if rotate_when:
+            file_handler = logging.handlers.TimedRotatingFileHandler(
+                log_file_path, when=rotate_when, backupCount=backup_count, encoding='utf-8'
+            )
+        else:
+            file_handler = logging.handlers.RotatingFileHandler(
+                log_file_path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+            )
+
+        handlers.append(file_handler)
+
+    handlers.append(logging.StreamHandler())
+
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    # При повторной настройке прежние обработчики снимаются, чтобы записи не дублировались
+    if _queue_handler:
+        logger.removeHandler(_queue_handler)
 
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    stop_logger()
+
+    log_queue = queue.SimpleQueue()
+    _queue_handler = RecordQueueHandler(log_queue)
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    logger.addHandler(_queue_handler)
 
     return logger
+
+
+def get_channel_logger(main_logger: logging.Logger, user_name: str) -> logging.Logger:
+    """
+    Возвращает дочерний логгер для записей одного канала.
+
+    Записи идут через обработчики основного логгера, а в формате JSON содержат имя канала.
+
+    Args:
+        main_logger (logging.Logger): Основной логгер.
+        user_name (str): Имя канала.
+
+    Returns:
+        logging.Logger: Логгер канала.
+    """
+    return main_logger.getChild(f"{CHANNEL_LOGGER_PREFIX}.{user_name}")
+
+
+atexit.register(stop_logger)
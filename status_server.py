@@ -0,0 +1,71 @@
+"""
+Модуль HTTP-эндпоинта состояния программы записи трансляций.
+
+Сервер работает в общем событийном цикле на `asyncio.start_server` и отдаёт
+состояние модели `RecorderStatus` в формате JSON по адресу `/status`, а метрики
+в текстовом формате Prometheus по адресу `/metrics`.
+
+Краткое описание функций:
+    - start_status_server: Запускает HTTP-сервер состояния.
+"""
+import json
+import asyncio
+
+from http_utils import read_request, write_response
+from metrics import REGISTRY
+
+
+STATUS_PATHS = ("/", "/status")
+METRICS_PATH = "/metrics"
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+async def start_status_server(host, port, status, main_logger):
+    """
+    Запускает HTTP-сервер состояния в текущем событийном цикле.
+
+    Args:
+        host (str): Адрес для прослушивания.
+        port (int): Порт для прослушивания.
+        status (RecorderStatus): Модель состояния программы.
+        main_logger (logging.Logger): Логгер.
+
+    Returns:
+        asyncio.Server: Запущенный сервер.
+    """
+    logger = main_logger.getChild('status_server')
+
+    async def handle(reader, writer):
+        try:
+            method, path, _, _ = await read_request(reader, 0)
+
+            if method != 'GET':
+                await write_response(writer, 405)
+
+                return
+
+            path = path.split('?', 1)[0]
+
+            if path == METRICS_PATH:
+                await write_response(writer, 200, REGISTRY.render().encode('utf-8'), METRICS_CONTENT_TYPE)
+
+                return
+
+            if path not in STATUS_PATHS:
+                await write_response(writer, 404)
+
+                return
+
+            # Размеры файлов читаются с диска, поэтому состояние собирается в пуле потоков
+            snapshot = await asyncio.to_thread(status.snapshot)
+            body = json.dumps(snapshot, ensure_ascii=False).encode('utf-8')
+
+            await write_response(writer, 200, body, 'application/json; charset=utf-8')
+        except Exception as err:
+            logger.error(f"Ошибка при обработке запроса состояния: {err}")
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    logger.info(f"Эндпоинт состояния запущен на http://{host}:{port}/status.")
+
+    return server
@@ -0,0 +1,39 @@
+"""
+Модуль для проверки состояния хранилища, на которое идёт запись.
+
+Краткое описание функций:
+    - check_part_storage: Проверяет доступность и свободное место диска текущей части записи.
+"""
+import os
+
+import psutil
+
+
+def check_part_storage(part, min_free_bytes, logger):
+    """
+    Проверяет доступность и свободное место диска, на который пишется часть записи.
+
+    Args:
+        part (dict): Часть записи с ключами `file_path` и `reservation`.
+        min_free_bytes (int): Порог свободного места, ниже которого запись нужно перенести.
+        logger (logging.Logger): Логгер.
+
+    Returns:
+        str or None: Причина переноса записи на другое хранилище или None, если с диском всё в порядке.
+    """
+    mount_point = part['reservation']['mount_point']
+
+    try:
+        os.stat(os.path.dirname(part['file_path']))
+        free = psutil.disk_usage(mount_point).free
+    except OSError as err:
+        logger.error(f"Хранилище {mount_point} недоступно во время записи {part['file_path']}: {err}")
+
+        return "storage_error"
+
+    if free < min_free_bytes:
+        logger.warning(f"На диске {mount_point} осталось {free / 1024 ** 3:.1f} ГБ, запись будет перенесена.")
+
+        return "storage_low"
+
+    return None
@@ -0,0 +1,109 @@
+"""
+Тесты дописывания названия трансляции, запись которой началась по уведомлению EventSub.
+
+Запрос к `helix/streams` подменяется, а название сохраняется во временную базу
+данных, после чего трансляция ищется по нему через каталог записей.
+
+Запуск:
+    python -m pytest tests
+"""
+import os
+import sys
+import shutil
+import asyncio
+import logging
+import tempfile
+import unittest
+
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import twitch_live_broadcasts_recorder as recorder
+
+from database import Database
+from init_database import init_database
+from catalog import RecordingsCatalog
+
+
+class StaticTokenManager:
+    """Менеджер токена, который всегда возвращает одни и те же заголовки."""
+
+    def get_headers(self):
+        return {"Client-ID": "test", "Authorization": "Bearer test"}
+
+
+class FillBroadcastTitleTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix="title_test_")
+        self.logger = logging.getLogger("test")
+        database_path = os.path.join(self.workdir, "streams.db")
+
+        init_database(database_path=database_path, main_logger=self.logger)
+        self.database = Database(database_path=database_path, main_logger=self.logger)
+        self.database.start()
+
+        self.broadcast_id = self.database.write('''
+            INSERT INTO live_broadcast (user_id, user_name, stream_id, recording_start, title, state)
+            VALUES ('42', 'streamer', '100', '2024-01-01 00-00-00', '', 'recording')
+        ''').result()
+
+        patcher = mock.patch.multiple(recorder, database=self.database, limiter=None, create=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.database.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def fill_title(self, responses):
+        """Дописывает название, отвечая на запросы к helix/streams по очереди из `responses`."""
+        def fetch_streams_chunk(user_ids, headers, limiter):
+            response = responses.pop(0)
+
+            if isinstance(response, Exception):
+                raise response
+
+            return response
+
+        with mock.patch.object(recorder, "fetch_streams_chunk", fetch_streams_chunk):
+            return asyncio.run(recorder.fill_broadcast_title(
+                token_manager  = StaticTokenManager(),
+                broadcast_id   = self.broadcast_id,
+                user_id        = "42",
+                stream_id      = "100",
+                delays         = [0] * 3,
+                channel_logger = self.logger
+            ))
+
+    def stored_title(self):
+        return self.database.read("SELECT title FROM live_broadcast WHERE id = ?", (self.broadcast_id,))[0][0]
+
+    def test_title_is_stored_and_searchable(self):
+        title = self.fill_title([
+            OSError("сеть недоступна"),
+            [],
+            [{"id": "100", "user_id": "42", "title": "Спидран марафон"}]
+        ])
+
+        self.assertEqual(title, "Спидран марафон")
+        self.assertEqual(self.stored_title(), "Спидран марафон")
+
+        catalog = RecordingsCatalog(database=self.database, storage_paths=[], main_logger=self.logger)
+
+        self.assertEqual([broadcast['id'] for broadcast in catalog.search("марафон")], [self.broadcast_id])
+
+    def test_other_broadcast_title_is_not_used(self):
+        title = self.fill_title([[{"id": "101", "user_id": "42", "title": "Другая трансляция"}]])
+
+        self.assertIsNone(title)
+        self.assertEqual(self.stored_title(), "")
+
+    def test_gives_up_after_all_delays(self):
+        self.assertIsNone(self.fill_title([[], [], []]))
+        self.assertEqual(self.stored_title(), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
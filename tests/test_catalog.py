@@ -0,0 +1,154 @@
+"""
+Тесты каталога записей трансляций.
+
+Хранилищем служит временная папка с файлами, названными как в `get_video_path`,
+а каталог и трансляции хранятся во временной базе данных.
+
+Запуск:
+    python -m pytest tests
+"""
+import os
+import sys
+import shutil
+import logging
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from init_database import init_database
+from catalog import RecordingsCatalog, parse_recording_name, scan_storage
+
+
+def touch(file_path, size=0):
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+    with open(file_path, "wb") as file:
+        file.write(b"\0" * size)
+
+
+class ParseRecordingNameTest(unittest.TestCase):
+
+    def test_first_part(self):
+        self.assertEqual(parse_recording_name("2024-01-02 03-04-05 - 123 - broadcast - streamer.mp4"), {
+            "recording_start": "2024-01-02 03-04-05",
+            "stream_id": "123",
+            "user_name": "streamer",
+            "part_number": 1
+        })
+
+    def test_numbered_part(self):
+        parsed = parse_recording_name("2024-01-02 03-04-05 - 123 - broadcast - streamer - part 002.ts")
+
+        self.assertEqual((parsed["user_name"], parsed["part_number"]), ("streamer", 2))
+
+    def test_user_name_with_separator(self):
+        parsed = parse_recording_name("2024-01-02 03-04-05 - 123 - broadcast - a - b.mkv")
+
+        self.assertEqual(parsed["user_name"], "a - b")
+
+    def test_foreign_names(self):
+        for file_name in ("video.mp4", "2024-01-02 03-04-05 - abc - broadcast - streamer.mp4",
+                          "2024-01-02 03-04-05 - 123 - broadcast - streamer"):
+            self.assertIsNone(parse_recording_name(file_name))
+
+
+class ScanStorageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.storage_path = tempfile.mkdtemp(prefix="catalog_storage_")
+
+    def tearDown(self):
+        shutil.rmtree(self.storage_path, ignore_errors=True)
+
+    def test_unchanged_dirs_are_not_read(self):
+        channel_dir = os.path.join(self.storage_path, "streamer")
+        touch(os.path.join(channel_dir, "2024-01-02 03-04-05 - 123 - broadcast - streamer.mp4"), size=10)
+        touch(os.path.join(channel_dir, "notes.txt"))
+
+        changed, seen = scan_storage(self.storage_path, {})
+
+        self.assertEqual(seen, {self.storage_path, channel_dir})
+        self.assertEqual([name for _, name, _, _ in changed[channel_dir][1]],
+                         ["2024-01-02 03-04-05 - 123 - broadcast - streamer.mp4"])
+
+        known_dirs = {dir_path: mtime_ns for dir_path, (mtime_ns, _) in changed.items()}
+        changed, seen = scan_storage(self.storage_path, known_dirs)
+
+        self.assertEqual(changed, {})
+        self.assertEqual(seen, {self.storage_path, channel_dir})
+
+        # Новый файл меняет время изменения папки канала, но не корня хранилища
+        touch(os.path.join(channel_dir, "2024-01-03 03-04-05 - 124 - broadcast - streamer.mp4"))
+        os.utime(channel_dir, ns=(0, known_dirs[channel_dir] + 1))
+
+        changed, _ = scan_storage(self.storage_path, known_dirs)
+
+        self.assertEqual(list(changed), [channel_dir])
+        self.assertEqual(len(changed[channel_dir][1]), 2)
+
+    def test_unavailable_storage_raises(self):
+        with self.assertRaises(OSError):
+            scan_storage(os.path.join(self.storage_path, "missing"), {})
+
+
+class CatalogSearchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix="catalog_test_")
+        self.storage_path = os.path.join(self.workdir, "storage")
+        logger = logging.getLogger("test")
+        database_path = os.path.join(self.workdir, "streams.db")
+
+        init_database(database_path=database_path, main_logger=logger)
+        self.database = Database(database_path=database_path, main_logger=logger)
+        self.database.start()
+
+        self.catalog = RecordingsCatalog(database=self.database, storage_paths=[self.storage_path], main_logger=logger)
+
+        broadcasts = [
+            ("1", "alpha", "101", "2024-01-01 10-00-00", "Спидран марафон"),
+            ("1", "alpha", "102", "2024-01-02 10-00-00", "Вечерний стрим"),
+            ("2", "beta", "201", "2024-01-03 10-00-00", "Марафон выживания")
+        ]
+
+        for user_id, user_name, stream_id, recording_start, title in broadcasts:
+            self.database.write('''
+                INSERT INTO live_broadcast (user_id, user_name, stream_id, recording_start, title, state)
+                VALUES (?, ?, ?, ?, ?, 'finished')
+            ''', (user_id, user_name, stream_id, recording_start, title)).result()
+
+        touch(os.path.join(self.storage_path, "alpha", "2024-01-01 10-00-00 - 101 - broadcast - alpha.mp4"), size=5)
+        touch(os.path.join(self.storage_path, "alpha", "2024-01-01 10-00-00 - 101 - broadcast - alpha - part 002.mp4"))
+
+        self.catalog.scan()
+
+    def tearDown(self):
+        self.database.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def test_search_by_title_prefix(self):
+        broadcasts = self.catalog.search("мара")
+
+        self.assertEqual([broadcast["stream_id"] for broadcast in broadcasts], ["201", "101"])
+        self.assertEqual([file["part_number"] for file in broadcasts[1]["files"]], [1, 2])
+        self.assertEqual(broadcasts[1]["files"][0]["size_bytes"], 5)
+        self.assertEqual(broadcasts[0]["files"], [])
+
+    def test_search_by_user_name(self):
+        broadcasts = self.catalog.search(user_name="ALPHA")
+
+        self.assertEqual([broadcast["stream_id"] for broadcast in broadcasts], ["102", "101"])
+
+    def test_search_by_text_and_user_name(self):
+        broadcasts = self.catalog.search("марафон", user_name="beta")
+
+        self.assertEqual([broadcast["title"] for broadcast in broadcasts], ["Марафон выживания"])
+
+    def test_search_quotes_query(self):
+        self.assertEqual(self.catalog.search('"марафон OR'), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
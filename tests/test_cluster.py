@@ -0,0 +1,179 @@
+"""
+Тесты распределения каналов и аренды записей в режиме кластера.
+
+Хранилищем координации служит временный файл SQLite, к которому подключаются
+несколько узлов `ClusterCoordinator`, как к общему файлу на разных серверах.
+
+Запуск:
+    python -m pytest tests
+"""
+import os
+import sys
+import time
+import shutil
+import asyncio
+import logging
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cluster import HashRing, ClusterCoordinator
+
+
+CHANNELS = [str(user_id) for user_id in range(1000, 3000)]
+
+
+class HashRingTest(unittest.TestCase):
+
+    def test_empty_ring_has_no_owner(self):
+        self.assertIsNone(HashRing((), 64).owner("1"))
+
+    def test_owner_is_stable_and_spread(self):
+        ring = HashRing(["a", "b", "c"], 64)
+        owners = [ring.owner(channel) for channel in CHANNELS]
+
+        self.assertEqual(owners, [HashRing(["c", "a", "b"], 64).owner(channel) for channel in CHANNELS])
+
+        for node in ("a", "b", "c"):
+            # Каждый узел получает заметную долю каналов
+            self.assertGreater(owners.count(node), len(CHANNELS) / 6)
+
+    def test_removed_node_moves_only_its_channels(self):
+        before = HashRing(["a", "b", "c"], 64)
+        after = HashRing(["a", "b"], 64)
+
+        for channel in CHANNELS:
+            if before.owner(channel) != "c":
+                self.assertEqual(after.owner(channel), before.owner(channel))
+
+
+class ClusterCoordinatorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix="cluster_test_")
+        self.store_path = os.path.join(self.workdir, "cluster.db")
+        self.nodes = []
+
+    def tearDown(self):
+        for node in self.nodes:
+            node.executor.shutdown(wait=False)
+            node.conn.close()
+
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def make_node(self, node_id, lease_seconds=10, heartbeat_seconds=2):
+        node = ClusterCoordinator(
+            store_path        = self.store_path,
+            node_id           = node_id,
+            heartbeat_seconds = heartbeat_seconds,
+            lease_seconds     = lease_seconds,
+            virtual_nodes     = 64,
+            main_logger       = logging.getLogger("test")
+        )
+        self.nodes.append(node)
+
+        return node
+
+    def test_live_nodes_split_channels(self):
+        first = self.make_node("a")
+        second = self.make_node("b")
+        first.heartbeat()
+        second.heartbeat()
+        first.heartbeat()
+
+        for channel in CHANNELS[:200]:
+            self.assertNotEqual(first.owns(channel), second.owns(channel))
+
+    def test_acquire_is_exclusive_while_lease_is_valid(self):
+        first = self.make_node("a")
+        second = self.make_node("b")
+
+        self.assertTrue(first.acquire("42"))
+        self.assertFalse(second.acquire("42"))
+        # Повторный захват своей аренды разрешён
+        self.assertTrue(first.acquire("42"))
+
+        first.release("42")
+
+        self.assertTrue(second.acquire("42"))
+
+    def test_expired_lease_is_taken_over_and_reported_lost(self):
+        first = self.make_node("a", lease_seconds=0.2)
+        second = self.make_node("b", lease_seconds=0.2)
+
+        self.assertTrue(first.acquire("42"))
+        time.sleep(0.3)
+
+        self.assertTrue(second.acquire("42"))
+        self.assertEqual(first.heartbeat(), {"42"})
+        self.assertNotIn("42", first.held)
+        self.assertFalse(first.acquire("42"))
+
+    def test_heartbeat_renews_held_leases(self):
+        first = self.make_node("a", lease_seconds=0.4)
+        second = self.make_node("b", lease_seconds=0.4)
+
+        self.assertTrue(first.acquire("42"))
+
+        for _ in range(4):
+            time.sleep(0.15)
+            self.assertEqual(first.heartbeat(), set())
+
+        self.assertFalse(second.acquire("42"))
+
+    def run_loop_until_stopped(self, node, timeout):
+        """Запускает цикл отметок узла и возвращает каналы, записи которых он остановил."""
+        stopped = []
+
+        async def run():
+            task = asyncio.create_task(node.run_heartbeat_loop(stopped.append))
+            deadline = time.monotonic() + timeout
+
+            while not stopped and time.monotonic() < deadline:
+                await asyncio.sleep(0.02)
+
+            task.cancel()
+
+        asyncio.run(run())
+
+        return stopped
+
+    def test_slow_heartbeat_stops_recordings(self):
+        node = self.make_node("a", lease_seconds=0.4, heartbeat_seconds=0.05)
+        node.heartbeat()
+        self.assertTrue(node.acquire("42"))
+
+        heartbeat = node.heartbeat
+
+        def slow_heartbeat():
+            # Отметка не завершается ошибкой, а задерживается дольше срока аренды
+            time.sleep(1)
+
+            return heartbeat()
+
+        node.heartbeat = slow_heartbeat
+        started = time.monotonic()
+
+        stopped = self.run_loop_until_stopped(node, timeout=2)
+
+        self.assertEqual(stopped, [{"42"}])
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(node.held, set())
+
+    def test_failing_heartbeat_stops_recordings(self):
+        node = self.make_node("a", lease_seconds=0.4, heartbeat_seconds=0.05)
+        node.heartbeat()
+        self.assertTrue(node.acquire("42"))
+
+        def failing_heartbeat():
+            raise OSError("хранилище недоступно")
+
+        node.heartbeat = failing_heartbeat
+
+        self.assertEqual(self.run_loop_until_stopped(node, timeout=2), [{"42"}])
+        self.assertFalse(node.owns("42"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+Тесты приёмника Twitch EventSub.
+
+Сообщения подписываются HMAC-SHA256 поддельным отправителем
+`benchmark/fake_eventsub_sender.py` и отправляются запущенному приёмнику.
+
+Запуск:
+    python -m pytest tests
+"""
+import os
+import sys
+import asyncio
+import logging
+import unittest
+
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmark"))
+
+import eventsub
+
+from fake_eventsub_sender import build_message, format_timestamp, send_message
+
+
+SECRET = "test_secret_0123456789"
+
+
+class EventSubServerTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.online = []
+        self.offline = []
+        self.server = await eventsub.start_eventsub_server(
+            host              = "127.0.0.1",
+            port              = 0,
+            secret            = SECRET,
+            on_stream_online  = self.online.append,
+            on_stream_offline = self.offline.append,
+            main_logger       = logging.getLogger("test")
+        )
+        self.url = f"http://127.0.0.1:{self.server.sockets[0].getsockname()[1]}/"
+
+    async def asyncTearDown(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def send(self, headers, body):
+        return await asyncio.to_thread(send_message, self.url, headers, body)
+
+    async def test_verification_challenge_reply(self):
+        headers, body = build_message(SECRET, "webhook_callback_verification", challenge="challenge-0123")
+
+        status, response_body = await self.send(headers, body)
+
+        self.assertEqual(status, 200)
+        self.assertEqual(response_body, b"challenge-0123")
+
+    async def test_notifications_reach_handlers(self):
+        headers, body = build_message(SECRET, "notification", "stream.online", user_id="42", login="streamer")
+        status, _ = await self.send(headers, body)
+        self.assertEqual(status, 204)
+
+        headers, body = build_message(SECRET, "notification", "stream.offline", user_id="42", login="streamer")
+        status, _ = await self.send(headers, body)
+        self.assertEqual(status, 204)
+
+        self.assertEqual([stream['user_id'] for stream in self.online], ["42"])
+        self.assertEqual(self.online[0]['user_login'], "streamer")
+        self.assertEqual([event['broadcaster_user_id'] for event in self.offline], ["42"])
+
+    async def test_revocation_is_acknowledged(self):
+        headers, body = build_message(SECRET, "revocation", "stream.online")
+
+        status, _ = await self.send(headers, body)
+
+        self.assertEqual(status, 204)
+        self.assertEqual(self.online, [])
+
+    async def test_rejects_wrong_signature(self):
+        headers, body = build_message("other_secret", "notification", "stream.online")
+
+        status, _ = await self.send(headers, body)
+
+        self.assertEqual(status, 403)
+        self.assertEqual(self.online, [])
+
+    async def test_rejects_modified_body(self):
+        headers, body = build_message(SECRET, "notification", "stream.online", user_id="1")
+
+        status, _ = await self.send(headers, body.replace(b'"1"', b'"2"'))
+
+        self.assertEqual(status, 403)
+        self.assertEqual(self.online, [])
+
+    async def test_suppresses_duplicate_message_id(self):
+        headers, body = build_message(SECRET, "notification", "stream.online", message_id="duplicate-id")
+
+        first_status, _ = await self.send(headers, body)
+        second_status, _ = await self.send(headers, body)
+
+        self.assertEqual((first_status, second_status), (204, 204))
+        self.assertEqual(len(self.online), 1)
+
+    async def test_rejects_stale_timestamp(self):
+        sent_at = datetime.now(timezone.utc) - timedelta(seconds=eventsub.MAX_MESSAGE_AGE_SECONDS + 60)
+        headers, body = build_message(SECRET, "notification", "stream.online", timestamp=format_timestamp(sent_at))
+
+        status, _ = await self.send(headers, body)
+
+        self.assertEqual(status, 403)
+        self.assertEqual(self.online, [])
+
+    async def test_accepts_recent_timestamp(self):
+        sent_at = datetime.now(timezone.utc) - timedelta(seconds=eventsub.MAX_MESSAGE_AGE_SECONDS - 60)
+        headers, body = build_message(SECRET, "notification", "stream.online", timestamp=format_timestamp(sent_at))
+
+        status, _ = await self.send(headers, body)
+
+        self.assertEqual(status, 204)
+        self.assertEqual(len(self.online), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+"""
+Тесты фоновой обработки записанных файлов.
+
+Перепаковка проверяется на файле MPEG-TS с потоком данных timed_id3, как в HLS
+Twitch: ffmpeg создаёт видео и звук, а поток ID3 (stream_type 0x15 с дескриптором
+метаданных) добавляется в таблицу PMT и в поток пакетов вручную. Тесты требуют
+ffmpeg и ffprobe в PATH и пропускаются, если их нет.
+
+Запуск:
+    python -m pytest tests
+"""
+import os
+import sys
+import shutil
+import struct
+import asyncio
+import logging
+import tempfile
+import unittest
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from init_database import init_database
+from postprocess import PostProcessor
+
+
+FFMPEG = shutil.which("ffmpeg")
+FFPROBE = shutil.which("ffprobe")
+
+TS_PACKET_SIZE = 188
+ID3_PID = 0x0102
+# Дескриптор метаданных: формат приложения и формат метаданных "ID3 "
+ID3_METADATA_DESCRIPTOR = b"\x26\x0d\xff\xffID3 \xffID3 \x00\x0f"
+
+
+def crc32_mpeg(data):
+    """Возвращает CRC-32/MPEG-2 секции таблицы MPEG-TS."""
+    crc = 0xFFFFFFFF
+
+    for byte in data:
+        crc ^= byte << 24
+
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x04C11DB7) & 0xFFFFFFFF if crc & 0x80000000 else (crc << 1) & 0xFFFFFFFF
+
+    return crc
+
+
+def packet_pid(packet):
+    """Возвращает PID пакета MPEG-TS."""
+    return (packet[1] & 0x1F) << 8 | packet[2]
+
+
+def add_id3_stream(packet):
+    """Добавляет поток timed_id3 в секцию PMT, которая целиком находится в пакете."""
+    start = 5 + packet[4]
+    section_length = (packet[start + 1] & 0x0F) << 8 | packet[start + 2]
+    # Секция без CRC
+    body = packet[start:start + 3 + section_length - 4]
+
+    stream = bytes([0x15, 0xE0 | ID3_PID >> 8, ID3_PID & 0xFF, 0xF0, len(ID3_METADATA_DESCRIPTOR)])
+    stream += ID3_METADATA_DESCRIPTOR
+    section_length += len(stream)
+
+    body = bytes([body[0], body[1] & 0xF0 | section_length >> 8, section_length & 0xFF]) + body[3:] + stream
+    section = body + struct.pack(">I", crc32_mpeg(body))
+
+    return packet[:start] + section + b"\xff" * (TS_PACKET_SIZE - start - len(section))
+
+
+def build_id3_packet():
+    """Возвращает пакет MPEG-TS с одним PES-пакетом ID3 (кадр TXXX)."""
+    frame_data = b"\x03test\x00id3"
+    frame = b"TXXX" + struct.pack(">I", len(frame_data)) + b"\x00\x00" + frame_data
+    tag = b"ID3\x04\x00\x00" + bytes([0, 0, 0, len(frame)]) + frame
+    # PES private_stream_1 с PTS = 0
+    pes = b"\x00\x00\x01\xbd" + struct.pack(">H", 8 + len(tag)) + b"\x84\x80\x05\x21\x00\x01\x00\x01" + tag
+
+    stuffing = TS_PACKET_SIZE - 4 - len(pes)
+    adaptation_field = bytes([stuffing - 1]) + b"\x00" + b"\xff" * (stuffing - 2)
+
+    return bytes([0x47, 0x40 | ID3_PID >> 8, ID3_PID & 0xFF, 0x30]) + adaptation_field + pes
+
+
+def make_ts_with_id3(file_path):
+    """Создаёт файл MPEG-TS с видео, звуком и потоком данных timed_id3."""
+    base_path = f"{file_path}.base.ts"
+    subprocess.run([
+        FFMPEG, "-hide_banner", "-loglevel", "error", "-nostdin", "-y",
+        "-f", "lavfi", "-i", "testsrc=size=160x120:rate=10:duration=2",
+        "-f", "lavfi", "-i", "sine=duration=2",
+        "-c:v", "mpeg4", "-c:a", "aac", "-f", "mpegts",
+        base_path
+    ], check=True)
+
+    with open(base_path, "rb") as file:
+        data = file.read()
+
+    os.remove(base_path)
+
+    packets = [data[offset:offset + TS_PACKET_SIZE] for offset in range(0, len(data), TS_PACKET_SIZE)]
+    pat = next(packet for packet in packets if packet_pid(packet) == 0)
+    pat_start = 5 + pat[4]
+    pmt_pid = (pat[pat_start + 10] & 0x1F) << 8 | pat[pat_start + 11]
+
+    output = []
+
+    for packet in packets:
+        if packet_pid(packet) != pmt_pid:
+            output.append(packet)
+
+            continue
+
+        output.append(add_id3_stream(packet))
+
+        # Пакет ID3 идёт сразу после первой таблицы PMT
+        if len(output) < 4:
+            output.append(build_id3_packet())
+
+    with open(file_path, "wb") as file:
+        file.write(b"".join(output))
+
+
+def stream_types(file_path):
+    """Возвращает типы потоков файла по ffprobe."""
+    output = subprocess.run(
+        [FFPROBE, "-v", "error", "-show_entries", "stream=codec_type", "-of", "csv=p=0", file_path],
+        check=True, capture_output=True, text=True
+    ).stdout
+
+    return sorted(line.strip() for line in output.splitlines() if line.strip())
+
+
+@unittest.skipUnless(FFMPEG and FFPROBE, "нужны ffmpeg и ffprobe")
+class RemuxTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix="postprocess_test_")
+        logger = logging.getLogger("test")
+        database_path = os.path.join(self.workdir, "streams.db")
+
+        init_database(database_path=database_path, main_logger=logger)
+        self.database = Database(database_path=database_path, main_logger=logger)
+        self.database.start()
+
+        self.postprocessor = PostProcessor(
+            database     = self.database,
+            main_logger  = logger,
+            max_workers  = 1,
+            ffmpeg_path  = FFMPEG,
+            ffprobe_path = FFPROBE
+        )
+
+    def tearDown(self):
+        self.database.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def test_remux_drops_data_stream(self):
+        file_path = os.path.join(self.workdir, "recording.mp4")
+        make_ts_with_id3(file_path)
+        self.assertIn("data", stream_types(file_path))
+
+        asyncio.run(self.postprocessor._remux(file_path))
+
+        self.assertEqual(stream_types(file_path), ["audio", "video"])
+        self.assertEqual(os.listdir(self.workdir).count("recording.remux.mp4"), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
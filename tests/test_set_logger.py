@@ -0,0 +1,62 @@
+"""
+Тесты логгера с выводом через очередь.
+
+Вывод в консоль перехватывается, а записи с исключением проверяются в текстовом
+формате и в формате JSON.
+
+Запуск:
+    python -m pytest tests
+"""
+import io
+import os
+import sys
+import json
+import logging
+import unittest
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import set_logger
+
+
+class SetLoggerTest(unittest.TestCase):
+
+    def tearDown(self):
+        set_logger.stop_logger()
+        logging.getLogger().removeHandler(set_logger._queue_handler)
+
+    def log_exception(self, json_format):
+        """Записывает ошибку с исключением и возвращает вывод в консоль."""
+        stream = io.StringIO()
+
+        with contextlib.redirect_stderr(stream):
+            logger = set_logger.set_logger(json_format=json_format)
+
+        try:
+            raise ValueError("плохое значение")
+        except ValueError:
+            logger.getChild("channel.streamer").exception("Ошибка при записи %s", "канала")
+
+        set_logger.stop_logger()
+
+        return stream.getvalue()
+
+    def test_json_entry_has_exception_field(self):
+        output = self.log_exception(json_format=True)
+        entry = json.loads(output.strip())
+
+        self.assertEqual(entry["message"], "Ошибка при записи канала")
+        self.assertEqual(entry["channel"], "streamer")
+        self.assertIn("ValueError: плохое значение", entry["exception"])
+        self.assertTrue(entry["exception"].startswith("Traceback"))
+
+    def test_text_entry_has_traceback_once(self):
+        output = self.log_exception(json_format=False)
+
+        self.assertIn("ERROR - Ошибка при записи канала\nTraceback", output)
+        self.assertEqual(output.count("ValueError: плохое значение"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
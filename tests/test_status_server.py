@@ -0,0 +1,79 @@
+"""
+Тесты HTTP-эндпоинта состояния программы записи трансляций.
+
+Задержки обнаружения трансляций считает планировщик опроса, а эндпоинт `/status`
+запущенного сервера должен отдавать их по каналам.
+
+Запуск:
+    python -m pytest tests
+"""
+import os
+import sys
+import json
+import asyncio
+import logging
+import unittest
+import urllib.request
+
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from poll_scheduler import PollScheduler
+from recorder_status import RecorderStatus
+from status_server import start_status_server
+
+
+def fetch_json(url):
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return json.loads(response.read())
+
+
+class StatusDetectionTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.status = RecorderStatus()
+        self.server = await start_status_server(
+            host        = "127.0.0.1",
+            port        = 0,
+            status      = self.status,
+            main_logger = logging.getLogger("test")
+        )
+        self.url = f"http://127.0.0.1:{self.server.sockets[0].getsockname()[1]}/status"
+
+    async def asyncTearDown(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def test_status_reports_detection_delays(self):
+        scheduler = PollScheduler(database=None, hot_interval=10, cold_interval=120)
+        detected_at = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+        for delay in (30, 50):
+            scheduler.record_detection(
+                {"user_id": "42", "started_at": (detected_at - timedelta(seconds=delay)).isoformat()},
+                detected_at
+            )
+
+        self.status.record_detections(scheduler.detection_report())
+
+        snapshot = await asyncio.to_thread(fetch_json, self.url)
+
+        self.assertEqual(snapshot["detection"], {
+            "42": {
+                "tier": "cold",
+                "expected_delay_seconds": 60.0,
+                "last_delay_seconds": 50.0,
+                "mean_delay_seconds": 40.0,
+                "count": 2
+            }
+        })
+
+    async def test_status_without_detections(self):
+        snapshot = await asyncio.to_thread(fetch_json, self.url)
+
+        self.assertEqual(snapshot["detection"], {})
+
+
+if __name__ == "__main__":
+    unittest.main()
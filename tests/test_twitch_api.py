@@ -0,0 +1,93 @@
+"""
+Тесты общего HTTP-клиента Twitch API.
+
+Локальный HTTP/1.1 сервер считает принятые TCP-соединения: все запросы через
+`get_session()` должны идти по одному keep-alive соединению.
+
+Запуск:
+    python -m pytest tests
+"""
+import os
+import sys
+import threading
+import unittest
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import twitch_api
+
+
+REQUEST_COUNT = 20
+
+
+class CountingServer(ThreadingHTTPServer):
+    """HTTP-сервер, который считает принятые TCP-соединения."""
+
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.connections = 0
+        self.connections_lock = threading.Lock()
+
+    def get_request(self):
+        request = super().get_request()
+
+        with self.connections_lock:
+            self.connections += 1
+
+        return request
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Отвечает на любой GET пустым JSON, не закрывая соединение."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{"data": []}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class GetSessionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = CountingServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/helix/streams"
+
+        twitch_api._session = None
+
+    def tearDown(self):
+        session = twitch_api._session
+        twitch_api._session = None
+
+        if session:
+            session.close()
+
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_requests_reuse_one_connection(self):
+        for _ in range(REQUEST_COUNT):
+            response = twitch_api.get_session().get(self.url, timeout=5)
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.server.connections, 1)
+
+    def test_returns_same_session(self):
+        self.assertIs(twitch_api.get_session(), twitch_api.get_session())
+
+
+if __name__ == "__main__":
+    unittest.main()
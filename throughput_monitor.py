@@ -0,0 +1,156 @@
+"""
+Модуль для контроля скорости записи трансляции.
+
+Монитор периодически замеряет размер файла текущей части записи и по приросту
+вычисляет фактический битрейт. Если файл не растёт дольше `stall_seconds`, процесс
+streamlink считается зависшим и запись продолжается в новую часть. Резкое падение
+битрейта относительно среднего по записи только отмечается в логе, так как оно
+бывает и на статичной картинке. Замеры раз в `history_interval` секунд передаются
+в `on_sample` для сохранения истории битрейта.
+
+Краткое описание классов:
+    - ThroughputMonitor: Монитор скорости записи одной трансляции.
+"""
+import os
+import time
+
+from metrics import RECORDING_BYTES_PER_SECOND
+
+
+class ThroughputMonitor:
+    """
+    Монитор скорости записи одной трансляции.
+
+    Краткое описание функций:
+        - check: Замеряет размер файла части и возвращает "stall", если запись зависла.
+        - can_restart: Проверяет, не превышено ли число перезапусков подряд после зависаний.
+        - close: Убирает метрику скорости записи после окончания записи.
+
+    Args:
+        user_name (str): Имя стримера.
+        stall_seconds (float): Сколько секунд файл может не расти, прежде чем запись считается зависшей.
+        max_stall_restarts (int): Сколько раз подряд можно перезапускать зависшую запись.
+        drop_ratio (float): Доля среднего битрейта, ниже которой падение скорости отмечается в логе.
+        history_interval (float): Период передачи замеров в `on_sample` в секундах.
+        on_sample (Callable): Вызывается с частью записи, битрейтом в байтах в секунду и размером файла.
+        logger (logging.Logger): Логгер.
+    """
+
+    def __init__(self, user_name, stall_seconds, max_stall_restarts, drop_ratio, history_interval, on_sample, logger):
+        self.user_name = user_name
+        self.stall_seconds = stall_seconds
+        self.max_stall_restarts = max_stall_restarts
+        self.drop_ratio = drop_ratio
+        self.history_interval = history_interval
+        self.on_sample = on_sample
+        self.logger = logger
+
+        self.file_path = None
+        self.part_opened_at = None
+        self.last_size = 0
+        self.last_checked_at = None
+        self.last_growth_at = None
+        self.last_sample = None
+        self.dropped = False
+        # Зависания подряд: сбрасываются, когда часть нормально пишется дольше stall_seconds
+        self.consecutive_stalls = 0
+        # Всего записано байт и секунд по всем частям, для среднего битрейта
+        self.total_bytes = 0
+        self.total_seconds = 0.0
+
+    def _start_part(self, part, now):
+        """Начинает замеры новой части записи."""
+        self.file_path = part['file_path']
+        self.part_opened_at = part.get('opened_at', now)
+        self.last_size = 0
+        self.last_checked_at = self.part_opened_at
+        self.last_growth_at = self.last_checked_at
+        self.last_sample = (self.last_checked_at, 0)
+        self.dropped = False
+
+    def check(self, part):
+        """
+        Замеряет размер файла части записи.
+
+        Args:
+            part (dict): Часть записи с ключами `file_path` и `opened_at` (время по `time.monotonic`).
+
+        Returns:
+            str or None: "stall", если файл не растёт дольше `stall_seconds`, иначе None.
+        """
+        now = time.monotonic()
+
+        if part['file_path'] != self.file_path:
+            self._start_part(part, now)
+
+        try:
+            size = os.path.getsize(self.file_path)
+        except OSError:
+            size = self.last_size
+
+        elapsed = now - self.last_checked_at
+        grown = size - self.last_size
+
+        if grown > 0:
+            self.last_growth_at = now
+            self.total_bytes += grown
+            self.total_seconds += elapsed
+
+            if now - self.part_opened_at >= self.stall_seconds:
+                self.consecutive_stalls = 0
+
+        if elapsed > 0:
+            bitrate = max(0, grown) / elapsed
+            RECORDING_BYTES_PER_SECOND.set(round(bitrate), user_name=self.user_name)
+            self._check_drop(bitrate)
+
+        self.last_size = max(size, self.last_size)
+        self.last_checked_at = now
+
+        sampled_at, sampled_size = self.last_sample
+
+        if now - sampled_at >= self.history_interval:
+            self.on_sample(part, (self.last_size - sampled_size) / (now - sampled_at), self.last_size)
+            self.last_sample = (now, self.last_size)
+
+        if now - self.last_growth_at >= self.stall_seconds:
+            self.logger.warning(
+                f"Файл записи {self.user_name} не растёт {now - self.last_growth_at:.0f} с, "
+                f"процесс streamlink будет перезапущен."
+            )
+            self.consecutive_stalls += 1
+
+            return "stall"
+
+        return None
+
+    def can_restart(self):
+        """
+        Проверяет, не превышено ли число перезапусков подряд после зависаний.
+
+        Returns:
+            bool: True, если зависшую запись ещё можно перезапустить.
+        """
+        return self.consecutive_stalls <= self.max_stall_restarts
+
+    def _check_drop(self, bitrate):
+        """Отмечает в логе резкое падение битрейта относительно среднего по записи."""
+        if not self.total_seconds:
+            return
+
+        average = self.total_bytes / self.total_seconds
+        dropped = bitrate < average * self.drop_ratio
+
+        if dropped and not self.dropped:
+            self.logger.warning(
+                f"Битрейт записи {self.user_name} упал до {bitrate * 8 / 1000 ** 2:.2f} Мбит/с "
+                f"(в среднем {average * 8 / 1000 ** 2:.2f} Мбит/с)."
+            )
+        elif self.dropped and not dropped:
+            self.logger.info(f"Битрейт записи {self.user_name} восстановился.")
+
+        self.dropped = dropped
+
+    def close(self):
+        """Убирает метрику скорости записи после окончания записи."""
+        RECORDING_BYTES_PER_SECOND.remove(user_name=self.user_name)
@@ -0,0 +1,274 @@
+"""
+Модуль для управления токеном доступа приложения Twitch.
+
+Менеджер хранит один токен на всё приложение, сохраняет его на диск вместе со
+сроком действия и заранее обновляет его в фоне, поэтому опрос каналов не теряет
+циклы на ответах 401 и не ждёт получения токена. При ошибках обновления
+повторные попытки выполняются с экспоненциальной задержкой и случайным разбросом.
+
+Токен запрашивает только фоновая корутина `run_refresh_loop`, и запрос выполняется
+без блокировки. Потоки опроса лишь читают токен: если его нет, они будят корутину
+и ждут ограниченное время, а во время задержки между неудачными попытками сразу
+получают ошибку, не обращаясь к серверу авторизации.
+
+Краткое описание классов:
+    - TokenUnavailableError: Действующего токена нет.
+    - TokenManager: Потокобезопасный менеджер токена доступа.
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from fetch_access_token import request_access_token
+
+
+# Доля срока действия токена, после которой он обновляется заранее
+REFRESH_AT_LIFETIME_SHARE = 0.9
+# Границы задержки между повторными попытками обновления в секундах
+RETRY_BASE_DELAY = 5
+RETRY_MAX_DELAY = 300
+# Сколько секунд поток ждёт токен, который получает фоновая корутина
+TOKEN_WAIT_SECONDS = 20
+
+
+class TokenUnavailableError(Exception):
+    """Действующего токена нет: он ещё не получен или сервер авторизации недоступен."""
+
+
+class TokenManager:
+    """
+    Потокобезопасный менеджер токена доступа приложения Twitch.
+
+    Краткое описание функций:
+        - get_token: Возвращает действующий токен, при необходимости дожидаясь его получения.
+        - get_headers: Возвращает заголовки авторизации для запросов к Helix.
+        - invalidate: Помечает токен недействительным после ответа 401.
+        - run_refresh_loop: Корутина получения и фонового обновления токена.
+
+    Args:
+        client_id (str): Идентификатор клиента Twitch.
+        client_secret (str): Секрет клиента Twitch.
+        token_path (str): Путь к файлу для сохранения токена. Если `None`, токен не сохраняется.
+        limiter (RateLimiter): Общий ограничитель частоты запросов к API.
+        main_logger (logging.Logger): Логгер.
+    """
+
+    def __init__(self, client_id, client_secret, token_path, limiter, main_logger):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.token_path = token_path
+        self.limiter = limiter
+        self.logger = main_logger.getChild('token_manager')
+
+        self.access_token = None
+        # Время (time.time), когда токен перестаёт действовать и когда его пора обновить
+        self.expires_at = 0.0
+        self.refresh_at = 0.0
+
+        self.lock = threading.Lock()
+        # Оповещает ждущие потоки о новом токене или неудачной попытке его получить
+        self.updated = threading.Condition(self.lock)
+        self.failed_attempts = 0
+        # Время (time.time), до которого новые попытки получить токен не выполняются
+        self.retry_at = 0.0
+
+        # Событийный цикл и событие, которым потоки будят run_refresh_loop
+        self.loop = None
+        self.wakeup = None
+        # Отдельный поток для запроса: общий пул могут занять потоки, которые ждут этот же токен
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="token")
+
+        self._load()
+
+    def _load(self):
+        """Загружает сохранённый токен с диска, если он ещё действует."""
+        if not self.token_path or not os.path.exists(self.token_path):
+            return
+
+        try:
+            with open(self.token_path, 'r', encoding='utf-8') as file:
+                saved = json.load(file)
+
+            if saved.get("client_id") == self.client_id and saved["expires_at"] > time.time():
+                self.access_token = saved["access_token"]
+                self.expires_at = saved["expires_at"]
+                self.refresh_at = saved["refresh_at"]
+
+                self.logger.info("Загружен сохранённый токен доступа.")
+        except (OSError, ValueError, KeyError, TypeError) as err:
+            self.logger.warning(f"Не удалось загрузить сохранённый токен: {err}")
+
+    def _save(self):
+        """Сохраняет токен на диск, доступ к файлу есть только у владельца."""
+        if not self.token_path:
+            return
+
+        saved = {
+            "client_id": self.client_id,
+            "access_token": self.access_token,
+            "expires_at": self.expires_at,
+            "refresh_at": self.refresh_at
+        }
+        temp_path = f"{self.token_path}.tmp"
+
+        try:
+            file_descriptor = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+
+            with os.fdopen(file_descriptor, 'w', encoding='utf-8') as file:
+                json.dump(saved, file)
+
+            os.replace(temp_path, self.token_path)
+        except OSError as err:
+            self.logger.warning(f"Не удалось сохранить токен: {err}")
+
+    def _is_valid(self):
+        """Проверяет, что токен есть и не истёк. Вызывается под блокировкой."""
+        return bool(self.access_token) and time.time() < self.expires_at
+
+    def _request_refresh(self):
+        """Будит корутину обновления токена. Безопасно вызывается из любого потока."""
+        if self.loop:
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+
+    def _refresh_locked(self):
+        """
+        Получает новый токен, если его нет или его пора обновить.
+
+        Состояние токена проверяется под блокировкой, а сам запрос выполняется без
+        неё, поэтому потоки опроса не ждут сервер авторизации.
+
+        Raises:
+            requests.exceptions.RequestException: Если запрос завершился ошибкой.
+        """
+        with self.lock:
+            if self.access_token and time.time() < self.refresh_at:
+                return
+
+        token = request_access_token(
+            client_id     = self.client_id,
+            client_secret = self.client_secret,
+            limiter       = self.limiter
+        )
+        now = time.time()
+        expires_in = float(token.get("expires_in", 0))
+
+        with self.lock:
+            self.access_token = token["access_token"]
+            self.expires_at = now + expires_in
+            self.refresh_at = now + expires_in * REFRESH_AT_LIFETIME_SHARE
+            self.failed_attempts = 0
+            self.retry_at = 0.0
+            self.updated.notify_all()
+
+        self._save()
+        self.logger.info(f"Токен доступа обновлён, действует {expires_in / 3600:.1f} ч.")
+
+    def get_token(self, timeout=TOKEN_WAIT_SECONDS):
+        """
+        Возвращает действующий токен, при необходимости дожидаясь его получения.
+
+        Токен не запрашивается в вызывающем потоке: если его нет или он истёк,
+        поток будит `run_refresh_loop` и ждёт не дольше `timeout`.
+
+        Args:
+            timeout (float): Сколько секунд ждать токен.
+
+        Returns:
+            str: Токен доступа.
+
+        Raises:
+            TokenUnavailableError: Если токена нет, а получить его не удалось или идёт задержка
+                                   перед повторной попыткой.
+        """
+        deadline = time.monotonic() + timeout
+
+        with self.lock:
+            while not self._is_valid():
+                retry_in = self.retry_at - time.time()
+
+                if retry_in > 0:
+                    raise TokenUnavailableError(f"Токен доступа не получен, повторная попытка через {retry_in:.0f} с.")
+
+                remaining = deadline - time.monotonic()
+
+                if remaining <= 0:
+                    raise TokenUnavailableError(f"Токен доступа не получен за {timeout:.0f} с.")
+
+                # Если корутина ещё не запущена, она получит токен сразу после запуска
+                self._request_refresh()
+                self.updated.wait(remaining)
+
+            return self.access_token
+
+    def get_headers(self):
+        """
+        Возвращает заголовки авторизации для запросов к Helix.
+
+        Returns:
+            dict: Заголовки Client-ID и Authorization.
+        """
+        return {"Client-ID": self.client_id, "Authorization": f"Bearer {self.get_token()}"}
+
+    def invalidate(self, access_token):
+        """
+        Помечает токен недействительным после ответа 401.
+
+        Если токен уже заменён другим потоком, вызов ничего не делает, поэтому
+        одновременные ответы 401 не приводят к нескольким запросам нового токена.
+
+        Args:
+            access_token (str): Токен, с которым был получен ответ 401.
+        """
+        with self.lock:
+            if access_token == self.access_token:
+                self.access_token = None
+                self.expires_at = 0.0
+                self._request_refresh()
+
+    def _next_retry_delay(self):
+        """Возвращает задержку перед повторной попыткой с экспоненциальным ростом и разбросом."""
+        delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** self.failed_attempts)
+        self.failed_attempts += 1
+
+        return random.uniform(delay / 2, delay)
+
+    async def run_refresh_loop(self):
+        """
+        Корутина получения и фонового обновления токена до истечения его срока действия.
+
+        Корутина — единственное место, где запрашивается токен. Её будят потоки,
+        которым токен нужен сейчас, но задержку после неудачной попытки они не сокращают.
+        Блокирующий запрос выполняется в отдельном потоке, ошибки не останавливают цикл.
+        """
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+
+        while True:
+            # Событие сбрасывается до проверки, чтобы не пропустить пробуждение между ними
+            self.wakeup.clear()
+            delay = self.refresh_at - time.time()
+
+            if delay > 0 and self.access_token:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=min(delay, 60))
+                except asyncio.TimeoutError:
+                    pass
+
+                continue
+
+            try:
+                await self.loop.run_in_executor(self.executor, self._refresh_locked)
+            except Exception as err:
+                with self.lock:
+                    retry_delay = self._next_retry_delay()
+                    self.retry_at = time.time() + retry_delay
+                    # Ждущие потоки сразу получают ошибку, а не ждут до конца своего времени
+                    self.updated.notify_all()
+
+                self.logger.error(f"Ошибка при обновлении токена, повтор через {retry_delay:.0f} с: {err}")
+
+                await asyncio.sleep(retry_delay)
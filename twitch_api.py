@@ -0,0 +1,90 @@
+"""
+Модуль общего HTTP-клиента для запросов к Twitch API.
+
+Все запросы к api.twitch.tv и id.twitch.tv идут через одну сессию `requests.Session`
+с пулом keep-alive соединений, поэтому TCP и TLS рукопожатие выполняется один раз
+на соединение, а не на каждый запрос. Временные сетевые ошибки и ответы 5xx
+повторяются адаптером с экспоненциальной задержкой. Адреса API берутся из
+настроек, чтобы программу можно было нагрузить локальной заглушкой Helix.
+
+Краткое описание функций:
+    - create_session: Создаёт сессию с настроенным пулом соединений и повторами.
+    - get_session: Возвращает общую для всех потоков сессию.
+"""
+import threading
+
+import requests
+
+import config
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+HELIX_URL = config.helix_url.rstrip("/")
+OAUTH_TOKEN_URL = config.oauth_token_url
+
+# Количество пулов (по одному на хост) и соединений в каждом пуле.
+# Размер пула должен быть не меньше числа параллельных запросов при опросе.
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 32
+
+# Повторы при сетевых ошибках и ответах сервера 5xx.
+# 429 не повторяется: этим управляет ограничитель частоты запросов.
+RETRY_TOTAL = 3
+RETRY_BACKOFF_FACTOR = 0.5
+RETRY_STATUS_FORCELIST = (500, 502, 503, 504)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def create_session(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE):
+    """
+    Создаёт сессию с пулом keep-alive соединений и адаптером повторов.
+
+    Args:
+        pool_connections (int): Количество пулов соединений (по одному на хост).
+        pool_maxsize (int): Максимальное количество соединений в одном пуле.
+
+    Returns:
+        requests.Session: Настроенная сессия.
+    """
+    retry = Retry(
+        total                      = RETRY_TOTAL,
+        backoff_factor             = RETRY_BACKOFF_FACTOR,
+        status_forcelist           = RETRY_STATUS_FORCELIST,
+        allowed_methods            = frozenset({"GET", "POST"}),
+        respect_retry_after_header = True,
+        raise_on_status            = False
+    )
+    adapter = HTTPAdapter(
+        pool_connections = pool_connections,
+        pool_maxsize     = pool_maxsize,
+        max_retries      = retry,
+        pool_block       = True
+    )
+
+    session = requests.Session()
+    session.headers.update({"Connection": "keep-alive"})
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    return session
+
+
+def get_session():
+    """
+    Возвращает общую для всех потоков сессию, создавая её при первом обращении.
+
+    Returns:
+        requests.Session: Общая сессия для запросов к Twitch API.
+    """
+    global _session
+
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+
+    return _session
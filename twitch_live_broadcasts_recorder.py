@@ -1,353 +1,1219 @@
+import os
 import time
-import sqlite3
-import requests
+import socket
+import asyncio
+import argparse
+import functools
 import threading
-import tkinter as tk
 
-from tkinter import ttk
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
 
 import config
 
-from set_logger import set_logger
+from set_logger import set_logger, get_channel_logger
 from init_database import init_database
-from record_broadcast import record_broadcast
-from fetch_access_token import fetch_access_token
-from utils import get_video_path
+from database import Database
+from choose_storage import StoragePlacement
+from storage_watchdog import check_part_storage
+from cluster import ClusterCoordinator
+from catalog import RecordingsCatalog
+from config_reloader import ConfigReloader
+from recovery import load_unfinished_parts, find_recording_process, is_process_alive, stop_detached_process
+from throughput_monitor import ThroughputMonitor
+from record_broadcast import record_broadcast, check_segment_limits, install_child_watcher
+from token_manager import TokenManager
+from utils import get_video_path, get_twitch_user_ids
+from poll_engine import POLL_MAX_WORKERS, fetch_live_streams, fetch_streams_chunk
+from rate_limiter import RateLimiter
+from poll_scheduler import PollScheduler
+from eventsub import start_eventsub_server, sync_subscriptions
+from postprocess import PostProcessor
+from recorder_status import RecorderStatus
+from status_server import start_status_server
+from metrics import (
+    ADD_RECORD_DURATION,
+    DETECTION_DELAY,
+    POLL_CHANNELS,
+    POLL_DURATION,
+    POLL_ERRORS
+)
+
+
+# Размер пула потоков для блокирующих операций событийного цикла
+BLOCKING_MAX_WORKERS = 8
+
+# Период обновления истории трансляций для планировщика опроса в секундах
+SCHEDULER_HISTORY_REFRESH_SECONDS = 3600
+
+# Задержка перед повтором шагов запуска (получение ID каналов, первая отметка узла) в секундах
+STARTUP_RETRY_BASE_DELAY = 5
+STARTUP_RETRY_MAX_DELAY = 300
+
+# Паузы перед запросами названия трансляции, запись которой началась по уведомлению EventSub, в секундах
+TITLE_FETCH_DELAYS_SECONDS = (5, 15, 30, 60, 120)
 
-class RateLimiter:
-    def __init__(self, period):
-        self.max_requests = 1
-        self.period = period
-        self.requests = []
-        self.lock = threading.Lock()
 
-    def wait(self):
-        with self.lock:
-            now = time.time()
+def add_record_to_db(stream_data, recording_start):
+    """
+    Ставит в очередь запись о начале трансляции в таблицу `live_broadcast`.
+
+    Запись выполняет поток-писатель базы данных, поэтому вызов не блокирует запись трансляции.
+
+    Returns:
+        concurrent.futures.Future: Результат с id добавленной строки.
+    """
+    queued_at = time.perf_counter()
+    future = database.write('''
+        INSERT INTO live_broadcast (
+            user_id,
+            user_name,
+            stream_id,
+            recording_start,
+            title,
+            state
+        )
+        VALUES (?, ?, ?, ?, ?, 'recording')
+    ''', (
+        stream_data['user_id'],
+        stream_data['user_name'],
+        stream_data['id'],
+        recording_start,
+        stream_data['title']
+    ))
 
-            # Очищаем старые запросы, которые вышли за пределы периода
-            self.requests = [req for req in self.requests if req > now - self.period]
+    def log_error(result):
+        ADD_RECORD_DURATION.observe(time.perf_counter() - queued_at)
 
-            # Проверяем, не превышает ли количество запросов лимит
-            if len(self.requests) >= self.max_requests:
-                # Ждем до тех пор, пока не пройдет период с первого запроса
-                sleep_time = self.period - (now - self.requests[0])
+        if result.exception():
+            logger.error(f"Ошибка при добавлении записи: {result.exception()}")
 
-                if sleep_time > 0:
-                    time.sleep(sleep_time)
+    future.add_done_callback(log_error)
 
-            # Добавляем текущий запрос в список
-            self.requests.append(time.time())
+    return future
 
 
-class StreamRecorderApp:
+def add_part_to_db(broadcast_id, part):
     """
-    Приложение для отображения информации о текущих стримах.
+    Ставит в очередь запись о начале части записи в таблицу `recording_parts`.
 
-    Этот класс предоставляет функциональность отображения информации
-    о пользователях, времени начала и продолжительности стрима.
+    Части одной трансляции образуют цепочку по `part_number`. Для каждой части
+    сохраняется причина, по которой она началась, а для части после переподключения —
+    пропуск в секундах между концом предыдущей части и её началом.
+    """
+    return database.write('''
+        INSERT INTO recording_parts (broadcast_id, part_number, file_path, started_at, start_reason, gap_seconds)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (
+        broadcast_id,
+        part['number'],
+        part['file_path'],
+        part['started_at'],
+        part.get('start_reason'),
+        part.get('gap_seconds')
+    ))
+
+
+def set_part_pid_in_db(broadcast_id, part):
+    """Ставит в очередь сохранение PID процесса streamlink части записи для восстановления после сбоя."""
+    return database.write(
+        "UPDATE recording_parts SET pid = ? WHERE broadcast_id = ? AND part_number = ?",
+        (part['process'].pid, broadcast_id, part['number'])
+    )
+
+
+def close_part_in_db(broadcast_id, part, reason):
+    """
+    Ставит в очередь отметку об окончании части записи в таблице `recording_parts`.
 
-    Краткое описание функций:
-        - add_record: Добавляет новый стрим в список активных записей.
-        - update_duration: Обновляет продолжительность активных стримов.
-        - remove_record: Удаляет стрим из списка активных.
-        - resize_columns: Автоматически регулирует ширину столбцов в таблице для отображения данных.
+    После этой отметки файл части закрыт и его можно обрабатывать независимо от идущей записи.
+    """
+    try:
+        size_bytes = os.path.getsize(part['file_path'])
+    except OSError:
+        size_bytes = None
+
+    process = part.get('process')
+
+    return database.write('''
+        UPDATE recording_parts
+        SET ended_at = ?, end_reason = ?, size_bytes = ?, exit_code = ?
+        WHERE broadcast_id = ? AND part_number = ?
+    ''', (
+        datetime.now(timezone.utc).strftime('%Y-%m-%d %H-%M-%S'),
+        reason,
+        size_bytes,
+        process.returncode if process else None,
+        broadcast_id,
+        part['number']
+    ))
+
+
+def finish_broadcast_in_db(broadcast_id, state):
+    """Ставит в очередь отметку об окончании записи трансляции в таблице `live_broadcast`."""
+    return database.write(
+        "UPDATE live_broadcast SET state = ?, recording_end = ? WHERE id = ?",
+        (state, datetime.now(timezone.utc).strftime('%Y-%m-%d %H-%M-%S'), broadcast_id)
+    )
+
+
+async def open_part(placement, user_name, name_components, number, exclude_mount_points=()):
+    """
+    Выбирает хранилище и путь к файлу для очередной части записи.
 
-    Args:
-        root (tk.Tk): Основное окно приложения.
-        tree (ttk.Treeview): Виджет для отображения информации о стримах.
-        active_records (dict): Словарь с активными записями, где ключ — имя стримера, а значение — информация о записи.
-    """
-
-    def __init__(self, root):
-        """
-        Инициализирует приложение StreamRecorderApp.
-
-        Настроены основные элементы UI, включая таблицу для отображения данных о стримах,
-        а также настройка стилей и начальных значений.
-
-        Args:
-            root (tk.Tk): Основное окно приложения.
-        """
-        self.root = root
-        self.root.title("Stream Recorder")
-        self.root.geometry("600x300")
-        self.root.configure(bg="black")
-
-        style = ttk.Style()
-        style.theme_use("default")
-        style.configure(
-            "Treeview",
-            background="black",
-            foreground="white",
-            fieldbackground="black",
-            font=("Arial", 12),
-            rowheight=25
-        )
-        style.configure(
-            "Treeview.Heading",
-            background="gray",
-            foreground="white",
-            font=("Arial", 12, "bold")
-        )
-        style.map("Treeview", background=[("selected", "gray")])
+    Returns:
+        dict or None: Часть записи или None, если не удалось выбрать хранилище.
+    """
+    # Номер части дополняется нулями, чтобы файлы частей сортировались по порядку
+    if number > 1 or config.segment_duration_minutes or config.segment_size_gb:
+        name_components = [*name_components, f"part {number:03d}"]
+
+    reservation = await asyncio.to_thread(
+        get_video_path,
+        placement            = placement,
+        user_name            = user_name,
+        name_components      = name_components,
+        logger               = logger,
+        exclude_mount_points = exclude_mount_points
+    )
+
+    if not reservation:
+        return None
+
+    return {
+        "number": number,
+        "file_path": reservation['file_path'],
+        "reservation": reservation,
+        "started_at": datetime.now(timezone.utc).strftime('%Y-%m-%d %H-%M-%S'),
+        "opened_at": time.monotonic()
+    }
+
+
+def get_writer_options():
+    """
+    Возвращает параметры процесса-писателя из настроек.
 
-        self.tree = ttk.Treeview(
-            root,
-            columns=("Streamer", "Start Time", "Duration"),
-            show="headings",
-            style="Treeview"
-        )
+    Returns:
+        dict or None: Параметры для `start_streamlink` или None, если писатель выключен
+                      или система не поддерживает его (не POSIX).
+    """
+    if not config.recording_writer_enabled or os.name != "posix":
+        return None
 
-        self.tree.heading("Streamer", text="Streamer")
-        self.tree.heading("Start Time", text="Start Time")
-        self.tree.heading("Duration", text="Duration")
-        self.tree.pack(fill=tk.BOTH, expand=True)
+    return {
+        "block_size_mb": config.writer_block_size_mb,
+        "preallocate_mb": config.writer_preallocate_mb,
+        "fsync_mb": config.writer_fsync_mb,
+        "drop_cache": config.writer_drop_cache,
+        "flush_seconds": config.writer_flush_seconds
+    }
 
-        self.min_column_widths = {
-            "Streamer": 100,
-            "Start Time": 150,
-            "Duration": 75
-        }
 
-        self.tree.column("Streamer", width=self.min_column_widths["Streamer"], anchor="center")
-        self.tree.column("Start Time", width=self.min_column_widths["Start Time"], anchor="center")
-        self.tree.column("Duration", width=self.min_column_widths["Duration"], anchor="center")
+def observe_detection_delay(stream_data):
+    """Учитывает в метриках задержку начала записи относительно `started_at` трансляции."""
+    try:
+        started_at = datetime.fromisoformat(stream_data['started_at'].replace('Z', '+00:00'))
+    except (KeyError, AttributeError, ValueError):
+        return
 
-        self.active_records = {}
+    DETECTION_DELAY.observe(max(0.0, (datetime.now(timezone.utc) - started_at).total_seconds()))
 
-        self.update_duration()
 
-    def add_record(self, user_name):
-        """
-        Добавляет новый стрим в список активных стримов.
+def add_bitrate_sample_to_db(broadcast_id, part, bytes_per_second, size_bytes):
+    """Ставит в очередь замер битрейта части записи в таблицу `bitrate_samples`."""
+    return database.write('''
+        INSERT INTO bitrate_samples (broadcast_id, part_number, sampled_at, bytes_per_second, size_bytes)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (
+        broadcast_id,
+        part['number'],
+        datetime.now(timezone.utc).strftime('%Y-%m-%d %H-%M-%S'),
+        bytes_per_second,
+        size_bytes
+    ))
 
-        Эта функция создает новую запись в таблице, показывая имя стримера, время начала стрима
-        и продолжительность (начальная продолжительность — 0).
 
-        Args:
-            user_name (str): user_name стримера, трансляция которого была обнаружена.
-        """
-        start_time = datetime.now()
-        self.active_records[user_name] = {
-            "start_time": start_time,
-            "item_id": self.tree.insert("", "end", values=(user_name, start_time.strftime("%Y-%m-%d %H:%M:%S"), "0:00:00"))
-        }
+def load_channel_bitrates(days):
+    """
+    Возвращает средний битрейт каналов по истории замеров за последние `days` дней.
 
-        self.resize_columns()
-
-    def update_duration(self):
-        """
-        Обновляет продолжительность активных стримов.
-
-        Эта функция рассчитывает прошедшее время с момента начала каждого стрима и обновляет
-        информацию в таблице.
-        """
-        for user_name, record in self.active_records.items():
-            start_time = record["start_time"]
-            elapsed_time = datetime.now() - start_time
-            self.tree.item(record["item_id"], values=(
-                user_name,
-                start_time.strftime("%Y-%m-%d %H:%M:%S"),
-                str(elapsed_time).split(".", maxsplit=1)[0]
-            ))
+    Returns:
+        dict: Имя стримера -> битрейт в байтах в секунду.
+    """
+    since = (datetime.now(timezone.utc) - timedelta(days=days)).strftime('%Y-%m-%d %H-%M-%S')
+    rows = database.read('''
+        SELECT live_broadcast.user_name, AVG(bitrate_samples.bytes_per_second)
+        FROM bitrate_samples
+        JOIN live_broadcast ON live_broadcast.id = bitrate_samples.broadcast_id
+        WHERE bitrate_samples.sampled_at >= ? AND bitrate_samples.bytes_per_second > 0
+        GROUP BY live_broadcast.user_name
+    ''', (since,))
 
-        self.root.after(1000, self.update_duration)
+    return dict(rows)
 
-    def remove_record(self, user_name):
-        """
-        Удаляет стрим из списка активных.
 
-        Эта функция удаляет запись о стриме из таблицы и очищает данные о нем
-        в словаре активных записей.
+async def probe_stream_continues(token_manager, user_id, stream_id, delays, channel_logger):
+    """
+    Быстро проверяет, продолжается ли трансляция после завершения streamlink.
 
-        Args:
-            user_name (str): Имя стримера, чью запись необходимо удалить.
-        """
-        if user_name in self.active_records:
-            self.tree.delete(self.active_records[user_name]["item_id"])
-            del self.active_records[user_name]
+    Канал опрашивается через `helix/streams` с паузами из `delays`. Проверка
+    прекращается, как только канал оказывается в эфире или выясняется, что это
+    уже другая трансляция.
 
-            self.resize_columns()
+    Args:
+        token_manager (TokenManager): Менеджер токена доступа.
+        user_id (str): ID канала.
+        stream_id (str): ID записываемой трансляции.
+        delays (Iterable): Паузы перед каждой проверкой в секундах.
+        channel_logger (logging.Logger): Логгер канала.
+
+    Returns:
+        dict or None: Данные той же трансляции, если она в эфире, иначе None.
+    """
+    for delay in delays:
+        await asyncio.sleep(delay)
 
-    def resize_columns(self):
-        """Автоматически изменяет ширину столбцов в зависимости от их содержимого."""
-        column_widths = {}
+        try:
+            headers = await asyncio.to_thread(token_manager.get_headers)
+            streams = await asyncio.to_thread(fetch_streams_chunk, [user_id], headers, limiter)
+        except Exception as err:
+            channel_logger.warning(f"Ошибка при проверке продолжения трансляции: {err}")
 
-        for col in self.tree["columns"]:
-            max_width = 0
+            continue
 
-            for row in self.tree.get_children():
-                item_text = str(self.tree.item(row)["values"][self.tree["columns"].index(col)])
-                max_width = max(max_width, len(item_text))
+        for stream_data in streams:
+            if stream_data['id'] == stream_id:
+                return stream_data
 
-            min_width = self.min_column_widths.get(col, 100)
-            column_widths[col] = max(max_width * 10, min_width)
+            # Канал в эфире с новой трансляцией: её запишет обычный опрос в новый файл
+            return None
 
-        def apply_column_widths():
-            for col, width in column_widths.items():
-                self.tree.column(col, width=width)
+    return None
 
-        self.tree.after(0, apply_column_widths)
 
+async def fill_broadcast_title(token_manager, broadcast_id, user_id, stream_id, delays, channel_logger):
+    """
+    Дописывает название трансляции, запись которой началась по уведомлению EventSub.
 
-def add_record_to_db(stream_data, recording_start):
-    try:
-        with sqlite3.connect(config.database_path) as conn:
-            cursor = conn.cursor()
-
-            cursor.execute('''
-                INSERT INTO live_broadcast (
-                    user_id,
-                    user_name,
-                    stream_id,
-                    recording_start,
-                    title
-                )
-                VALUES (?, ?, ?, ?, ?)
-            ''', (
-                stream_data['user_id'],
-                stream_data['user_name'],
-                stream_data['id'],
-                recording_start,
-                stream_data['title']
+    В уведомлении stream.online названия нет, а в `helix/streams` новая трансляция
+    появляется с задержкой, поэтому канал запрашивается с паузами из `delays`.
+    Изменение `title` переиндексирует запись в полнотекстовом поиске каталога.
+
+    Args:
+        token_manager (TokenManager): Менеджер токена доступа.
+        broadcast_id (int): ID записи в таблице `live_broadcast`.
+        user_id (str): ID канала.
+        stream_id (str): ID записываемой трансляции.
+        delays (Iterable): Паузы перед каждым запросом в секундах.
+        channel_logger (logging.Logger): Логгер канала.
+
+    Returns:
+        str or None: Сохранённое название или None, если его не удалось получить.
+    """
+    for delay in delays:
+        await asyncio.sleep(delay)
+
+        try:
+            headers = await asyncio.to_thread(token_manager.get_headers)
+            streams = await asyncio.to_thread(fetch_streams_chunk, [user_id], headers, limiter)
+        except Exception as err:
+            channel_logger.warning(f"Ошибка при получении названия трансляции: {err}")
+
+            continue
+
+        for stream_data in streams:
+            # Канал уже в эфире с другой трансляцией: название записанной не узнать
+            if stream_data['id'] != stream_id or not stream_data['title']:
+                return None
+
+            await asyncio.wrap_future(database.write(
+                "UPDATE live_broadcast SET title = ? WHERE id = ?", (stream_data['title'], broadcast_id)
             ))
 
-            conn.commit()
-    except Exception as err:
-        logger.error(f"Ошибка при добавлении записи: {err}")
+            return stream_data['title']
+
+    return None
 
 
-def record_twitch_channel(active_users, stream_data, storages, app):
+async def record_twitch_channel(recorder_state, stream_data, placement, status):
+    active_users = recorder_state["active_users"]
+    postprocessor = recorder_state["postprocessor"]
+    cluster = recorder_state["cluster"]
+    # Трансляция прервалась и проверка продолжения выполнена: пауза перед повторным опросом не нужна
+    probed = False
+
     try:
         user_name = stream_data['user_name']
         user_id   = stream_data['user_id']
         stream_id = stream_data['id']
 
-        video_label = f"[ {user_name} - {stream_id} ]"
+        channel_logger = get_channel_logger(logger, user_name)
 
-        active_users.add(user_id)
+        video_label = f"[ {user_name} - {stream_id} ]"
 
         recording_start = datetime.now(timezone.utc).strftime('%Y-%m-%d %H-%M-%S')
         name_components = [recording_start, stream_id, 'broadcast', user_name]
 
-        recorded_file_path = get_video_path(
-            storages        = storages,
-            user_name       = user_name,
-            name_components = name_components,
-            logger          = logger
+        # Аренда канала гарантирует, что его не записывает другой узел кластера
+        if cluster and not await asyncio.to_thread(cluster.acquire, user_id):
+            channel_logger.info(f"Трансляцию {video_label} уже записывает другой узел кластера.")
+
+            return
+
+        first_part = await open_part(placement, user_name, name_components, number=1)
+
+        if not first_part:
+            channel_logger.error(f"Не удалось выбрать хранилище для записи {video_label}.")
+
+            return
+
+        first_part['start_reason'] = "start"
+
+        channel_logger.info(f"Запись стрима пользователя {video_label} началась.")
+        observe_detection_delay(stream_data)
+
+        try:
+            broadcast_id = await asyncio.wrap_future(
+                add_record_to_db(stream_data=stream_data, recording_start=recording_start)
+            )
+        except Exception:
+            placement.release(first_part['reservation'])
+
+            raise
+
+        add_part_to_db(broadcast_id, first_part)
+
+        monitor = ThroughputMonitor(
+            user_name          = user_name,
+            stall_seconds      = config.stall_timeout_seconds,
+            max_stall_restarts = config.max_stall_restarts,
+            drop_ratio         = config.bitrate_drop_ratio,
+            history_interval   = config.bitrate_history_interval_seconds,
+            on_sample          = lambda part, bitrate, size: add_bitrate_sample_to_db(broadcast_id, part, bitrate, size),
+            logger             = channel_logger
         )
 
-        logger.info(f"Запись стрима пользователя {video_label} началась.")
+        def check_rollover(part):
+            stall = monitor.check(part)
+            reason = check_part_storage(
+                part           = part,
+                min_free_bytes = config.failover_min_free_space_gb * 1024 ** 3,
+                logger         = channel_logger
+            )
+
+            return reason or stall or check_segment_limits(
+                part        = part,
+                max_seconds = config.segment_duration_minutes * 60,
+                max_bytes   = int(config.segment_size_gb * 1024 ** 3)
+            )
+
+        async def open_next_part(part, reason):
+            if reason == "stall" and not monitor.can_restart():
+                channel_logger.error(f"Запись {video_label} зависает после каждого перезапуска, запись остановлена.")
+
+                return None
 
-        add_record_to_db(stream_data=stream_data, recording_start=recording_start)
-        record_broadcast(recorded_file_path, user_name, app, logger)
+            # При проблемах с диском следующая часть пишется на другое хранилище
+            exclude_mount_points = {part['reservation']['mount_point']} if reason.startswith("storage") else ()
+            next_part = await open_part(
+                placement, user_name, name_components, part['number'] + 1, exclude_mount_points
+            )
+
+            if next_part:
+                next_part['start_reason'] = reason
+                add_part_to_db(broadcast_id, next_part)
+            elif exclude_mount_points:
+                channel_logger.error(f"Нет другого хранилища для продолжения записи {video_label} (причина: {reason}).")
+            else:
+                channel_logger.error(f"Не удалось начать следующую часть записи {video_label} (причина: {reason}).")
+
+            return next_part
+
+        # Причина закрытия последней части становится итоговым состоянием записи
+        end_reasons = []
+        # Последняя записанная часть и наибольший занятый номер части для продолжения после переподключения
+        chain = {"last_part": first_part, "closed_at": None, "last_number": first_part['number']}
+
+        def close_part(part, reason):
+            close_part_in_db(broadcast_id, part, reason)
+            placement.release(part['reservation'])
+            chain['last_number'] = max(chain['last_number'], part['number'])
+
+            if reason != "failed":
+                end_reasons.append(reason)
+                chain['last_part'] = part
+                chain['closed_at'] = time.monotonic()
+
+            # Закрытая часть больше не пишется и её можно обрабатывать
+            if postprocessor:
+                postprocessor.enqueue_part(part['file_path'])
+
+        title_task = None
+
+        if not stream_data['title']:
+            title_task = asyncio.create_task(fill_broadcast_title(
+                token_manager  = recorder_state["token_manager"],
+                broadcast_id   = broadcast_id,
+                user_id        = user_id,
+                stream_id      = stream_id,
+                delays         = TITLE_FETCH_DELAYS_SECONDS,
+                channel_logger = channel_logger
+            ))
+
+        try:
+            part = first_part
+            # Подряд идущие переподключения, после которых streamlink ничего не записал
+            empty_reconnects = 0
+
+            while part:
+                await record_broadcast(
+                    first_part      = part,
+                    user_name       = user_name,
+                    status          = status,
+                    logger          = channel_logger,
+                    check_rollover  = check_rollover,
+                    open_next_part  = open_next_part,
+                    close_part      = close_part,
+                    on_part_started = lambda part: set_part_pid_in_db(broadcast_id, part),
+                    check_interval  = config.storage_check_interval_seconds,
+                    overlap_seconds = config.part_overlap_seconds,
+                    writer_options  = get_writer_options()
+                )
+
+                last_part = chain['last_part']
+
+                try:
+                    recorded = os.path.getsize(last_part['file_path']) > 0
+                except OSError:
+                    recorded = False
+
+                if last_part['start_reason'] == "reconnect" and not recorded:
+                    empty_reconnects += 1
+                else:
+                    empty_reconnects = 0
+
+                # Helix ещё некоторое время показывает закончившуюся трансляцию, поэтому
+                # переподключения, которые ничего не записали, расходуют серию проверок
+                delays = config.reconnect_probe_delays_seconds[empty_reconnects:]
+                part = None
+
+                if not delays or not end_reasons or end_reasons[-1] in ("stall", "error"):
+                    break
+
+                probed = True
+
+                if not await probe_stream_continues(
+                    recorder_state["token_manager"], user_id, stream_id, delays, channel_logger
+                ):
+                    break
+
+                part = await open_part(placement, user_name, name_components, chain['last_number'] + 1)
+
+                if not part:
+                    channel_logger.error(f"Не удалось выбрать хранилище для продолжения записи {video_label}.")
+
+                    break
 
-        logger.info(f"Запись стрима пользователя {video_label} закончилась.")
+                part['start_reason'] = "reconnect"
+                part['gap_seconds'] = round(time.monotonic() - chain['closed_at'], 1)
+                add_part_to_db(broadcast_id, part)
+                channel_logger.info(
+                    f"Трансляция {video_label} продолжается, запись возобновлена через "
+                    f"{part['gap_seconds']:.1f} с в часть {part['number']}."
+                )
+        finally:
+            monitor.close()
+
+            if title_task:
+                title_task.cancel()
+
+            finish_broadcast_in_db(broadcast_id, end_reasons[-1] if end_reasons else "error")
+
+        channel_logger.info(f"Запись стрима пользователя {video_label} закончилась.")
     except Exception as err:
         logger.error(f"Ошибка при записи трансляции канала [ {user_name} ]: {err}")
     finally:
-        time.sleep(5)
+        if not probed:
+            await asyncio.sleep(5)
+
+        if cluster:
+            await asyncio.to_thread(cluster.release, user_id)
+
         active_users.discard(user_id)
 
 
-def check_users(token_container, user_ids):
+async def watch_detached_recording(recorder_state, part, process, status):
+    """
+    Следит за процессом streamlink, оставшимся от прошлого запуска программы, до его окончания.
+
+    Зависший процесс останавливается, после чего канал записывается заново по результатам опроса.
+
+    Args:
+        recorder_state (dict): Общее состояние записей.
+        part (dict): Незакрытая часть записи из базы данных.
+        process (psutil.Process): Процесс streamlink этой части.
+        status (RecorderStatus): Модель состояния записей и опроса каналов.
+    """
+    user_name = part['user_name']
+    channel_logger = get_channel_logger(logger, user_name)
+    postprocessor = recorder_state["postprocessor"]
+    part['opened_at'] = time.monotonic()
+    reason = "finished"
+
+    monitor = ThroughputMonitor(
+        user_name          = user_name,
+        stall_seconds      = config.stall_timeout_seconds,
+        max_stall_restarts = 0,
+        drop_ratio         = config.bitrate_drop_ratio,
+        history_interval   = config.bitrate_history_interval_seconds,
+        on_sample          = lambda _, bitrate, size: add_bitrate_sample_to_db(part['broadcast_id'], part, bitrate, size),
+        logger             = channel_logger
+    )
+    status.add_record(user_name, part['file_path'])
+
+    try:
+        while await asyncio.to_thread(is_process_alive, process):
+            if await asyncio.to_thread(monitor.check, part):
+                await asyncio.to_thread(stop_detached_process, process)
+                reason = "stall"
+
+                break
+
+            await asyncio.sleep(config.storage_check_interval_seconds)
+    except Exception as err:
+        channel_logger.error(f"Ошибка при наблюдении за записью [ {user_name} ]: {err}")
+        reason = "error"
+    finally:
+        monitor.close()
+        close_part_in_db(part['broadcast_id'], part, reason)
+        finish_broadcast_in_db(part['broadcast_id'], reason)
+        status.remove_record(user_name)
+
+        if postprocessor:
+            postprocessor.enqueue_part(part['file_path'])
+
+        channel_logger.info(f"Запись стрима пользователя [ {user_name} - {part['stream_id']} ], начатая до перезапуска, закончилась.")
+
+        await asyncio.sleep(5)
+
+        if recorder_state["cluster"]:
+            await asyncio.to_thread(recorder_state["cluster"].release, part['user_id'])
+
+        recorder_state["active_users"].discard(part['user_id'])
+
+
+async def recover_recordings(recorder_state, status):
+    """
+    Сверяет состояние записей в базе данных после перезапуска программы.
+
+    К работающим процессам streamlink прошлого запуска программа подключается и
+    дожидается их окончания. Части без работающего процесса отмечаются как оборванные,
+    а их каналы опрашиваются в первом же цикле, чтобы сразу продолжить запись.
+
+    Args:
+        recorder_state (dict): Общее состояние записей.
+        status (RecorderStatus): Модель состояния записей и опроса каналов.
+
+    Returns:
+        set: Идентификаторы каналов, записи которых оборвались.
+    """
+    active_users = recorder_state["active_users"]
+    postprocessor = recorder_state["postprocessor"]
+    cluster = recorder_state["cluster"]
+    attached_broadcast_ids = set()
+    interrupted_user_ids = set()
+
+    parts = await asyncio.to_thread(load_unfinished_parts, database)
+
+    # Сначала последние части: при перекрытии частей подключаемся к самой новой
+    for part in reversed(parts):
+        process = await asyncio.to_thread(find_recording_process, part['pid'], part['file_path'])
+
+        # В кластере к записи можно подключиться, только если её канал не подхватил другой узел
+        can_attach = process and part['user_id'] not in active_users and (
+            not cluster or await asyncio.to_thread(cluster.acquire, part['user_id'])
+        )
+
+        if can_attach:
+            active_users.add(part['user_id'])
+            attached_broadcast_ids.add(part['broadcast_id'])
+
+            logger.info(f"Найдена запись [ {part['user_name']} ] прошлого запуска, наблюдение продолжено.")
+
+            track_recording_task(
+                recorder_state,
+                part['user_id'],
+                asyncio.create_task(
+                    watch_detached_recording(recorder_state, part, process, status),
+                    name=f"detached_{part['user_name']}"
+                )
+            )
+
+            continue
+
+        if process:
+            await asyncio.to_thread(stop_detached_process, process)
+
+        logger.warning(f"Запись [ {part['user_name']} ] оборвалась при остановке программы: {part['file_path']}")
+
+        close_part_in_db(part['broadcast_id'], part, "interrupted")
+        interrupted_user_ids.add(part['user_id'])
+
+        if postprocessor:
+            postprocessor.enqueue_part(part['file_path'])
+
+    await asyncio.wrap_future(database.write(
+        f'''
+        UPDATE live_broadcast SET state = 'interrupted', recording_end = ?
+        WHERE state = 'recording' AND id NOT IN ({", ".join("?" * len(attached_broadcast_ids))})
+        ''',
+        (datetime.now(timezone.utc).strftime('%Y-%m-%d %H-%M-%S'), *attached_broadcast_ids)
+    ))
+
+    return interrupted_user_ids - active_users
+
+
+def check_users(token_manager, user_ids, executor):
     active_streamers = []
+    errors = []
 
     if not user_ids:
-        return active_streamers
+        return active_streamers, errors
 
     try:
-        headers = {"Client-ID": config.client_id, "Authorization": f"Bearer {token_container["access_token"]}"}
-        params = '&'.join([f'user_id={user_id}' for user_id in user_ids])
-        r = requests.get(f"https://api.twitch.tv/helix/streams?{params}", headers=headers, timeout=15)
-        r.raise_for_status()
-        info = r.json() if r.json() else None
-
-        for stream in info.get("data", []):
-            if stream:
-                active_streamers.append(stream)
-
-        return active_streamers
-    except requests.exceptions.HTTPError as e:
-        if hasattr(e, 'response') and e.response.status_code == 401:
-            logger.info("🔄 Токен устарел или неверный, обновление...")
-
-            token_container["access_token"] = fetch_access_token(
-                client_id     = config.client_id,
-                client_secret = config.client_secret,
-                logger        = logger
+        headers = token_manager.get_headers()
+
+        with POLL_DURATION.time():
+            active_streamers, errors = fetch_live_streams(
+                user_ids = user_ids,
+                headers  = headers,
+                limiter  = limiter,
+                executor = executor
             )
-        else:
-            logger.error(f"Ошибка при проверки статуса пользователей {user_ids}: {e}")
+
+        for err in errors:
+            response = getattr(err, 'response', None)
+
+            if response is not None and response.status_code == 401:
+                logger.info("🔄 Токен устарел или неверный, обновление...")
+
+                token_manager.invalidate(headers["Authorization"].removeprefix("Bearer "))
+
+                break
+
+            logger.error(f"Ошибка при проверки статуса пользователей: {err}")
     except Exception as e:
         logger.error(f"Ошибка при проверки статуса пользователей: {e}")
 
-    return active_streamers
+        errors = [e]
+
+    POLL_CHANNELS.inc(len(user_ids))
+    POLL_ERRORS.inc(len(errors))
+
+    return active_streamers, errors
+
+
+def track_recording_task(recorder_state, user_id, recording_task):
+    """
+    Сохраняет задачу записи канала в общем состоянии до её окончания.
+
+    Задача хранится, чтобы её не удалил сборщик мусора и чтобы запись канала можно было остановить.
+    """
+    recording_tasks = recorder_state["recording_tasks"]
+    recording_tasks[user_id] = recording_task
+    recording_task.add_done_callback(lambda _: recording_tasks.pop(user_id, None))
+
+
+def stop_recordings(recorder_state, user_ids):
+    """Останавливает записи каналов, например после потери их аренды в кластере."""
+    for user_id in user_ids:
+        recording_task = recorder_state["recording_tasks"].get(user_id)
+
+        if recording_task:
+            recording_task.cancel()
+
 
+def start_recording(recorder_state, stream_data, placement, status):
+    """
+    Запускает задачу записи трансляции, если канал ещё не записывается.
+
+    Общая точка входа для опроса `helix/streams` и уведомлений EventSub.
+
+    Args:
+        recorder_state (dict): Общее состояние: множество `active_users`, задачи записи `recording_tasks`
+                               по ID канала, очередь обработки записей `postprocessor` и координатор
+                               кластера `cluster`.
+        stream_data (dict): Данные трансляции в формате helix/streams.
+        placement (StoragePlacement): Распределитель записей по хранилищам.
+        status (RecorderStatus): Модель состояния записей и опроса каналов.
+
+    Returns:
+        bool: True, если запись запущена.
+    """
+    active_users = recorder_state["active_users"]
+    cluster = recorder_state["cluster"]
+
+    if stream_data['user_id'] in active_users:
+        return False
+
+    # Каналы других узлов кластера записывают они сами
+    if cluster and not cluster.owns(stream_data['user_id']):
+        return False
+
+    active_users.add(stream_data['user_id'])
 
-def loop_check_with_rate_limit(user_ids, storages, app):
+    track_recording_task(
+        recorder_state,
+        stream_data['user_id'],
+        asyncio.create_task(
+            record_twitch_channel(recorder_state, stream_data, placement, status),
+            name=f"record_{stream_data['user_name']}"
+        )
+    )
+
+    return True
+
+
+async def loop_check_with_rate_limit(placement, status, recorder_state, poll_intervals):
     """
     Бесконечный цикл для проверки активных пользователей и записи обнаруженных трансляций.
 
-    Эта функция периодически проверяет статус трансляций пользователей, и если трансляция активна,
-    запускает отдельный поток для записи трансляции.
+    Эта корутина периодически проверяет статус трансляций пользователей, и если трансляция активна,
+    запускает в том же событийном цикле задачу для записи трансляции. Какие каналы опрашивать
+    в очередном цикле, решает адаптивный планировщик `PollScheduler`. Список каналов
+    берётся из `recorder_state["user_ids"]` в каждом цикле, поэтому его можно менять на ходу.
 
     Args:
-        user_identifiers (list): Список идентификаторов пользователей для проверки.
-        storages (dict): Контейнер для хранения информации о хранилищах для записи.
-        app (StreamRecorderApp): Приложение для записи и управления стримами.
+        placement (StoragePlacement): Распределитель записей по хранилищам.
+        status (RecorderStatus): Модель состояния записей и опроса каналов.
+        recorder_state (dict): Общее состояние записей и менеджер токена доступа.
+        poll_intervals (tuple): Интервалы опроса горячих и холодных каналов в секундах.
     """
-    token_container = {"access_token": None}
-    active_users = set()
+    token_manager = recorder_state["token_manager"]
+    active_users = recorder_state["active_users"]
+    cluster = recorder_state["cluster"]
+    poll_executor = ThreadPoolExecutor(max_workers=POLL_MAX_WORKERS, thread_name_prefix="poll")
+    scheduler = PollScheduler(
+        database      = database,
+        hot_interval  = poll_intervals[0],
+        cold_interval = poll_intervals[1],
+        limiter       = limiter
+    )
+    recorder_state["scheduler"] = scheduler
+    history_refreshed_at = None
+
+    # Каналы, записи которых оборвались при прошлой остановке, опрашиваются сразу
+    scheduler.poll_now(recorder_state.pop("resume_user_ids", ()))
 
     while True:
         try:
-            limiter.wait()
+            sweep_start = time.monotonic()
+
+            if history_refreshed_at is None or sweep_start - history_refreshed_at >= SCHEDULER_HISTORY_REFRESH_SECONDS:
+                history_refreshed_at = sweep_start
+                await asyncio.to_thread(scheduler.refresh_history)
+
+            user_ids_for_check = scheduler.due_user_ids(
+                [
+                    user_id for user_id in recorder_state["user_ids"]
+                    if user_id not in active_users and (not cluster or cluster.owns(user_id))
+                ],
+                sweep_start
+            )
+
+            # Опрос выполняется в своём пуле, а не в общем: блокирующие операции
+            # идущих записей не должны задерживать обнаружение новых трансляций
+            streams_data, poll_errors = await asyncio.get_running_loop().run_in_executor(
+                poll_executor,
+                functools.partial(
+                    check_users,
+                    token_manager = token_manager,
+                    user_ids      = user_ids_for_check,
+                    executor      = poll_executor
+                )
+            )
 
-            user_ids_for_check = [
-                user_id for user_id
-                in user_ids
-                if user_id not in active_users
-            ]
+            scheduler.mark_polled(user_ids_for_check, sweep_start)
+            status.record_poll(
+                channels      = len(user_ids_for_check),
+                live_channels = len(streams_data),
+                error_count   = len(poll_errors),
+                duration      = time.monotonic() - sweep_start
+            )
 
-            streams_data = check_users(token_container=token_container, user_ids=user_ids_for_check)
+            detected = False
 
             for stream_data in streams_data:
-                recording_thread_name = f"thread_{stream_data['user_name']}"
-                recording_thread = threading.Thread(
-                    target=record_twitch_channel,
-                    args=(
-                        active_users,
-                        stream_data,
-                        storages,
-                        app
-                    ),
-                    name=recording_thread_name,
-                    daemon=True
-                )
-                recording_thread.start()
+                detection = scheduler.record_detection(stream_data)
+
+                if detection:
+                    detected = True
+                    logger.info(
+                        f"Трансляция [ {stream_data['user_name']} ] обнаружена через {detection['last_delay']:.1f} с "
+                        f"после начала (ожидалось ~{detection['expected_delay']:.1f} с, уровень {detection['tier']})."
+                    )
+
+                start_recording(recorder_state, stream_data, placement, status)
 
-            time.sleep(5)
+            # Отчёт собирается здесь, в потоке цикла, который меняет статистику планировщика
+            if detected:
+                status.record_detections(scheduler.detection_report())
+
+            # Темп опроса задаёт ограничитель запросов, пауза лишь не даёт
+            # тратить бюджет API чаще, чем раз в min_poll_interval_seconds.
+            await asyncio.sleep(max(0, config.min_poll_interval_seconds - (time.monotonic() - sweep_start)))
         except Exception as err:
             logger.error(f"Ошибка при проверке трансляции: {err}")
 
 
+async def run_eventsub(placement, status, recorder_state):
+    """
+    Запускает приёмник EventSub и синхронизирует подписки на каналы.
+
+    Уведомление stream.online сразу запускает запись через `start_recording`.
+    Подписки синхронизируются заново при каждом изменении списка каналов
+    (см. `apply_config_changes`).
+
+    Args:
+        placement (StoragePlacement): Распределитель записей по хранилищам.
+        status (RecorderStatus): Модель состояния записей и опроса каналов.
+        recorder_state (dict): Общее состояние записей и менеджер токена доступа.
+    """
+    def on_stream_online(stream_data):
+        if start_recording(recorder_state, stream_data, placement, status):
+            logger.info(f"EventSub: трансляция [ {stream_data['user_name']} ] началась, запись запущена.")
+
+    def on_stream_offline(event):
+        logger.info(f"EventSub: трансляция [ {event.get('broadcaster_user_name')} ] закончилась.")
+
+    server = await start_eventsub_server(
+        host              = config.eventsub_host,
+        port              = config.eventsub_port,
+        secret            = config.eventsub_secret,
+        on_stream_online  = on_stream_online,
+        on_stream_offline = on_stream_offline,
+        main_logger       = logger
+    )
+
+    token_manager = recorder_state["token_manager"]
+    resync = asyncio.Event()
+    recorder_state["eventsub_resync"] = resync
+
+    async with server:
+        while True:
+            resync.clear()
+
+            try:
+                headers = await asyncio.to_thread(token_manager.get_headers)
+
+                await asyncio.to_thread(
+                    sync_subscriptions,
+                    user_ids     = list(recorder_state["user_ids"]),
+                    callback_url = config.eventsub_callback_url,
+                    secret       = config.eventsub_secret,
+                    headers      = headers,
+                    limiter      = limiter,
+                    main_logger  = logger
+                )
+            except Exception as err:
+                logger.error(f"Ошибка при синхронизации подписок EventSub: {err}")
+
+                await asyncio.sleep(60)
+
+                continue
+
+            await resync.wait()
+
+
+async def apply_config_changes(recorder_state, placement, changes):
+    """
+    Применяет изменения списка каналов и хранилищ без остановки идущих записей.
+
+    Новые каналы сразу ставятся в очередь опроса, убранные перестают опрашиваться.
+    Запись убранного канала, если она идёт, продолжается до конца трансляции.
+    Новые хранилища используются для следующих записей и частей.
+
+    Args:
+        recorder_state (dict): Общее состояние записей и менеджер токена доступа.
+        placement (StoragePlacement): Распределитель записей по хранилищам.
+        changes (dict): Изменившиеся настройки от `ConfigReloader`.
+    """
+    if "storages" in changes:
+        storages = [dict(storage) for storage in changes["storages"]]
+        config.storages = storages
+        placement.set_storages(storages)
+
+        if recorder_state.get("catalog"):
+            recorder_state["catalog"].set_storage_paths([storage['path'] for storage in storages])
+
+        logger.info(f"Список хранилищ обновлён: {', '.join(storage['path'] for storage in storages)}.")
+
+    if "user_identifiers" in changes:
+        user_ids = await asyncio.to_thread(
+            get_twitch_user_ids,
+            user_identifiers = changes["user_identifiers"],
+            database         = database,
+            ttl_hours        = config.user_id_cache_ttl_hours,
+            get_headers      = recorder_state["token_manager"].get_headers,
+            logger           = logger,
+            limiter          = limiter
+        )
+        config.user_identifiers = changes["user_identifiers"]
+
+        previous = set(recorder_state["user_ids"])
+        added = [user_id for user_id in user_ids if user_id not in previous]
+        removed = previous - set(user_ids)
+        recorder_state["user_ids"] = user_ids
+
+        scheduler = recorder_state.get("scheduler")
+
+        if scheduler:
+            scheduler.forget(removed)
+            scheduler.poll_now(added)
+
+        if recorder_state.get("eventsub_resync"):
+            recorder_state["eventsub_resync"].set()
+
+        still_recording = removed & recorder_state["active_users"]
+
+        logger.info(
+            f"Список каналов обновлён: добавлено {len(added)}, убрано {len(removed)}, "
+            f"отслеживается {len(user_ids)}."
+        )
+
+        if still_recording:
+            logger.info(f"Записи убранных каналов продолжатся до конца трансляции: {len(still_recording)}.")
+
+
+async def retry_startup_step(description, function, **kwargs):
+    """
+    Выполняет блокирующий шаг запуска в пуле потоков, повторяя его до успеха.
+
+    Сетевые ошибки и недоступность токена при запуске не должны завершать
+    программу: шаг повторяется с экспоненциальной задержкой.
+
+    Args:
+        description (str): Описание шага для журнала.
+        function (Callable): Блокирующая функция.
+        **kwargs: Аргументы функции.
+
+    Returns:
+        Any: Результат функции.
+    """
+    attempt = 0
+
+    while True:
+        try:
+            return await asyncio.to_thread(function, **kwargs)
+        except Exception as err:
+            delay = min(STARTUP_RETRY_MAX_DELAY, STARTUP_RETRY_BASE_DELAY * 2 ** attempt)
+            attempt += 1
+            logger.error(f"Ошибка при запуске ({description}), повтор через {delay} с: {err}")
+
+            await asyncio.sleep(delay)
+
+
+def run_event_loop(user_identifiers, placement, status):
+    """
+    Запускает событийный цикл, в котором работают опрос каналов, приёмник EventSub и все записи.
+
+    Блокирующие операции (SQLite, проверка дисков, сбор состояния) выполняются
+    в ограниченном пуле потоков, а завершение процессов streamlink и писателей
+    отслеживается через pidfd (см. `install_child_watcher`), поэтому число потоков
+    не зависит от числа активных записей. Без поддержки pidfd (Python 3.11 на ядре
+    старше Linux 5.3 или не Linux) asyncio ждёт каждый дочерний процесс в отдельном
+    потоке, и эта гарантия не выполняется.
+    Если EventSub включён, опрос становится редкой сверкой с интервалом
+    `eventsub_reconcile_interval_seconds`.
+
+    Args:
+        user_identifiers (list): Логины и/или ID пользователей для проверки.
+        placement (StoragePlacement): Распределитель записей по хранилищам.
+        status (RecorderStatus): Модель состояния записей и опроса каналов.
+    """
+    async def supervise():
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(
+            ThreadPoolExecutor(max_workers=BLOCKING_MAX_WORKERS, thread_name_prefix="blocking")
+        )
+
+        if not install_child_watcher(loop):
+            logger.warning("pidfd недоступен: каждый дочерний процесс будет ожидаться в отдельном потоке.")
+
+        token_manager = TokenManager(
+            client_id     = config.client_id,
+            client_secret = config.client_secret,
+            token_path    = config.token_path,
+            limiter       = limiter,
+            main_logger   = logger
+        )
+        recorder_state = {
+            "token_manager": token_manager,
+            "active_users": set(),
+            "recording_tasks": {},
+            "postprocessor": None,
+            "cluster": None
+        }
+
+        # Задача хранится в состоянии, чтобы её не удалил сборщик мусора
+        recorder_state["token_refresh_task"] = asyncio.create_task(token_manager.run_refresh_loop())
+
+        if config.postprocess_enabled:
+            recorder_state["postprocessor"] = PostProcessor(
+                database     = database,
+                main_logger  = logger,
+                max_workers  = config.postprocess_max_workers,
+                ffmpeg_path  = config.ffmpeg_path,
+                ffprobe_path = config.ffprobe_path
+            )
+            recorder_state["postprocess_task"] = asyncio.create_task(recorder_state["postprocessor"].run())
+
+        if config.catalog_scan_interval_minutes:
+            recorder_state["catalog"] = RecordingsCatalog(
+                database      = database,
+                storage_paths = [storage['path'] for storage in config.storages],
+                main_logger   = logger
+            )
+            recorder_state["catalog_task"] = asyncio.create_task(
+                recorder_state["catalog"].run_scan_loop(config.catalog_scan_interval_minutes * 60)
+            )
+
+        if config.status_enabled:
+            recorder_state["status_server"] = await start_status_server(
+                host        = config.status_host,
+                port        = config.status_port,
+                status      = status,
+                main_logger = logger
+            )
+
+        user_ids = await retry_startup_step(
+            "получение ID каналов",
+            get_twitch_user_ids,
+            user_identifiers = user_identifiers,
+            database         = database,
+            ttl_hours        = config.user_id_cache_ttl_hours,
+            get_headers      = token_manager.get_headers,
+            logger           = logger,
+            limiter          = limiter
+        )
+
+        logger.info(f"Отслеживается каналов: {len(user_ids)}.")
+
+        recorder_state["user_ids"] = user_ids
+
+        if config.config_reload_interval_seconds:
+            reloader = ConfigReloader(
+                config_module    = config,
+                interval_seconds = config.config_reload_interval_seconds,
+                main_logger      = logger
+            )
+            recorder_state["config_reload_task"] = asyncio.create_task(
+                reloader.run_reload_loop(lambda changes: apply_config_changes(recorder_state, placement, changes))
+            )
+
+        if config.cluster_enabled:
+            cluster = ClusterCoordinator(
+                store_path        = config.cluster_store_path,
+                node_id           = config.cluster_node_id or socket.gethostname(),
+                heartbeat_seconds = config.cluster_heartbeat_seconds,
+                lease_seconds     = config.cluster_lease_seconds,
+                virtual_nodes     = config.cluster_virtual_nodes,
+                main_logger       = logger
+            )
+            # Первая отметка до опроса, чтобы узел сразу знал свои каналы
+            await retry_startup_step("первая отметка узла кластера", cluster.heartbeat)
+
+            recorder_state["cluster"] = cluster
+            recorder_state["cluster_task"] = asyncio.create_task(
+                cluster.run_heartbeat_loop(lambda user_ids: stop_recordings(recorder_state, user_ids))
+            )
+            logger.info(f"Режим кластера: узел {cluster.node_id}.")
+
+        recorder_state["resume_user_ids"] = await recover_recordings(recorder_state, status)
+
+        if not config.eventsub_enabled:
+            poll_intervals = (config.hot_poll_interval_seconds, config.cold_poll_interval_seconds)
+
+            await loop_check_with_rate_limit(placement, status, recorder_state, poll_intervals)
+
+            return
+
+        poll_intervals = (config.eventsub_reconcile_interval_seconds, config.eventsub_reconcile_interval_seconds)
+
+        await asyncio.gather(
+            run_eventsub(placement, status, recorder_state),
+            loop_check_with_rate_limit(placement, status, recorder_state, poll_intervals)
+        )
+
+    asyncio.run(supervise())
+
+
+def parse_args():
+    """Разбирает аргументы командной строки."""
+    parser = argparse.ArgumentParser(description="Запись трансляций Twitch.")
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        default=config.headless,
+        help="работать без окна (tkinter не загружается)"
+    )
+    parser.add_argument(
+        "--node-id",
+        help="идентификатор узла в режиме кластера (включает режим кластера)"
+    )
+    parser.add_argument(
+        "--status-port",
+        type=int,
+        help="порт HTTP-эндпоинта состояния (включает эндпоинт)"
+    )
+
+    return parser.parse_args()
+
+
 def main():
-    root = tk.Tk()
-    app = StreamRecorderApp(root)
+    args = parse_args()
+
+    if args.node_id:
+        config.cluster_enabled = True
+        config.cluster_node_id = args.node_id
+
+    if args.status_port is not None:
+        config.status_enabled = True
+        config.status_port = args.status_port
+
+    status = RecorderStatus()
 
     logger.info("Программа для записи трансляций запущена!")
 
     init_database(database_path=config.database_path, main_logger=logger)
+    database.start()
+
+    user_identifiers = config.user_identifiers
+    placement = StoragePlacement(
+        storages           = config.storages,
+        logger             = logger,
+        refresh_seconds    = config.storage_usage_refresh_seconds,
+        default_bitrate    = config.default_recording_bitrate_mbps * 1000 ** 2 / 8,
+        projection_seconds = config.storage_projection_hours * 3600
+    )
+    # Прогноз заполнения дисков сразу опирается на фактический битрейт каналов
+    placement.set_channel_bitrates(load_channel_bitrates(days=config.bitrate_history_days))
 
-    user_ids = config.user_ids
-    storages = config.storages
+    if args.headless:
+        run_event_loop(user_identifiers, placement, status)
+
+        return
+
+    # tkinter загружается только при запуске с окном
+    import tkinter as tk
+    from recorder_gui import StreamRecorderApp
+
+    root = tk.Tk()
+    status.subscribe(StreamRecorderApp(root))
 
     threading.Thread(
-        target=loop_check_with_rate_limit,
-        args=(user_ids, storages, app),
+        target=run_event_loop,
+        args=(user_identifiers, placement, status),
         daemon=True
     ).start()
 
@@ -355,7 +1221,14 @@ def main():
 
 
 if __name__ == "__main__":
-    logger = set_logger(log_folder=config.log_folder)
-    limiter = RateLimiter(period=5)
+    logger = set_logger(
+        log_folder   = config.log_folder,
+        json_format  = config.log_json,
+        max_bytes    = config.log_max_size_mb * 1024 ** 2,
+        backup_count = config.log_backup_count,
+        rotate_when  = config.log_rotate_when
+    )
+    limiter = RateLimiter()
+    database = Database(database_path=config.database_path, main_logger=logger)
 
     main()
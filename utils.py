@@ -9,7 +9,9 @@
 """
 import os
 
-from choose_storage import choose_storage
+from datetime import datetime, timedelta, timezone
+
+from get_twitch_user_id import fetch_twitch_user_ids
 
 
 def create_file_basename(name_components, extension, logger):
@@ -65,33 +67,119 @@ def create_file_path(folder_path, name_components, extension, logger):
         raise
 
 
-def get_video_path(storages, user_name, name_components, logger):
+def get_video_path(placement, user_name, name_components, logger, exclude_mount_points=()):
     """
     Определяет путь для сохранения видео в выбранном хранилище.
 
+    Хранилище выбирается через `placement`, который резервирует на нём место под запись.
+    После окончания записи резерв нужно освободить через `placement.release`.
+
     Args:
-        storages (list): Список доступных путей к хранилищам.
+        placement (StoragePlacement): Распределитель записей по хранилищам.
         user_name (str): Имя пользователя Twitch.
         name_components (list): Список компонентов, составляющих имя файла.
         logger (Logger): Логгер.
+        exclude_mount_points (Iterable, optional): Точки монтирования, которые нельзя выбирать.
 
     Returns:
-        str: Путь к файлу видео или None, если не удалось выбрать хранилище.
+        dict or None: Резерв хранилища с путём к файлу видео в ключе `file_path`
+                      или None, если не удалось выбрать хранилище.
     """
-    storage_path = choose_storage(storages=storages, logger=logger)
+    reservation = placement.choose_storage(user_name=user_name, exclude_mount_points=exclude_mount_points)
 
-    if not storage_path:
+    if not reservation:
         return None
 
-    folder_path = os.path.join(storage_path, user_name)
+    try:
+        folder_path = os.path.join(reservation['path'], user_name)
+
+        os.makedirs(folder_path, exist_ok=True)
+
+        file_path = create_file_path(
+            folder_path=folder_path,
+            name_components=name_components,
+            extension='mp4',
+            logger=logger
+        )
+    except Exception:
+        placement.release(reservation)
+
+        raise
+
+    placement.set_file_path(reservation, file_path)
 
-    os.makedirs(folder_path, exist_ok=True)
+    return reservation
 
-    file_path = create_file_path(
-        folder_path=folder_path,
-        name_components=name_components,
-        extension='mp4',
-        logger=logger
-    )
 
-    return file_path
+def get_twitch_user_ids(user_identifiers, database, ttl_hours, get_headers, logger, limiter=None):
+    """
+    Получает идентификаторы пользователей Twitch по их логинам или ID.
+
+    Числовые идентификаторы (числа и строки из цифр) используются как есть. Логины
+    сначала ищутся в таблице `user_ids`, и только неизвестные или устаревшие
+    (старше `ttl_hours`) запрашиваются через API пачками по 100 штук. Результат,
+    в том числе отсутствие пользователя, сохраняется в таблицу.
+
+    Args:
+        user_identifiers (list): Логины и/или ID пользователей.
+        database (Database): База данных с таблицей `user_ids`.
+        ttl_hours (float): Срок годности сохранённого соответствия логина и ID в часах.
+        get_headers (Callable): Возвращает заголовки для запроса к API. Вызывается, только если нужен запрос.
+        logger (Logger): Логгер.
+        limiter (RateLimiter, optional): Общий ограничитель частоты запросов к API.
+
+    Returns:
+        list: Идентификаторы пользователей в виде строк, в порядке исходного списка, без повторов.
+    """
+    now = datetime.now(timezone.utc)
+    fresh_since = (now - timedelta(hours=ttl_hours)).isoformat()
+    user_names = {
+        str(identifier).lower() for identifier in user_identifiers
+        if not str(identifier).isdigit()
+    }
+
+    cached = {
+        user_name: user_id for user_name, user_id in database.read(
+            "SELECT user_name, user_id FROM user_ids WHERE resolved_at >= ?",
+            (fresh_since,)
+        )
+        if user_name in user_names
+    }
+
+    unresolved = user_names - cached.keys()
+
+    if unresolved:
+        logger.info(f"Получение ID для {len(unresolved)} пользователей через API.")
+
+        resolved = fetch_twitch_user_ids(
+            user_names  = unresolved,
+            headers     = get_headers(),
+            main_logger = logger,
+            limiter     = limiter
+        )
+        resolved_at = now.isoformat()
+
+        database.write_many(
+            "INSERT OR REPLACE INTO user_ids (user_name, user_id, resolved_at) VALUES (?, ?, ?)",
+            [(user_name, resolved.get(user_name), resolved_at) for user_name in unresolved]
+        )
+
+        cached.update({user_name: resolved.get(user_name) for user_name in unresolved})
+
+    user_ids = []
+    seen_user_ids = set()
+
+    for identifier in user_identifiers:
+        identifier = str(identifier)
+        user_id = identifier if identifier.isdigit() else cached.get(identifier.lower())
+
+        if not user_id:
+            logger.warning(f"Пользователь [ {identifier} ] не найден.")
+
+            continue
+
+        if user_id not in seen_user_ids:
+            seen_user_ids.add(user_id)
+            user_ids.append(user_id)
+
+    return user_ids